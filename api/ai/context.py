@@ -1,6 +1,8 @@
 import json
 import logging
-from dataclasses import dataclass, field
+import threading
+import time
+from dataclasses import dataclass, field, replace
 from typing import Any
 
 from django.contrib.auth.models import User
@@ -143,6 +145,8 @@ class ConversationContext:
     incoming_text: str = ""
     model: str | None = None
     stage: str = "browsing"
+    # The history window as Message rows, newest first (see last_bot_message).
+    recent_messages: list[Any] = field(default_factory=list, repr=False)
 
     def summary(self, max_products=5, max_orders=3):
         parts = [f"Platform: {self.platform}"]
@@ -176,15 +180,117 @@ class ConversationContext:
         return "\n".join(parts)
 
 
+# ---------------------------------------------------------------------------
+# Tenant settings cache
+# ---------------------------------------------------------------------------
+# StoreConfig / AgentIdentity / BehaviorRules change rarely but were read on
+# every turn. The BusinessSettings built from them are kept per process and
+# versioned by the three rows' updated_at stamps: the stamps are re-read (one
+# query) at most every SETTINGS_VERSION_TTL seconds, so an edit made in another
+# process shows up within that window, and the post_save signals in
+# context/signals.py drop the local entry right away.
+
+SETTINGS_VERSION_TTL = 5.0
+
+_settings_lock = threading.Lock()
+# {user_id: (checked_at_monotonic, version, BusinessSettings)}
+_settings_cache: dict[int, tuple[float, tuple, BusinessSettings]] = {}
+
+
+def _settings_version(user_id):
+    return User.objects.filter(pk=user_id).values_list(
+        "store_config__updated_at", "agent_identity__updated_at", "behavior_rules__updated_at",
+    ).first()
+
+
+def _related(obj, name):
+    try:
+        return getattr(obj, name)
+    except Exception:
+        return None
+
+
+def _read_settings(user_id):
+    """(version, BusinessSettings) from one query over the three config rows."""
+    settings = BusinessSettings()
+    owner = (
+        User.objects.filter(pk=user_id)
+        .select_related("store_config", "agent_identity", "behavior_rules").first()
+    )
+    store = _related(owner, "store_config")
+    identity = _related(owner, "agent_identity")
+    rules = _related(owner, "behavior_rules")
+
+    if store:
+        settings.store_name = store.store_name or ""
+        settings.address = store.address or ""
+        settings.whatsapp_number = store.whatsapp_number or ""
+        settings.currency = store.currency or "BDT"
+        settings.delivery_charge_inside = float(store.delivery_charge_inside or 0)
+        settings.delivery_charge_outside = float(store.delivery_charge_outside or 0)
+        settings.support_open_time = str(store.support_open_time or "09:00")
+        settings.support_close_time = str(store.support_close_time or "21:00")
+        settings.timezone = store.timezone or "Asia/Dhaka"
+
+    if identity:
+        settings.agent_name = identity.name or ""
+        settings.agent_role = identity.role or ""
+        settings.agent_tone = identity.tone or "friendly"
+        settings.agent_style = identity.style or "concise"
+        settings.agent_language = identity.language or "bn"
+
+    if rules:
+        settings.custom_instructions = rules.custom_instructions or ""
+        settings.chit_chat_enabled = rules.chit_chat_enabled
+        settings.chit_chat_style = rules.chit_chat_style or "moderate"
+        settings.cross_sell_enabled = rules.cross_sell_enabled
+        settings.ask_open_ended = rules.ask_open_ended
+        settings.greeting_message = rules.greeting_message or ""
+
+    version = tuple(getattr(row, "updated_at", None) for row in (store, identity, rules))
+    return version, settings
+
+
+def tenant_settings(user_id) -> BusinessSettings:
+    """BusinessSettings for a tenant (a copy — callers may modify it)."""
+    now = time.monotonic()
+    with _settings_lock:
+        cached = _settings_cache.get(user_id)
+    if cached and now - cached[0] < SETTINGS_VERSION_TTL:
+        return replace(cached[2])
+
+    if cached and tuple(_settings_version(user_id) or ()) == cached[1]:
+        version, settings = cached[1], cached[2]
+    else:
+        version, settings = _read_settings(user_id)
+    with _settings_lock:
+        _settings_cache[user_id] = (now, version, settings)
+    return replace(settings)
+
+
+def invalidate_settings(user_id=None):
+    with _settings_lock:
+        if user_id is None:
+            _settings_cache.clear()
+        else:
+            _settings_cache.pop(user_id, None)
+
+
 # ---------------------------------------------------------------------------
 # ConversationManager (P0-1)
 # ---------------------------------------------------------------------------
 
 class ConversationManager:
 
+    HISTORY_LIMIT = 15
+
     @staticmethod
     def build(conversation, incoming_text="", model=None) -> ConversationContext:
+        """Load everything a turn reads up front: a warm turn costs three
+        queries (orders, history window, memory) — store settings come from
+        the per-process cache below."""
         user = conversation.user
+        recent = ConversationManager._recent_messages(conversation)
         ctx = ConversationContext(
             user=user,
             conversation=conversation,
@@ -195,12 +301,30 @@ class ConversationManager:
             settings=ConversationManager._load_settings(user),
             products=ConversationManager._load_products(conversation),
             orders=ConversationManager._load_orders(conversation),
-            history=ConversationManager._load_history(conversation),
+            history=ConversationManager._load_history(conversation, messages=recent),
             memory=ConversationManager._load_memory(user, conversation),
             summary=getattr(conversation, "chat_summary", "") or "",
+            recent_messages=recent,
         )
         return ctx
 
+    @staticmethod
+    def last_bot_message(ctx):
+        """The conversation's newest bot Message, or None.
+
+        Answered from the history window; only a full window without any bot
+        message needs a query.
+        """
+        for m in ctx.recent_messages:
+            if m.sender == "bot":
+                return m
+        if len(ctx.recent_messages) < ConversationManager.HISTORY_LIMIT:
+            return None
+        return (
+            Message.objects.filter(conversation=ctx.conversation, sender="bot")
+            .order_by("-timestamp").first()
+        )
+
     @staticmethod
     def _load_customer(conversation) -> CustomerProfile:
         return CustomerProfile(
@@ -215,40 +339,7 @@ class ConversationManager:
 
     @staticmethod
     def _load_settings(user) -> BusinessSettings:
-        from context.models import AgentIdentity, BehaviorRules, StoreConfig
-
-        settings = BusinessSettings()
-
-        store = StoreConfig.objects.filter(user=user).first()
-        if store:
-            settings.store_name = store.store_name or ""
-            settings.address = store.address or ""
-            settings.whatsapp_number = store.whatsapp_number or ""
-            settings.currency = store.currency or "BDT"
-            settings.delivery_charge_inside = float(store.delivery_charge_inside or 0)
-            settings.delivery_charge_outside = float(store.delivery_charge_outside or 0)
-            settings.support_open_time = str(store.support_open_time or "09:00")
-            settings.support_close_time = str(store.support_close_time or "21:00")
-            settings.timezone = store.timezone or "Asia/Dhaka"
-
-        identity = AgentIdentity.objects.filter(user=user).first()
-        if identity:
-            settings.agent_name = identity.name or ""
-            settings.agent_role = identity.role or ""
-            settings.agent_tone = identity.tone or "friendly"
-            settings.agent_style = identity.style or "concise"
-            settings.agent_language = identity.language or "bn"
-
-        rules = BehaviorRules.objects.filter(user=user).first()
-        if rules:
-            settings.custom_instructions = rules.custom_instructions or ""
-            settings.chit_chat_enabled = rules.chit_chat_enabled
-            settings.chit_chat_style = rules.chit_chat_style or "moderate"
-            settings.cross_sell_enabled = rules.cross_sell_enabled
-            settings.ask_open_ended = rules.ask_open_ended
-            settings.greeting_message = rules.greeting_message or ""
-
-        return settings
+        return tenant_settings(user.pk)
 
     @staticmethod
     def _load_products(conversation) -> list[ProductSummary]:
@@ -286,13 +377,18 @@ class ConversationManager:
         return orders
 
     @staticmethod
-    def _load_history(conversation, limit=15) -> list[dict]:
-        msgs = list(
+    def _recent_messages(conversation, limit=HISTORY_LIMIT) -> list:
+        return list(
             Message.objects
             .filter(conversation=conversation)
             .order_by("-timestamp")[:limit]
         )
-        msgs.reverse()
+
+    @staticmethod
+    def _load_history(conversation, limit=HISTORY_LIMIT, messages=None) -> list[dict]:
+        if messages is None:
+            messages = ConversationManager._recent_messages(conversation, limit)
+        msgs = list(reversed(messages))
         history = []
         for m in msgs:
             role = "assistant" if m.sender == "bot" else "user"
@@ -520,10 +616,9 @@ def _build_system_prompt_from_ctx(ctx, image_analysis=None):
     # questions ("total koto?") are answered from it, not hallucinated.
     if ctx.conversation is not None:
         try:
-            from context.models import SessionContext
-            from api.ai.state import ORDER_FIELDS
+            from api.ai.state import ORDER_FIELDS, get_session
             from back.models import Product
-            sess = SessionContext.objects.filter(conversation=ctx.conversation).first()
+            sess = get_session(ctx.conversation)
             if sess and sess.current_workflow == "create_order" and sess.state != "idle":
                 cd = sess.collected_data or {}
                 pending = []
@@ -1,17 +1,69 @@
 """
 Executor (P0-5): Deterministic Python tool runner.
 
-Takes a plan (list of PlanStep) and runs each step sequentially.
+Takes a plan (list of PlanStep) and runs it as a small DAG: steps that don't
+depend on each other (e.g. search_knowledge_base + get_order_status +
+check_inventory) run concurrently on a shared, bounded thread pool.
 No LLM calls — pure Python execution with timeout, retry, and permission checks.
+
+Ordering rules (the result list is identical to a sequential run):
+  * explicit ``depends_on`` step indices wait for those steps;
+  * steps that receive ``_propagate`` data (a pid for get_product_details /
+    send_images) wait for the up-to-3 steps before them;
+  * side-effecting tools (orders, tickets, customer writes) are barriers:
+    they start only after every earlier step finished and everything after
+    them waits for them, so a write never runs after a failed step.
+
+Permission checks, ``_propagate`` and AuditLog writes stay on the calling
+thread; workers only run the tool. Every AuditLog row of one run shares a
+``plan_run`` id and records its ``start_offset_ms``.
 """
 import logging
+import threading
 import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+from django.conf import settings
 
 from .context import ConversationContext, PlanStep
-from .tools import ToolResult, ToolRegistry
+from .tools import ToolResult, ToolRegistry, apply_focus_changes, deferred_focus
 
 logger = logging.getLogger(__name__)
 
+MAX_WORKERS = 8             # shared pool size (AI_EXECUTOR_MAX_WORKERS; 0 = run inline)
+MAX_PARALLEL_STEPS = 4      # steps of one plan in flight at once
+PROPAGATE_WINDOW = 3        # _propagate hands a pid to the next 3 steps
+PID_CONSUMERS = ("get_product_details", "send_images")
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """Process-wide tool pool, or None when parallel execution is disabled."""
+    global _pool
+    size = getattr(settings, "AI_EXECUTOR_MAX_WORKERS", MAX_WORKERS)
+    if size <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=size, thread_name_prefix="ai-tool")
+        return _pool
+
+
+class _Running:
+    """One in-flight step (primary or fallback attempt)."""
+
+    __slots__ = ("index", "step", "is_fallback", "started", "deadline")
+
+    def __init__(self, index, step, is_fallback, started, deadline):
+        self.index = index
+        self.step = step
+        self.is_fallback = is_fallback
+        self.started = started
+        self.deadline = deadline
+
 
 class Executor:
 
@@ -20,79 +72,195 @@ class Executor:
         plan: list[PlanStep],
         context: ConversationContext,
     ) -> list[ToolResult]:
-        """Run all plan steps sequentially, collecting results.
+        """Run the plan steps, concurrently where the dependencies allow.
 
         Args:
             plan: List of PlanStep objects to execute
             context: Current conversation context
 
         Returns:
-            List of ToolResult objects, one per step executed
+            List of ToolResult objects in plan order, one per step executed
+            (plus the fallback result right after a failed step). Stops after
+            the first step that fails without a usable fallback.
         """
-        results: list[ToolResult] = []
         if not plan:
-            return results
-
-        for step_index, step in enumerate(plan):
-            tool = ToolRegistry.get(step.tool)
-            if not tool:
-                results.append(ToolResult.as_error(
-                    f"Unknown tool: {step.tool}",
-                    tool=step.tool,
-                ))
-                break
+            return []
+
+        run_id = uuid.uuid4().hex
+        t_start = time.monotonic()
+        pool = _get_pool() if len(plan) > 1 else None
+        # Inline mode keeps the exact sequential order (one step at a time).
+        cap = MAX_PARALLEL_STEPS if pool else 1
+        deps = Executor._dependencies(plan)
+
+        outcome: dict[int, list[ToolResult]] = {}   # step -> [primary(, fallback)]
+        primary: dict[int, ToolResult] = {}
+        pending = list(range(len(plan)))
+        running: dict[Future, _Running] = {}
+        broken_at = None
+        # Focus-product changes per step, applied in plan order (see tools.deferred_focus).
+        focus_changes: dict[int, list] = {}
+        focus_applied = 0
+
+        def offset(t):
+            return int((t - t_start) * 1000)
 
-            # Check dependency satisfaction
-            if step.depends_on:
-                deps_satisfied = all(
-                    i < len(results) and results[i].state == "success"
+        def finish(index, step_results, breaks=False):
+            nonlocal broken_at, focus_applied
+            outcome[index] = step_results
+            if breaks and (broken_at is None or index < broken_at):
+                broken_at = index
+            # A step's focus changes land once every earlier step has finished.
+            while focus_applied in outcome and (broken_at is None or focus_applied <= broken_at):
+                apply_focus_changes(context.conversation, focus_changes.pop(focus_applied, []))
+                focus_applied += 1
+
+        def start(index, step, is_fallback=False):
+            started = time.monotonic()
+            changes = focus_changes.setdefault(index, [])
+            denied = Executor._check_permission(step, context, index, run_id, offset(started))
+            if denied:
+                future = Future()
+                future.set_result((denied, []))
+            elif pool is None:
+                future = Future()
+                future.set_result(Executor._run_step(step, context, index, changes))
+            else:
+                future = pool.submit(Executor._run_in_worker, step, context, index, changes)
+            deadline = None
+            if pool is not None and not Executor._has_side_effects(step.tool):
+                # Writes are awaited to completion: abandoning one mid-flight
+                # and running its fallback could apply it twice.
+                deadline = started + max(step.timeout_ms, 1) / 1000
+            running[future] = _Running(index, step, is_fallback, started, deadline)
+
+        def schedule():
+            for index in list(pending):
+                if broken_at is not None and index > broken_at:
+                    pending.remove(index)
+                    continue
+                if len(running) >= cap:
+                    return
+                if not deps[index] <= outcome.keys():
+                    continue
+                pending.remove(index)
+                step = plan[index]
+                if not ToolRegistry.get(step.tool):
+                    finish(index, [ToolResult.as_error(f"Unknown tool: {step.tool}", tool=step.tool)], breaks=True)
+                    continue
+                if step.depends_on and not all(
+                    i < index and i in outcome and outcome[i][-1].state == "success"
                     for i in step.depends_on
+                ):
+                    finish(index, [ToolResult.as_error("Dependencies not satisfied", tool=step.tool)], breaks=True)
+                    continue
+                start(index, step)
+
+        def complete(run, result, attempts):
+            for attempt, attempt_started in attempts:
+                Executor._write_audit(
+                    run.step, context, attempt, attempt.state,
+                    plan_run=run_id, start_offset_ms=offset(attempt_started),
                 )
-                if not deps_satisfied:
-                    results.append(ToolResult.as_error(
-                        "Dependencies not satisfied",
-                        tool=step.tool,
-                    ))
-                    break
-
-            # Execute with retry
-            result = Executor._execute_with_retry(
-                step, context, step_index
-            )
-            results.append(result)
-
-            # Handle error with fallback
-            if result.state == "error" and step.fallback:
-                fallback_step = PlanStep(
-                    tool=step.fallback,
-                    args=step.args,
-                    timeout_ms=step.timeout_ms,
-                )
-                fallback_result = Executor._execute_with_retry(
-                    fallback_step, context, step_index
-                )
-                results.append(fallback_result)
-                if fallback_result.state == "error":
-                    break
-            elif result.state == "error":
+            if broken_at is not None and run.index > broken_at:
+                return  # ran alongside a step that ended the plan; dropped
+
+            if run.is_fallback:
+                first = primary[run.index]
+                finish(run.index, [first, result], breaks=result.state == "error")
+                if result.state != "error":
+                    Executor._propagate_from(first, run.index, plan)
+                return
+
+            primary[run.index] = result
+            if result.state == "error" and run.step.fallback:
+                start(run.index, PlanStep(
+                    tool=run.step.fallback,
+                    args=run.step.args,
+                    timeout_ms=run.step.timeout_ms,
+                ), is_fallback=True)
+                return
+            finish(run.index, [result], breaks=result.state == "error")
+            if result.state != "error":
+                Executor._propagate_from(result, run.index, plan)
+
+        while True:
+            schedule()
+            if not running:
                 break
+            now = time.monotonic()
+            deadlines = [r.deadline for r in running.values() if r.deadline is not None]
+            timeout = max(0.0, min(deadlines) - now) if deadlines else None
+            done, _ = wait(list(running), timeout=timeout, return_when=FIRST_COMPLETED)
 
-            # Propagate data to subsequent steps
-            if result.data and step_index + 1 < len(plan):
-                Executor._propagate(result.data, step_index, plan)
+            for future in done:
+                run = running.pop(future)
+                try:
+                    result, attempts = future.result()
+                except Exception as exc:
+                    result = ToolResult.as_error(str(exc), tool=run.step.tool)
+                    attempts = [(result, run.started)]
+                complete(run, result, attempts)
 
+            now = time.monotonic()
+            for future, run in list(running.items()):
+                if run.deadline is not None and now >= run.deadline:
+                    # The worker keeps running; its late result is ignored.
+                    running.pop(future)
+                    focus_changes[run.index] = []
+                    elapsed = int((now - run.started) * 1000)
+                    logger.warning(
+                        "Step %d tool=%s timed out after %dms",
+                        run.index, run.step.tool, elapsed,
+                    )
+                    timed_out = ToolResult.as_error(
+                        f"Timed out after {run.step.timeout_ms}ms",
+                        tool=run.step.tool, execution_time_ms=elapsed,
+                    )
+                    complete(run, timed_out, [(timed_out, run.started)])
+
+        results: list[ToolResult] = []
+        for index in sorted(outcome):
+            if broken_at is not None and index > broken_at:
+                break
+            results.extend(outcome[index])
+
+        wall_ms = offset(time.monotonic())
+        serial_ms = sum(r.execution_time_ms for r in results)
+        logger.info(
+            "Plan run=%s steps=%d results=%d wall=%dms serial=%dms",
+            run_id, len(plan), len(results), wall_ms, serial_ms,
+        )
         return results
 
     @staticmethod
-    def _execute_with_retry(
-        step: PlanStep,
-        context: ConversationContext,
-        step_index: int,
-    ) -> ToolResult:
-        """Execute a single plan step with retries."""
-        last_error = None
+    def _dependencies(plan: list[PlanStep]) -> list[set[int]]:
+        """Indices each step must wait for before it may start."""
+        deps: list[set[int]] = []
+        barrier = None
+        for index, step in enumerate(plan):
+            wait_for = {i for i in (step.depends_on or []) if 0 <= i < index}
+            if Executor._has_side_effects(step.tool):
+                wait_for |= set(range(index))
+                barrier = index
+            elif barrier is not None:
+                wait_for.add(barrier)
+            if step.tool in PID_CONSUMERS and not step.args.get("pid"):
+                wait_for |= set(range(max(0, index - PROPAGATE_WINDOW), index))
+            deps.append(wait_for)
+        return deps
+
+    @staticmethod
+    def _has_side_effects(tool_name: str) -> bool:
+        tool = ToolRegistry.get(tool_name)
+        return bool(getattr(tool, "side_effects", False))
 
-        # Permission check (P1-2): every tool call verifies role permission first
+    @staticmethod
+    def _check_permission(step, context, step_index, run_id="", start_offset_ms=None) -> ToolResult | None:
+        """Permission check (P1-2): every tool call verifies role permission first.
+
+        Returns the permission_denied result, or None when allowed.
+        """
         try:
             from .policy import PermissionChecker
             allowed, reason = PermissionChecker.can_execute(context.user, step.tool)
@@ -102,34 +270,67 @@ class Executor:
                     step_index, step.tool, context.user.pk, reason,
                 )
                 denied = ToolResult.permission_denied(tool=step.tool)
-                Executor._write_audit(step, context, denied, "permission_denied")
+                Executor._write_audit(
+                    step, context, denied, "permission_denied",
+                    plan_run=run_id, start_offset_ms=start_offset_ms,
+                )
                 return denied
         except Exception as exc:
             logger.warning("Permission check failed step=%d: %s", step_index, exc)
+        return None
+
+    @staticmethod
+    def _run_in_worker(step: PlanStep, context: ConversationContext, step_index: int, focus_changes: list):
+        from django.db import close_old_connections
+
+        close_old_connections()
+        try:
+            return Executor._run_step(step, context, step_index, focus_changes)
+        finally:
+            close_old_connections()
+
+    @staticmethod
+    def _run_step(step: PlanStep, context: ConversationContext, step_index: int, focus_changes: list):
+        """``_run_attempts`` with the step's focus changes recorded, not written."""
+        with deferred_focus(focus_changes):
+            return Executor._run_attempts(step, context, step_index)
+
+    @staticmethod
+    def _run_attempts(
+        step: PlanStep,
+        context: ConversationContext,
+        step_index: int,
+    ) -> tuple[ToolResult, list[tuple[ToolResult, float]]]:
+        """Run one step with retries.
+
+        Returns the final result and every attempt with its monotonic start
+        time, so the caller can audit them.
+        """
+        last_error = None
+        attempts = []
 
         for attempt in range(max(1, step.retry_count)):
+            t0 = time.monotonic()
             try:
-                t0 = time.time()
                 result = ToolRegistry.execute(
                     step.tool,
                     step.args,
                     context.user,
                     context.conversation,
                 )
-                result.execution_time_ms = int((time.time() - t0) * 1000)
-
-                Executor._write_audit(step, context, result, result.state)
+                result.execution_time_ms = int((time.monotonic() - t0) * 1000)
+                attempts.append((result, t0))
 
                 if result.state == "success":
                     logger.debug(
                         "Step %d tool=%s attempt=%d OK (%dms)",
                         step_index, step.tool, attempt + 1, result.execution_time_ms,
                     )
-                    return result
+                    return result, attempts
 
                 last_error = result
                 if result.state != "error":
-                    return result  # non-retryable states
+                    return result, attempts  # non-retryable states
 
             except Exception as exc:
                 last_error = ToolResult.as_error(str(exc), tool=step.tool)
@@ -141,10 +342,17 @@ class Executor:
             if attempt < step.retry_count - 1:
                 time.sleep(0.1 * (attempt + 1))  # progressive backoff
 
-        return last_error or ToolResult.as_error("Max retries exceeded", tool=step.tool)
+        return last_error or ToolResult.as_error("Max retries exceeded", tool=step.tool), attempts
 
     @staticmethod
-    def _write_audit(step: PlanStep, context: ConversationContext, result: ToolResult, state: str):
+    def _write_audit(
+        step: PlanStep,
+        context: ConversationContext,
+        result: ToolResult,
+        state: str,
+        plan_run: str = "",
+        start_offset_ms: int | None = None,
+    ):
         """Persist an AuditLog row for a tool execution (P1-3)."""
         try:
             from back.models import AuditLog
@@ -162,11 +370,18 @@ class Executor:
                 result_state=state,
                 result_summary=summary,
                 execution_time_ms=result.execution_time_ms,
+                plan_run=plan_run,
+                start_offset_ms=start_offset_ms,
                 actor_role=PermissionChecker.get_user_role(context.user),
             )
         except Exception as exc:
             logger.warning("AuditLog write failed tool=%s: %s", step.tool, exc)
 
+    @staticmethod
+    def _propagate_from(result: ToolResult, from_index: int, plan: list[PlanStep]):
+        if result.data and from_index + 1 < len(plan):
+            Executor._propagate(result.data, from_index, plan)
+
     @staticmethod
     def _propagate(data: dict, from_index: int, plan: list[PlanStep]):
         """Pass result data to subsequent steps (e.g., pid from search → details)."""
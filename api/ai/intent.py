@@ -285,6 +285,62 @@ _INTENT_PATTERNS: list[tuple[str, re.Pattern, float]] = [
     ), 0.9),
 ]
 
+
+# ---------------------------------------------------------------------------
+# Compiled matcher
+# ---------------------------------------------------------------------------
+#
+# Every rule is IGNORECASE, and case-insensitive matching was most of what
+# scoring cost. For messages made of ASCII and caseless (Bengali) characters,
+# lowercasing both the message and the rules gives exactly the same matches
+# and spans, so those messages are matched case-sensitively against
+# lowercased copies of the rules. Other messages (accented or Cyrillic
+# letters, whose IGNORECASE folding ``str.lower`` doesn't mirror) use the
+# rules as written.
+
+def _is_foldable(text: str) -> bool:
+    """True when lowercasing ``text`` matches what IGNORECASE compares:
+    every character is ASCII or has no case."""
+    return text.isascii() or all(c < "\x80" or c.lower() == c.upper() for c in text)
+
+
+def _folded_rule(pattern: re.Pattern) -> re.Pattern:
+    source = pattern.pattern
+    # \D, \S, \W, \B ... would change meaning when lowercased.
+    if not pattern.flags & re.IGNORECASE or re.search(r"\\[A-Z]", source) or not _is_foldable(source):
+        raise ValueError(f"intent rule {source[:40]!r} can't be matched case-folded")
+    return re.compile(source.lower())
+
+
+_FOLDED_RULES = [_folded_rule(pattern) for _, pattern, _ in _INTENT_PATTERNS]
+
+
+def _score_patterns(cleaned: str) -> dict[str, float]:
+    """{intent: confidence} over _INTENT_PATTERNS, in rule order, each rule's
+    leftmost match boosted for position and coverage."""
+    if _is_foldable(cleaned):
+        text, rules = cleaned.lower(), _FOLDED_RULES
+    else:
+        text, rules = cleaned, [pattern for _, pattern, _ in _INTENT_PATTERNS]
+
+    scores: dict[str, float] = {}
+    for (intent_name, _pattern, confidence), rule in zip(_INTENT_PATTERNS, rules):
+        match = rule.search(text)
+        if not match:
+            continue
+        # Adjust confidence based on match position and length
+        position_boost = 1.0
+        if match.start() == 0:
+            position_boost = 1.15  # matched at start of message
+        if (match.end() - match.start()) / max(len(cleaned), 1) > 0.5:
+            position_boost *= 1.1  # match covers most of the message
+
+        final_confidence = min(1.0, confidence * position_boost)
+        if intent_name not in scores or final_confidence > scores[intent_name]:
+            scores[intent_name] = final_confidence
+    return scores
+
+
 # Single-word/no-context small talk patterns
 _SMALL_TALK_RE = re.compile(
     r"^(how are you|what('s|s) up|kemon|কেমন|ভাল|kmon|accho|আচ্ছা|"
@@ -361,22 +417,7 @@ class IntentDetector:
                 return "PROVIDE_QUANTITY", 0.9
             return "PROVIDE_QUANTITY", 0.9
 
-        scores: dict[str, float] = {}
-
-        for intent_name, pattern, confidence in _INTENT_PATTERNS:
-            match = pattern.search(cleaned)
-            if match:
-                # Adjust confidence based on match position and length
-                matched_text = match.group(0)
-                position_boost = 1.0
-                if match.start() == 0:
-                    position_boost = 1.15  # matched at start of message
-                if len(matched_text) / max(len(cleaned), 1) > 0.5:
-                    position_boost *= 1.1  # match covers most of the message
-
-                final_confidence = min(1.0, confidence * position_boost)
-                if intent_name not in scores or final_confidence > scores[intent_name]:
-                    scores[intent_name] = final_confidence
+        scores = _score_patterns(cleaned)
 
         if not scores:
             # Bare product-name messages ("cradle?", "bottle?", "dolna?") match
@@ -476,6 +517,10 @@ class IntentDetector:
         """Reclassify weak intents as SEARCH_PRODUCT when the message mentions
         a product from the user's catalog (by name token or substring).
 
+        Matched against the tenant's whole active catalog with the
+        precomputed ``NameMatcher`` of the product search index — no DB query
+        per message.
+
         Returns "" (empty) when no product matches — the caller decides the
         fallback intent.
         """
@@ -486,20 +531,10 @@ class IntentDetector:
             return ""
 
         try:
-            from back.models import Product
-
-            words = [w for w in re.split(r"[\s,.;:!?]+", text.lower()) if len(w) >= 3]
-            if not words and len(text.strip()) < 3:
-                return ""
-            lowered = text.lower()
-            for p in Product.objects.filter(user=user, status=True)[:50]:
-                name = (p.name or "").strip().lower()
-                if not name:
-                    continue
-                if name in lowered:
-                    return "SEARCH_PRODUCT"
-                if any(w in name for w in words):
-                    return "SEARCH_PRODUCT"
+            from .product_index import get_index
+
+            if get_index(user.pk).name_matcher.matches(text):
+                return "SEARCH_PRODUCT"
         except Exception as exc:
             logger.warning("Catalog product match failed: %s", exc)
         return ""
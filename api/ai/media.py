@@ -15,11 +15,8 @@ WHISPER_MODEL = "openai/whisper-1"
 
 
 def _or_client():
-    from openai import OpenAI
-    return OpenAI(
-        base_url=OPENROUTER_BASE_URL,
-        api_key=os.environ.get("OPENROUTER_API_KEY", ""),
-    )
+    from .providers import get_client
+    return get_client(OPENROUTER_BASE_URL)
 
 
 def analyze_image(image_url: str, user=None, reply_id=None) -> str:
@@ -152,8 +149,8 @@ def transcribe_audio(audio_url: str, mime_type: str = "", user=None, reply_id=No
         ext = ext_map.get(mime_type or "", "ogg")
         filename = f"voice.{ext}"
 
-        from openai import OpenAI
-        client = OpenAI(api_key=openai_key)
+        from .providers import get_client
+        client = get_client(base_url=None, api_key=openai_key)
         transcription = client.audio.transcriptions.create(
             model="whisper-1",
             file=(filename, audio_resp.content, mime_type or "audio/ogg"),
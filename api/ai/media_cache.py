@@ -0,0 +1,69 @@
+"""
+Platform media-id cache for reply images.
+
+Product replies send the same catalog images to customer after customer.
+Once an image has been uploaded for an integration, the platform hands back
+an id that later sends can reference instead of the bytes:
+
+  * WhatsApp: the media id from ``/media`` (kept by Meta for 30 days);
+  * Telegram: the ``file_id`` of the sent photo (does not expire);
+  * Messenger: the ``attachment_id`` of an ``is_reusable`` attachment.
+
+Rows (back.models.PlatformMedia) are keyed by (integration, sha256 of the
+image URL) and shared by every process. A send that fails with a cached id
+calls ``forget`` and falls back to the upload path, so ids revoked early by
+the platform heal on the next reply.
+"""
+import hashlib
+import logging
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+TTL_DAYS = {
+    "whatsapp": 29,     # one day short of Meta's 30-day media retention
+    "telegram": 365,
+    "messenger": 365,
+}
+
+
+def _hash(url):
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def lookup(integration, urls):
+    """{url: media_id} for the ``urls`` with a live cached id (one query)."""
+    from back.models import PlatformMedia
+
+    if not urls or integration.platform not in TTL_DAYS:
+        return {}
+    by_hash = {_hash(u): u for u in urls}
+    rows = PlatformMedia.objects.filter(
+        integration=integration, url_hash__in=list(by_hash), expires_at__gt=timezone.now(),
+    ).values_list("url_hash", "media_id")
+    return {by_hash[h]: media_id for h, media_id in rows}
+
+
+def remember(integration, url, media_id):
+    from back.models import PlatformMedia
+
+    ttl = TTL_DAYS.get(integration.platform)
+    if not media_id or ttl is None:
+        return
+    fields = {"url": url, "media_id": media_id, "expires_at": timezone.now() + timedelta(days=ttl)}
+    try:
+        with transaction.atomic():
+            PlatformMedia.objects.update_or_create(integration=integration, url_hash=_hash(url), defaults=fields)
+    except IntegrityError:
+        # Another reply cached the same image at the same moment.
+        PlatformMedia.objects.filter(integration=integration, url_hash=_hash(url)).update(**fields)
+
+
+def forget(integration, url):
+    from back.models import PlatformMedia
+
+    PlatformMedia.objects.filter(integration=integration, url_hash=_hash(url)).delete()
+    logger.info("Dropped cached media integration=%s url=%s", integration.pk, url[:120])
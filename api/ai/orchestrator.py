@@ -30,6 +30,21 @@ MAX_TOOL_ITERATIONS = 7
 _LOW_CONFIDENCE = 0.6
 
 
+class _QueryCounter:
+    """``connection.execute_wrapper`` hook counting the statements it sees."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class ReplyAlreadySent(Exception):
+    """The turn failed after its reply was delivered; it must not be retried."""
+
+
 class Orchestrator:
 
     def __init__(self, dry_run=False):
@@ -41,6 +56,16 @@ class Orchestrator:
         self.dry_run = dry_run
         self.last_response = None
         self.last_reply_id = None
+        self.query_count = 0
+        self._stream = None
+        self._reply_saved = False
+
+    @property
+    def reply_delivered(self):
+        """Whether this turn's reply, or part of it, already reached the
+        customer or the history (streamed parts, or the saved bot message)."""
+        stream = self._stream
+        return self._reply_saved or bool(stream is not None and stream.sent_parts)
 
     def process(self, conversation, incoming_message):
         """
@@ -49,7 +74,26 @@ class Orchestrator:
         Args:
             conversation: Conversation model instance
             incoming_message: SimpleNamespace with .text attribute, or Message-like object
+
+        Database queries issued by the turn on this thread are counted,
+        logged and kept in ``self.query_count`` (tool calls fanned out to
+        the executor's pool and background work are not included).
         """
+        from django.db import connection
+
+        self._queries = _QueryCounter()
+        started = time.monotonic()
+        try:
+            with connection.execute_wrapper(self._queries):
+                return self._process(conversation, incoming_message)
+        finally:
+            self.query_count = self._queries.count
+            logger.info(
+                "Orchestrator turn conv=%s queries=%d ms=%.0f",
+                conversation.pk, self.query_count, (time.monotonic() - started) * 1000,
+            )
+
+    def _process(self, conversation, incoming_message):
         if not conversation.is_ai_enabled:
             try:
                 if not conversation.auto_enable_ai():
@@ -88,6 +132,12 @@ class Orchestrator:
 
         reply_id = uuid.uuid4().hex
         customer_text = incoming_message.text or ""
+        # First message of the burst (set by the batch pipeline) — used to
+        # report time-to-first-reply on the bot message trace.
+        self._received_at = getattr(incoming_message, "received_at", None)
+        self._stream = None
+        self._reply_saved = False
+        self._cache_trace = None
 
         # Step 1: Build context
         context = self.conversation_manager.build(
@@ -174,9 +224,7 @@ class Orchestrator:
         if intent_name in ("SMALL_TALK", "GREETING", "UNKNOWN"):
             from .state import WorkflowEngine
             if WorkflowEngine.CONFIRM_RE.search(customer_text):
-                last_bot = Message.objects.filter(
-                    conversation=conversation, sender="bot"
-                ).order_by("-timestamp").first()
+                last_bot = ConversationManager.last_bot_message(context)
                 if (
                     last_bot and last_bot.text
                     and last_bot.text.rstrip().endswith("?")
@@ -225,9 +273,7 @@ class Orchestrator:
         # the catalog (text + cards) instead of looping the same canned apology.
         if intent_name == "UNKNOWN":
             try:
-                last_bot = Message.objects.filter(
-                    conversation=conversation, sender="bot"
-                ).order_by("-timestamp").first()
+                last_bot = ConversationManager.last_bot_message(context)
                 prev_intent = (last_bot.raw_payload or {}).get("intent") if last_bot and last_bot.raw_payload else None
                 if prev_intent == "UNKNOWN":
                     intent_name = "CATALOG"
@@ -313,6 +359,36 @@ class Orchestrator:
             self._intent_name = intent_name
             self._intent_conf = 0.0
 
+        # Step 2d: Semantic response cache — a confident match for a store
+        # question this customer already asked ("delivery charge koto?") is
+        # answered from the cache without planner, tool or LLM calls
+        # (api/ai/response_cache.py).
+        cache_probe = None
+        if not self.dry_run:
+            from . import response_cache
+            from billing.deductions import record_response_cache
+            try:
+                cache_probe = response_cache.lookup(context, intent_name, customer_text)
+            except Exception:
+                logger.exception("Response cache lookup failed conv=%s", conversation.pk)
+            if cache_probe is not None and cache_probe.entry is not None:
+                entry = cache_probe.entry
+                images, cards = ResponseGenerator._media_for_intent(
+                    context, list(entry.images), list(entry.cards),
+                )
+                response = Response(text=entry.text, images=images, cards=cards)
+                self._cache_trace = {"hit": True, "score": round(cache_probe.score, 4)}
+                self.last_response = response
+                self.last_reply_id = reply_id
+                self._save_and_send(conversation, response, reply_id, dry_run=self.dry_run)
+                record_response_cache(user, hit=True, credits_saved=entry.credits)
+                self._after_reply(conversation, customer_text, response)
+                logger.info(
+                    "Orchestrator response-cache hit conv=%s intent=%s score=%.3f",
+                    conversation.pk, intent_name, cache_probe.score,
+                )
+                return
+
         # Step 3: Generate plan (structured AIPlan — deterministic tiers are
         # free; the LLM tier is software-validated before anything executes)
         _t_plan = time.time()
@@ -380,20 +456,26 @@ class Orchestrator:
             except Exception as exc:
                 logger.warning("ToolCallLog write failed: %s", exc)
 
-        # Step 5: Generate response
+        # Step 5: Generate response — streamed when enabled, so finished parts
+        # of a text reply reach the customer while the rest is generated.
+        if not self.dry_run and getattr(settings, "AI_STREAMING_REPLIES", False):
+            from .streaming import StreamingReply
+            self._stream = StreamingReply(conversation, context)
         _t_resp = time.time()
         response = self.response_generator.generate(
-            context, tool_results, reply_id=reply_id, dry_run=self.dry_run
+            context, tool_results, reply_id=reply_id, dry_run=self.dry_run,
+            stream=self._stream,
         )
         _t_resp = (time.time() - _t_resp) * 1000
 
-        if not response.text:
-            logger.warning("Orchestrator produced no reply reply_id=%s conv=%s", reply_id, conversation.pk)
-            return
-
         # Step 5a: Deterministic final gate (Layer 7) — empty/unsafe/verbose/
         # media-cardinality corrections before anything reaches the customer.
-        response, self._validation_issues = ResponseValidator.validate(response, context)
+        stream = self._stream
+        streamed = "\n\n".join(stream.sent_parts) if stream is not None and stream.sent_parts else ""
+        if not response.text and not streamed:
+            logger.warning("Orchestrator produced no reply reply_id=%s conv=%s", reply_id, conversation.pk)
+            return
+        response = self._final_gate(response, context, reply_id)
 
         self.last_response = response
         self.last_reply_id = reply_id
@@ -404,8 +486,32 @@ class Orchestrator:
         }
 
         # Step 6: Save bot message and send
-        self._save_and_send(conversation, response, reply_id, dry_run=self.dry_run)
+        self._save_and_send(conversation, response, reply_id, dry_run=self.dry_run, streamed=streamed)
+        if streamed:
+            response.text = "\n\n".join(t for t in (streamed, response.text) if t)
+
+        self._after_reply(conversation, customer_text, response)
+
+        # Step 7: Deduct credits (skipped in dry-run)
+        if not self.dry_run:
+            try:
+                from billing.deductions import deduct_for_reply
+                deduct_for_reply(user, reply_id)
+            except Exception:
+                logger.exception("Credit deduction failed reply_id=%s", reply_id)
 
+        # Step 8: Remember a clean reply to a cacheable question (see Step 2d).
+        if cache_probe is not None:
+            try:
+                from billing.deductions import reply_cost
+                record_response_cache(user, hit=False)
+                if not self._validation_issues and not response.transferred:
+                    response_cache.store(cache_probe, response, credits=reply_cost(user, reply_id))
+            except Exception:
+                logger.exception("Response cache store failed reply_id=%s", reply_id)
+
+    def _after_reply(self, conversation, customer_text, response: Response):
+        """Per-turn bookkeeping once a reply is out (also after a cache hit)."""
         # A first-contact greeting is now done — mark it so context/prompts can
         # stop treating every later "hi" as a fresh customer.
         if getattr(self, "_intent_name", "") == "GREETING":
@@ -452,16 +558,35 @@ class Orchestrator:
             except Exception as exc:
                 logger.warning("Memory extraction trigger failed: %s", exc)
 
-        # Step 7: Deduct credits (skipped in dry-run)
-        if not self.dry_run:
-            try:
-                from billing.deductions import deduct_for_reply
-                deduct_for_reply(user, reply_id)
-            except Exception:
-                logger.exception("Credit deduction failed reply_id=%s", reply_id)
+    def _final_gate(self, response: Response, context, reply_id: str) -> Response:
+        """ResponseValidator.validate on what is still to be sent.
+
+        Parts streamed early are already with the customer (each passed
+        ResponseValidator.check_chunk), so only the text after them is gated:
+        a rewrite can never send them a second time.
+        """
+        stream = self._stream
+        if stream is None or not stream.sent_parts:
+            response, self._validation_issues = ResponseValidator.validate(response, context)
+            return response
+        rest = stream.remaining_text(response.text) if response.text else ""
+        if rest is None:
+            logger.warning("Streamed parts diverged from final reply reply_id=%s", reply_id)
+            rest = stream.undelivered_text(response.text)
+        response.text = rest
+        response, self._validation_issues = ResponseValidator.validate(response, context)
+        if not rest.strip():
+            # Nothing left to say; only the media checks applied.
+            response.text = ""
+            self._validation_issues = [i for i in self._validation_issues if i != "empty_response"]
+        return response
 
-    def _save_and_send(self, conversation, response: Response, reply_id: str, dry_run=False):
-        """Persist the bot reply and send it via the platform."""
+    def _save_and_send(self, conversation, response: Response, reply_id: str, dry_run=False, streamed=""):
+        """Persist the bot reply and send it via the platform.
+
+        ``streamed`` is the text already delivered by early sending: it is
+        saved in front of ``response.text`` but not sent again.
+        """
         from .sender import send_reply
         from .pipeline import _split_text_messages
 
@@ -503,9 +628,14 @@ class Orchestrator:
                 "confidence": round(getattr(plan_meta, "confidence", 0.0), 3),
                 "ask_clarification": bool(getattr(plan_meta, "ask_clarification", False)),
             }
+        if getattr(self, "_cache_trace", None):
+            trace["response_cache"] = self._cache_trace
         latency = getattr(self, "_latency_ms", None)
         if latency:
             trace["latency_ms"] = latency
+        queries = getattr(self, "_queries", None)
+        if queries is not None:
+            trace["db_queries"] = queries.count
         try:
             if conversation.session_id:
                 trace["conversation_state"] = conversation.session.state
@@ -516,24 +646,32 @@ class Orchestrator:
         msg = Message.objects.create(
             conversation=conversation,
             sender="bot",
-            text=text,
+            text="\n\n".join(t for t in (streamed, text) if t),
             attachments=attachment or None,
             raw_payload=trace or None,
         )
+        self._reply_saved = True
 
         if dry_run:
             # Bot Preview: persist the message for state continuity (workflow
             # history, last-bot-question matching) but never send to the platform.
             return
 
-        # Send via platform — one bubble when visuals are sent, otherwise cap at 3.
-        texts = _split_text_messages(text, max_parts=1 if has_visuals else 3)
-        delivery = send_reply(
-            conversation,
-            texts,
-            image_urls=response.images if not response.cards else None,
-            product_cards=response.cards or None,
-        )
+        # Send via platform — one bubble when visuals are sent, otherwise cap at
+        # 3 (counting parts already streamed out early).
+        stream = getattr(self, "_stream", None)
+        streamed_parts = len(stream.sent_parts) if streamed and stream is not None else 0
+        left = 1 if has_visuals else max(1, 3 - streamed_parts)
+        texts = _split_text_messages(text, max_parts=left) if text else []
+        if texts or response.images or response.cards:
+            delivery = send_reply(
+                conversation,
+                texts,
+                image_urls=response.images if not response.cards else None,
+                product_cards=response.cards or None,
+            )
+        else:
+            delivery = {"ok": True, "sent": {}, "errors": []}
 
         # Record the delivery outcome on the message so "saved but not delivered"
         # failures are visible instead of silent.
@@ -542,6 +680,17 @@ class Orchestrator:
             if not isinstance(raw, dict):
                 raw = {}
             raw["delivery"] = delivery
+            first_sent_at = None
+            if stream is not None and (stream.sent_parts or stream.stop_reason):
+                raw["delivery"]["streamed"] = stream.summary()
+                first_sent_at = stream.first_sent_at
+            received_at = getattr(self, "_received_at", None)
+            if received_at:
+                from django.utils import timezone
+                first_sent_at = first_sent_at or timezone.now()
+                ttfr_ms = round((first_sent_at - received_at).total_seconds() * 1000, 1)
+                raw.setdefault("latency_ms", {})["time_to_first_reply"] = ttfr_ms
+                logger.info("Time to first reply conv=%s ms=%.0f", conversation.pk, ttfr_ms)
             msg.raw_payload = raw
             msg.save(update_fields=["raw_payload"])
         except Exception:
@@ -599,6 +748,15 @@ class Orchestrator:
 # ---------------------------------------------------------------------------
 
 def run_via_orchestrator(conversation, incoming_message):
-    """Compatibility wrapper so webhooks.py can call orchestrator."""
+    """Compatibility wrapper so webhooks.py can call orchestrator.
+
+    A crash after the reply (or part of it) went out is re-raised as
+    ReplyAlreadySent: running the turn again would send and bill it twice.
+    """
     orch = Orchestrator()
-    orch.process(conversation, incoming_message)
+    try:
+        orch.process(conversation, incoming_message)
+    except Exception as exc:
+        if orch.reply_delivered:
+            raise ReplyAlreadySent(f"turn failed after its reply was sent: {exc!r}") from exc
+        raise
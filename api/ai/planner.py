@@ -89,9 +89,8 @@ def _is_complex_context(context: ConversationContext) -> bool:
     state = ""
     try:
         if getattr(context, "conversation", None) is not None:
-            from context.models import SessionContext
-            sc = SessionContext.objects.filter(conversation=context.conversation).first()
-            state = (sc.state or "") if sc else ""
+            from .state import get_session
+            state = get_session(context.conversation).state or ""
     except Exception:
         state = ""
     return state in _COMPLEX_STATES
@@ -442,7 +441,7 @@ class Planner:
                 try:
                     from api.products.factory import get_active_source, is_external
                     source = get_active_source(context.user)
-                    external_live = bool(source) and source.mode == "live" and is_external(context.user)
+                    external_live = bool(source) and source.reads_live and is_external(context.user)
                 except Exception:
                     external_live = False
                 if not external_live:
@@ -0,0 +1,474 @@
+"""
+In-memory search index over each tenant's active local products.
+
+``tool_search_products`` used to OR an ``icontains`` clause per query
+variation across name/description/pid/external_id (a full table scan), and
+``_latinized_search`` loaded up to 500 products and ran ``_latinize_bn`` on
+every name for every query. The index does that work once per catalog
+version, per tenant and per process:
+
+  * trigram postings over the lowercased searchable text — a variation's
+    candidates are the intersection of its trigrams' postings, confirmed
+    with a substring check, so matches are exactly what ``icontains`` found;
+  * latinized name words (materialized on Product.name_latin at save time)
+    for the romanized-Bengali bridge, grouped by their first three letters
+    so a query token is compared with a handful of words, not every name;
+  * BM25 term statistics for ranking (name terms weighted over description
+    terms). Query terms are expanded with ``_BN_EN_SYNONYMS`` and
+    ``_MISSPELL_MAP`` ("dolna" also scores "cradle");
+  * a NameMatcher (Aho-Corasick over names + name-token fragments) for the
+    intent detector's catalog fallback, built on first use.
+
+Freshness: Product post_save/post_delete and ``sync_products`` drop the
+tenant's index in this process; other processes notice through the
+tenant's CatalogVersion (bumped by every product write, shared with the
+response cache) re-read at most every VERSION_TTL_SECONDS. Searches themselves make no DB queries.
+
+Memory: the registry is an LRU over tenants bounded by PRODUCT_INDEX_MAX_BYTES
+(an estimate of postings + product rows); an evicted tenant is rebuilt on its
+next search. Each index's token → latin-word cache holds at most
+MATCH_CACHE_MAX customer tokens.
+"""
+import logging
+import math
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+VERSION_TTL_SECONDS = 5.0
+BM25_K1 = 1.2
+BM25_B = 0.75
+NAME_WEIGHT = 3             # a name term counts as this many description terms
+PREFIX_MIN = 4              # query terms this long also score words they prefix
+MAX_BYTES = 128 * 1024 * 1024
+MATCH_CACHE_MAX = 4096      # cached customer tokens per index
+
+# Rough CPython costs for the nbytes estimate.
+_DOC_BYTES = 1024           # _Doc + its row dict + latin word set, besides the text
+_POSTING_BYTES = 8          # one trigram posting entry (list slot)
+_TERM_POSTING_BYTES = 72    # one (doc, tf) tuple + its list slot
+
+_SEP = "\x00"               # joins the searchable fields; never in a query
+_TERM_RE = re.compile(r"[0-9a-z\u0980-\u09FF]+")
+_LATIN_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def terms(text):
+    return _TERM_RE.findall((text or "").lower())
+
+
+def name_forms(name):
+    """(latinized name, space-joined search tokens) for a product name.
+
+    Stored on Product as ``name_latin`` / ``name_tokens`` by a pre_save
+    signal; the tokens are the name's own terms plus its latinized words.
+    """
+    from .tools import _latinize_bn
+
+    latin = _latinize_bn(name or "").lower()
+    tokens = dict.fromkeys(terms(name) + _LATIN_WORD_RE.findall(latin))
+    return latin, " ".join(tokens)
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class _Doc:
+    __slots__ = ("pid", "row", "haystack", "text", "eff_price", "latin_words")
+
+    def __init__(self, pid, row, haystack, text, eff_price, latin_words):
+        self.pid = pid
+        self.row = row                  # _product_row() shape
+        self.haystack = haystack        # name/description/pid/external_id, lowercased
+        self.text = text                # name + description, lowercased (relevance guard)
+        self.eff_price = eff_price      # discounted_price if set, else price
+        self.latin_words = latin_words  # words of the latinized Bengali name
+
+
+class ProductIndex:
+    """Active products of one tenant, in the DB's default search order
+    (featured first, then name)."""
+
+    def __init__(self, rows=(), fingerprint=None):
+        self.fingerprint = fingerprint
+        self.docs: list[_Doc] = []
+        self.postings: dict[str, list[int]] = defaultdict(list)
+        self.term_postings: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        self.doc_len: list[int] = []
+        self.latin_roots: dict[str, dict[str, list[int]]] = defaultdict(dict)
+        self._match_cache: dict[str, tuple[str, ...]] = {}
+        self._name_matcher = None
+
+        for (pid, name, description, price, discounted, stock, featured, external_id,
+             latin, name_tokens) in rows:
+            i = len(self.docs)
+            name_l = (name or "").lower()
+            desc_l = (description or "").lower()
+            haystack = _SEP.join((name_l, desc_l, (pid or "").lower(), (external_id or "").lower()))
+            if name_l and not name_tokens:
+                latin, name_tokens = name_forms(name)  # row saved before the columns existed
+            latin_words = frozenset(_LATIN_WORD_RE.findall(latin))
+            row = {
+                "pid": pid,
+                "name": name,
+                "price": str(price),
+                "discounted_price": str(discounted) if discounted else None,
+                "in_stock": stock > 0,
+                "stock": stock,
+                "description": (description or "")[:200],
+                "featured": featured,
+            }
+            eff = discounted if discounted is not None else price
+            self.docs.append(_Doc(pid, row, haystack, f"{name_l} {desc_l}",
+                                  float(eff or 0), latin_words))
+
+            for tri in trigrams(haystack):
+                self.postings[tri].append(i)
+
+            tf = defaultdict(int)
+            for t in name_tokens.split():
+                tf[t] += NAME_WEIGHT
+            for t in terms(desc_l):
+                tf[t] += 1
+            for t, n in tf.items():
+                self.term_postings[t].append((i, n))
+            self.doc_len.append(sum(tf.values()))
+
+            for w in latin_words:
+                if len(w) >= 3 and not w.isdigit():
+                    self.latin_roots[w[:3]].setdefault(w, []).append(i)
+
+        # Plain dicts from here on: lookups must never insert (shared across threads).
+        self.postings = dict(self.postings)
+        self.term_postings = dict(self.term_postings)
+        self.latin_roots = dict(self.latin_roots)
+        self.vocab = sorted(self.term_postings)
+        self.avg_len = (sum(self.doc_len) / len(self.doc_len)) if self.doc_len else 0.0
+        self.latin_vocab = [w for words in self.latin_roots.values() for w in words]
+        # Approximate footprint, counted against MAX_BYTES.
+        self.nbytes = (
+            sum(_DOC_BYTES + len(d.haystack) + len(d.text) for d in self.docs)
+            + _POSTING_BYTES * sum(len(p) for p in self.postings.values())
+            + _TERM_POSTING_BYTES * sum(len(p) for p in self.term_postings.values())
+        )
+
+    def __len__(self):
+        return len(self.docs)
+
+    @property
+    def name_matcher(self):
+        """NameMatcher over the product names, built on first use."""
+        if self._name_matcher is None:
+            self._name_matcher = NameMatcher(d.row["name"] for d in self.docs)
+        return self._name_matcher
+
+    # -- substring matching (icontains equivalent) -------------------------
+
+    def match(self, variations):
+        """Indices of docs whose searchable text contains any variation."""
+        found = set()
+        for variation in variations:
+            v = (variation or "").lower()
+            if not v:
+                continue
+            if len(v) < 3:
+                found.update(i for i, d in enumerate(self.docs) if v in d.haystack)
+                continue
+            lists = []
+            for tri in trigrams(v):
+                posting = self.postings.get(tri)
+                if not posting:
+                    lists = None
+                    break
+                lists.append(posting)
+            if not lists:
+                continue
+            lists.sort(key=len)
+            candidates = set(lists[0])
+            for posting in lists[1:]:
+                if len(candidates) <= 8:
+                    break  # cheaper to confirm the few left directly
+                candidates.intersection_update(posting)
+            found.update(i for i in candidates if i not in found and v in self.docs[i].haystack)
+        return found
+
+    # -- BM25 ranking ------------------------------------------------------
+
+    def scores(self, query_terms, doc_ids):
+        """BM25 score per doc id for ``query_terms`` (only ``doc_ids`` scored)."""
+        out = dict.fromkeys(doc_ids, 0.0)
+        if not out or not self.avg_len:
+            return out
+        n_docs = len(self.docs)
+        for term in query_terms:
+            for vocab_term in self._expand(term):
+                posting = self.term_postings[vocab_term]
+                idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                # A prefix hit ("jolpai" → "jolpaiyer") counts for less.
+                weight = 1.0 if vocab_term == term else 0.5
+                for i, tf in posting:
+                    if i in out:
+                        norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[i] / self.avg_len)
+                        out[i] += weight * idf * tf * (BM25_K1 + 1) / norm
+        return out
+
+    def _expand(self, term):
+        """Vocabulary terms a query term scores: itself, plus the words it
+        prefixes when long enough."""
+        if term in self.term_postings:
+            hits = [term]
+        else:
+            hits = []
+        if len(term) >= PREFIX_MIN:
+            at = bisect_left(self.vocab, term)
+            while at < len(self.vocab) and self.vocab[at].startswith(term):
+                if self.vocab[at] != term:
+                    hits.append(self.vocab[at])
+                at += 1
+        return hits
+
+    # -- romanized-Bengali bridge ------------------------------------------
+
+    def latin_matches(self, tokens):
+        """{doc id: number of query tokens matching a latinized name word}."""
+        from .tools import _tok_matches_name
+
+        scored = defaultdict(int)
+        for tok in tokens:
+            words = self._match_cache.get(tok)
+            if words is None:
+                if len(tok) < 3:
+                    words = ()
+                elif len(tok) >= 4:
+                    # Close phonetic variants can differ in the first three
+                    # letters ("tetul"/"tentuler"), so check the whole vocabulary.
+                    words = tuple(w for w in self.latin_vocab if _tok_matches_name(tok, w))
+                else:
+                    words = tuple(w for w in self.latin_roots.get(tok[:3], {})
+                                  if _tok_matches_name(tok, w))
+                if len(self._match_cache) >= MATCH_CACHE_MAX:
+                    self._match_cache.clear()
+                self._match_cache[tok] = words
+            docs = set()
+            for w in words:
+                docs.update(self.latin_roots[w[:3]][w])
+            for i in docs:
+                scored[i] += 1
+        return scored
+
+
+# ---------------------------------------------------------------------------
+# Catalog-name matching (intent fallback)
+# ---------------------------------------------------------------------------
+
+_MESSAGE_SPLIT_RE = re.compile(r"[\s,.;:!?]+")
+
+
+class NameMatcher:
+    """Does a message mention a catalog product?
+
+    True when a whole product name occurs in the message, or a message word
+    (3+ chars) occurs inside a product name — the rule
+    ``IntentDetector._match_catalog_product`` applies. One Aho-Corasick pass
+    over the message finds whole names; a word has no whitespace, so it lies
+    inside a single name token and is looked up in the set of every token's
+    substrings.
+    """
+
+    MAX_FRAGMENT_TOKEN = 32     # longer tokens are scanned instead of expanded
+
+    def __init__(self, names=()):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[bool] = [False]
+        self.fragments: set[str] = set()
+        self._long_tokens: list[str] = []
+        for name in names:
+            name = (name or "").strip().lower()
+            if not name:
+                continue
+            self._add(name)
+            for tok in name.split():
+                if len(tok) > self.MAX_FRAGMENT_TOKEN:
+                    self._long_tokens.append(tok)
+                    continue
+                for i in range(len(tok) - 2):
+                    for j in range(i + 3, len(tok) + 1):
+                        self.fragments.add(tok[i:j])
+        self._link()
+
+    def _add(self, pattern):
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(False)
+            node = nxt
+        self._out[node] = True
+
+    def _link(self):
+        queue = list(self._goto[0].values())
+        for node in queue:          # breadth-first; the list grows as we go
+            for ch, nxt in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] or self._out[self._fail[nxt]]
+                queue.append(nxt)
+
+    def contains_name(self, lowered):
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for ch in lowered:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                return True
+        return False
+
+    def matches(self, text):
+        if not text:
+            return False
+        lowered = text.lower()
+        words = [w for w in _MESSAGE_SPLIT_RE.split(lowered) if len(w) >= 3]
+        if not words and len(text.strip()) < 3:
+            return False
+        for w in words:
+            if w in self.fragments or any(w in tok for tok in self._long_tokens):
+                return True
+        return self.contains_name(lowered)
+
+
+# ---------------------------------------------------------------------------
+# Query terms
+# ---------------------------------------------------------------------------
+
+def query_terms(query, variations=()):
+    """Terms of the query and its variations, plus synonym / spelling
+    expansions ("dolna" → "cradle", "aveno" → "aveeno")."""
+    from .tools import _BN_EN_SYNONYMS, _MISSPELL_MAP, _STOPWORDS, _latinize_bn
+
+    out = []
+    seen = set()
+
+    def add(term):
+        if term and term not in seen and term not in _STOPWORDS and not term.isdigit():
+            seen.add(term)
+            out.append(term)
+
+    for text in (query, *variations):
+        for t in terms(text):
+            add(t)
+            latin = _latinize_bn(t) or t
+            add(latin)
+            for mapped in (_BN_EN_SYNONYMS.get(latin), _MISSPELL_MAP.get(latin)):
+                for m in terms(mapped):
+                    add(m)
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Per-process registry
+# ---------------------------------------------------------------------------
+
+_indexes: OrderedDict[int, ProductIndex] = OrderedDict()  # least recently used first
+_checked: dict[int, float] = {}     # user_id -> monotonic time of the last fingerprint read
+_locks: dict[int, threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+
+def _tenant_lock(user_id):
+    with _registry_lock:
+        return _locks.setdefault(user_id, threading.Lock())
+
+
+def _touch(user_id):
+    with _registry_lock:
+        if user_id in _indexes:
+            _indexes.move_to_end(user_id)
+
+
+def _store(user_id, index):
+    """Register ``index`` as the newest and evict least recently used
+    tenants while the total is over budget (the newest always stays)."""
+    budget = getattr(settings, "PRODUCT_INDEX_MAX_BYTES", MAX_BYTES)
+    with _registry_lock:
+        _indexes[user_id] = index
+        _indexes.move_to_end(user_id)
+        total = sum(i.nbytes for i in _indexes.values())
+        while total > budget and len(_indexes) > 1:
+            evicted_id, evicted = _indexes.popitem(last=False)
+            total -= evicted.nbytes
+            _checked.pop(evicted_id, None)
+            lock = _locks.get(evicted_id)
+            if lock is not None and not lock.locked():
+                del _locks[evicted_id]
+            logger.debug("Product index user=%s evicted (%d bytes)", evicted_id, evicted.nbytes)
+
+
+def _fingerprint(user_id):
+    from back.models import CatalogVersion
+
+    return CatalogVersion.current(user_id)
+
+
+def build(user_id, fingerprint=None):
+    from back.models import Product
+
+    t0 = time.monotonic()
+    rows = (
+        Product.objects.filter(user_id=user_id, status=True)
+        .order_by("-featured_product", "name")
+        .values_list("pid", "name", "description", "price", "discounted_price",
+                     "stock_quantity", "featured_product", "external_id",
+                     "name_latin", "name_tokens")
+    )
+    index = ProductIndex(rows.iterator(chunk_size=2000), fingerprint)
+    logger.debug("Product index user=%s products=%d built in %.0fms",
+                 user_id, len(index), (time.monotonic() - t0) * 1000)
+    return index
+
+
+def get_index(user_id):
+    """Current ProductIndex for ``user_id`` (built on first use or change)."""
+    now = time.monotonic()
+    index = _indexes.get(user_id)
+    if index is not None and now - _checked.get(user_id, 0) < VERSION_TTL_SECONDS:
+        _touch(user_id)
+        return index
+    fingerprint = _fingerprint(user_id)
+    if index is not None and index.fingerprint == fingerprint:
+        _checked[user_id] = now
+        _touch(user_id)
+        return index
+    with _tenant_lock(user_id):
+        index = _indexes.get(user_id)
+        if index is None or index.fingerprint != fingerprint:
+            index = build(user_id, fingerprint)
+            _store(user_id, index)
+        _checked[user_id] = now
+    return index
+
+
+def invalidate(user_id=None):
+    with _registry_lock:
+        if user_id is None:
+            _indexes.clear()
+            _checked.clear()
+        else:
+            _indexes.pop(user_id, None)
+            _checked.pop(user_id, None)
@@ -1,6 +1,10 @@
+import importlib.util
 import logging
 import os
+import threading
+import time
 
+from django.conf import settings
 from openai import OpenAI
 
 logger = logging.getLogger(__name__)
@@ -8,22 +12,208 @@ logger = logging.getLogger(__name__)
 OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
 DEFAULT_MODEL = "openai/gpt-4o-mini"
 LLM_TIMEOUT = 180
+CONNECT_TIMEOUT = 10
 
+# Per-model request timeouts (seconds). Anything not listed uses LLM_TIMEOUT;
+# settings.LLM_MODEL_TIMEOUTS overrides/extends this map.
+MODEL_TIMEOUTS = {
+    "openai/gpt-4o-mini": 180,
+}
 
-def _client():
-    return OpenAI(
-        base_url=OPENROUTER_BASE_URL,
-        api_key=os.environ.get("OPENROUTER_API_KEY", ""),
+
+# ---------------------------------------------------------------------------
+# Process-wide pooled client
+# ---------------------------------------------------------------------------
+# One OpenAI client (and therefore one keep-alive HTTP connection pool) per
+# (base_url, api_key) per process. Building a client per call meant a fresh
+# TCP + TLS handshake on every planner / agentic-loop / embedding request.
+# Keyed on the pid so a gunicorn worker forked from a preloaded master never
+# reuses the parent's sockets.
+
+_clients: dict[tuple, OpenAI] = {}
+_clients_pid = None
+_clients_lock = threading.Lock()
+
+
+def _pool_setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _build_http_client():
+    """Shared httpx client with bounded pool, keep-alive and timing hooks.
+
+    Returns None when httpx can't be imported, in which case the OpenAI SDK
+    builds its own (still reused, since the OpenAI client itself is pooled).
+    """
+    try:
+        import httpx
+        from openai import DefaultHttpxClient
+    except ImportError:
+        return None
+
+    http2 = bool(_pool_setting("LLM_HTTP2", False)) and importlib.util.find_spec("h2") is not None
+    return DefaultHttpxClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=_pool_setting("LLM_POOL_MAX_CONNECTIONS", 50),
+            max_keepalive_connections=_pool_setting("LLM_POOL_MAX_KEEPALIVE", 20),
+            keepalive_expiry=_pool_setting("LLM_KEEPALIVE_EXPIRY", 90),
+        ),
+        timeout=httpx.Timeout(LLM_TIMEOUT, connect=CONNECT_TIMEOUT),
+        event_hooks={"request": [_attach_trace]},
     )
 
 
+def get_client(base_url=OPENROUTER_BASE_URL, api_key=None):
+    """Return the process-wide pooled OpenAI client for ``base_url``."""
+    global _clients_pid
+    if api_key is None:
+        api_key = os.environ.get("OPENROUTER_API_KEY", "")
+    key = (base_url, api_key)
+    with _clients_lock:
+        if _clients_pid != os.getpid():
+            _clients.clear()
+            _clients_pid = os.getpid()
+        client = _clients.get(key)
+        if client is None:
+            kwargs = {"api_key": api_key}
+            if base_url:
+                kwargs["base_url"] = base_url
+            http_client = _build_http_client()
+            if http_client is not None:
+                kwargs["http_client"] = http_client
+            client = OpenAI(**kwargs)
+            _clients[key] = client
+        return client
+
+
+def _client():
+    return get_client()
+
+
+def model_timeout(model):
+    timeouts = {**MODEL_TIMEOUTS, **(_pool_setting("LLM_MODEL_TIMEOUTS", None) or {})}
+    return timeouts.get(model, LLM_TIMEOUT)
+
+
+# ---------------------------------------------------------------------------
+# Per-call latency / TTFB metrics
+# ---------------------------------------------------------------------------
+# httpx emits connection-level trace events; we stamp the interesting ones on a
+# thread-local so each call can report total latency, time-to-first-byte and
+# how much of it was connection setup (0 when a pooled connection was reused).
+
+_local = threading.local()
+_metrics: dict[str, dict] = {}
+_metrics_lock = threading.Lock()
+
+
+def _trace(event_name, info):
+    marks = getattr(_local, "marks", None)
+    if marks is not None:
+        marks[event_name] = time.monotonic()
+
+
+def _attach_trace(request):
+    request.extensions["trace"] = _trace
+
+
+class CallTimer:
+    """Context manager timing one provider call; results land in ``.timing``."""
+
+    def __init__(self, model, kind="chat"):
+        self.model = model
+        self.kind = kind
+        self.timing = {}
+
+    def __enter__(self):
+        _local.marks = {}
+        self.t0 = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        total = time.monotonic() - self.t0
+        marks = getattr(_local, "marks", None) or {}
+        _local.marks = None
+
+        def _span(start, end):
+            if start in marks and end in marks:
+                return round((marks[end] - marks[start]) * 1000, 1)
+            return None
+
+        connect = 0.0
+        for start, end in (
+            ("connection.connect_tcp.started", "connection.connect_tcp.complete"),
+            ("connection.start_tls.started", "connection.start_tls.complete"),
+        ):
+            connect += _span(start, end) or 0.0
+        ttfb = _span("http11.send_request_headers.started", "http11.receive_response_headers.complete")
+        if ttfb is None:
+            ttfb = _span("http2.send_request_headers.started", "http2.receive_response_headers.complete")
+
+        self.timing = {
+            "latency_ms": round(total * 1000, 1),
+            "ttfb_ms": ttfb,
+            "connect_ms": round(connect, 1),
+            "new_connection": "connection.connect_tcp.started" in marks,
+        }
+        _record(self.model, self.kind, self.timing, failed=exc_type is not None)
+        logger.info(
+            "LLM %s model=%s latency=%.0fms ttfb=%s connect=%.0fms new_conn=%s%s",
+            self.kind, self.model, self.timing["latency_ms"],
+            f"{ttfb:.0f}ms" if ttfb is not None else "-",
+            self.timing["connect_ms"], self.timing["new_connection"],
+            " FAILED" if exc_type else "",
+        )
+        return False
+
+
+def _record(model, kind, timing, failed=False):
+    key = f"{kind}:{model}"
+    with _metrics_lock:
+        m = _metrics.setdefault(key, {
+            "calls": 0, "errors": 0, "new_connections": 0,
+            "latency_ms_total": 0.0, "ttfb_ms_total": 0.0, "connect_ms_total": 0.0,
+            "latency_ms_max": 0.0,
+        })
+        m["calls"] += 1
+        m["errors"] += 1 if failed else 0
+        m["new_connections"] += 1 if timing["new_connection"] else 0
+        m["latency_ms_total"] += timing["latency_ms"]
+        m["ttfb_ms_total"] += timing["ttfb_ms"] or 0.0
+        m["connect_ms_total"] += timing["connect_ms"]
+        m["latency_ms_max"] = max(m["latency_ms_max"], timing["latency_ms"])
+
+
+def llm_metrics_snapshot():
+    """Per "<kind>:<model>" aggregates for this process (averages in ms).
+
+    Shown on the staff AI debug page.
+    """
+    with _metrics_lock:
+        out = {}
+        for key, m in _metrics.items():
+            n = m["calls"] or 1
+            out[key] = {
+                "calls": m["calls"],
+                "errors": m["errors"],
+                "new_connections": m["new_connections"],
+                "avg_latency_ms": round(m["latency_ms_total"] / n, 1),
+                "avg_ttfb_ms": round(m["ttfb_ms_total"] / n, 1),
+                "avg_connect_ms": round(m["connect_ms_total"] / n, 1),
+                "max_latency_ms": m["latency_ms_max"],
+            }
+        return out
+
+
 def call_llm(messages, tools=None, model=None, temperature=0.7, max_tokens=1024):
     """
     Call OpenRouter (OpenAI-compatible).
 
     Returns:
         (response_message, usage_dict)
-        usage_dict: {"model": str, "input_tokens": int, "output_tokens": int}
+        usage_dict: {"model": str, "input_tokens": int, "output_tokens": int,
+                     "latency_ms": float, "ttfb_ms": float|None, "connect_ms": float}
     """
     model = model or DEFAULT_MODEL
 
@@ -32,12 +222,13 @@ def call_llm(messages, tools=None, model=None, temperature=0.7, max_tokens=1024)
         "messages": messages,
         "temperature": temperature,
         "max_tokens": max_tokens,
-        "timeout": LLM_TIMEOUT,
+        "timeout": model_timeout(model),
     }
     if tools:
         kwargs["tools"] = tools
 
-    response = _client().chat.completions.create(**kwargs)
+    with CallTimer(model) as timer:
+        response = _client().chat.completions.create(**kwargs)
     msg = response.choices[0].message
     usage = response.usage
 
@@ -45,4 +236,79 @@ def call_llm(messages, tools=None, model=None, temperature=0.7, max_tokens=1024)
         "model": model,
         "input_tokens": usage.prompt_tokens if usage else 0,
         "output_tokens": usage.completion_tokens if usage else 0,
+        "latency_ms": timer.timing["latency_ms"],
+        "ttfb_ms": timer.timing["ttfb_ms"],
+        "connect_ms": timer.timing["connect_ms"],
     }
+
+
+class LLMStream:
+    """Streaming chat completion. Iterate for text deltas; once exhausted,
+    ``message`` and ``usage`` hold the same shapes ``call_llm`` returns
+    (tool calls are reassembled from their streamed fragments)."""
+
+    def __init__(self, kwargs, model):
+        self._kwargs = kwargs
+        self.model = model
+        self.message = None
+        self.usage = None
+
+    def __iter__(self):
+        from openai.types.chat import ChatCompletionMessage
+
+        content = []
+        tool_calls = {}
+        raw_usage = None
+        with CallTimer(self.model, kind="chat_stream") as timer:
+            stream = _client().chat.completions.create(
+                stream=True, stream_options={"include_usage": True}, **self._kwargs
+            )
+            for chunk in stream:
+                if getattr(chunk, "usage", None):
+                    raw_usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                for tc in getattr(delta, "tool_calls", None) or []:
+                    slot = tool_calls.setdefault(tc.index, {"id": "", "name": "", "arguments": ""})
+                    if tc.id:
+                        slot["id"] = tc.id
+                    if tc.function is not None:
+                        slot["name"] += tc.function.name or ""
+                        slot["arguments"] += tc.function.arguments or ""
+                if delta.content:
+                    content.append(delta.content)
+                    yield delta.content
+
+        self.message = ChatCompletionMessage.model_validate({
+            "role": "assistant",
+            "content": "".join(content) or None,
+            "tool_calls": [
+                {"id": s["id"], "type": "function", "function": {"name": s["name"], "arguments": s["arguments"]}}
+                for _, s in sorted(tool_calls.items())
+            ] or None,
+        })
+        self.usage = {
+            "model": self.model,
+            "input_tokens": raw_usage.prompt_tokens if raw_usage else 0,
+            "output_tokens": raw_usage.completion_tokens if raw_usage else 0,
+            "latency_ms": timer.timing["latency_ms"],
+            "ttfb_ms": timer.timing["ttfb_ms"],
+            "connect_ms": timer.timing["connect_ms"],
+        }
+
+
+def call_llm_stream(messages, tools=None, model=None, temperature=0.7, max_tokens=1024):
+    """Streaming variant of ``call_llm``. Returns an ``LLMStream``; iterate it
+    for text deltas, then read ``.message`` / ``.usage``."""
+    model = model or DEFAULT_MODEL
+    kwargs = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "timeout": model_timeout(model),
+    }
+    if tools:
+        kwargs["tools"] = tools
+    return LLMStream(kwargs, model)
@@ -75,6 +75,20 @@ def _detect_lang(context) -> str:
     return (context.settings.agent_language or "bn") or "bn"
 
 
+def _complete(stream=None, **kwargs):
+    """``call_llm``, or its streaming variant feeding ``stream`` (a
+    streaming.StreamingReply) when one is given and still active."""
+    from .providers import call_llm, call_llm_stream
+
+    if stream is None or not stream.active:
+        return call_llm(**kwargs)
+    llm = call_llm_stream(**kwargs)
+    for delta in llm:
+        stream.feed(delta)
+    stream.end_turn(final=not getattr(llm.message, "tool_calls", None))
+    return llm.message, llm.usage
+
+
 class ResponseGenerator:
 
     @staticmethod
@@ -83,17 +97,22 @@ class ResponseGenerator:
         tool_results: list[ToolResult],
         reply_id: str | None = None,
         dry_run: bool = False,
+        stream=None,
     ) -> Response:
         """Generate a natural-language reply from tool results.
 
         Single LLM call with no tool access — prevents hallucination.
         For cases with empty/known data, uses template responses to save cost.
+
+        ``stream`` (a streaming.StreamingReply) receives the text as it is
+        generated, on text-only replies whose wording no later guard can
+        change; everything else is generated in one piece as before.
         """
         if not tool_results:
             # UNKNOWN messages get an LLM interpretation pass with full context
             # (memory + history + store) instead of a canned "didn't understand".
             if getattr(getattr(context, "intent", None), "name", "") == "UNKNOWN":
-                return ResponseGenerator._unknown_llm_reply(context, reply_id, dry_run)
+                return ResponseGenerator._unknown_llm_reply(context, reply_id, dry_run, stream=stream)
             return Response(text=ResponseGenerator._greeting_or_fallback(context))
 
         # Check for ticket creation (human handoff)
@@ -141,15 +160,23 @@ class ResponseGenerator:
         # and send images before replying.
         intent_name = context.intent.name if context.intent else ""
         if intent_name in _AGENTIC_INTENTS:
-            return ResponseGenerator._agentic_loop(context, tool_results, reply_id, dry_run)
+            return ResponseGenerator._agentic_loop(context, tool_results, reply_id, dry_run, stream=stream)
 
         # Build prompt from tool results
         prompt = ResponseGenerator._build_prompt(context, tool_results)
 
-        try:
-            from .providers import call_llm
+        # Extract images and card data from tool results
+        images, cards = ResponseGenerator._extract_media(tool_results)
+        images, cards = ResponseGenerator._media_for_intent(context, images, cards)
+        if images or cards:
+            # Visual replies go out media-first as a single bubble.
+            stream = None
 
-            msg, usage = call_llm(
+        try:
+            if stream is not None:
+                stream.begin()
+            msg, usage = _complete(
+                stream=stream,
                 messages=[{"role": "system", "content": prompt}],
                 tools=None,
                 model=context.model,
@@ -175,10 +202,6 @@ class ResponseGenerator:
             logger.error("ResponseGenerator LLM call failed: %s", exc)
             text = ResponseGenerator._fallback_text(tool_results, context)
 
-        # Extract images and card data from tool results
-        images, cards = ResponseGenerator._extract_media(tool_results)
-        images, cards = ResponseGenerator._media_for_intent(context, images, cards)
-
         # Safety: strip any image URLs / markdown images that slipped through
         text = _clean_media_markdown(text)
         if not text:
@@ -198,6 +221,7 @@ class ResponseGenerator:
         seed_results: list[ToolResult],
         reply_id: str | None = None,
         dry_run: bool = False,
+        stream=None,
     ) -> Response:
         """Agentic response generation for product intents.
 
@@ -212,8 +236,10 @@ class ResponseGenerator:
         - seed search empty & the model never searched → force one more search
         - reply claims to send images but send_images never ran → force fix
         - hard cap MAX_AGENT_ITERATIONS LLM calls per turn
+
+        An iteration is streamed only when none of the guards could reject
+        its text and the turn has no media to send.
         """
-        from .providers import call_llm
         from .tools import ToolRegistry
 
         system_prompt = ResponseGenerator._build_prompt(context, seed_results, agentic=True)
@@ -247,9 +273,20 @@ class ResponseGenerator:
             and any(r.tool == "search_products" for r in seed_results)
         ) else 0
 
+        if stream is not None:
+            stream.begin()
+
         for iteration in range(MAX_AGENT_ITERATIONS):
+            iteration_stream = None
+            if stream is not None and ResponseGenerator._loop_can_stream(
+                context, all_results, len(seed_results), seed_has_products,
+                seed_sent_images, search_forced, image_promise_corrected,
+                consecutive_misses,
+            ):
+                iteration_stream = stream
             try:
-                msg, usage = call_llm(
+                msg, usage = _complete(
+                    stream=iteration_stream,
                     messages=messages,
                     tools=tool_defs,
                     model=context.model,
@@ -411,6 +448,33 @@ class ResponseGenerator:
 
         return Response(text=final_text, images=images, cards=cards)
 
+    @staticmethod
+    def _loop_can_stream(context, all_results, n_seed, seed_has_products,
+                         seed_sent_images, search_forced, image_promise_corrected,
+                         consecutive_misses) -> bool:
+        """True when a text reply from the next agentic iteration would be
+        final as generated: no guard could send it back and no media rides
+        along (mirrors the guard conditions in ``_agentic_loop``)."""
+        loop_results = all_results[n_seed:]
+        loop_searched = any(r.tool == "search_products" for r in loop_results)
+        if (not seed_has_products and not loop_searched
+                and not search_forced and consecutive_misses < 2):
+            return False  # Guard 1 would force another search
+        if consecutive_misses >= 2:
+            return False  # Guard 1b may swap in the canned reply
+        loop_sent_images = any(
+            r.tool == "send_images" and r.state == "success"
+            and (r.data or {}).get("products")
+            for r in loop_results
+        )
+        if (not image_promise_corrected and not seed_sent_images
+                and not loop_sent_images
+                and ResponseGenerator._photo_requested(context)):
+            return False  # Guard 2 may ask for a rewrite
+        images, cards = ResponseGenerator._extract_media(all_results)
+        images, cards = ResponseGenerator._media_for_intent(context, images, cards)
+        return not (images or cards)
+
     @staticmethod
     def _search_meta_text(text: str) -> bool:
         """True when a draft reply leaks internal/tool meta-text to the
@@ -502,6 +566,7 @@ class ResponseGenerator:
         context: ConversationContext,
         reply_id: str | None = None,
         dry_run: bool = False,
+        stream=None,
     ) -> Response:
         """UNKNOWN messages get an LLM interpretation pass with full context —
         long-term memory, conversation history, store identity/context — so the
@@ -509,10 +574,11 @@ class ResponseGenerator:
         repeating "didn't understand". No tools, so nothing can be invented or
         executed. Falls back to the canned text when the LLM is unavailable."""
         try:
-            from .providers import call_llm
-
             prompt = ResponseGenerator._build_prompt(context, [], unclear=True)
-            msg, usage = call_llm(
+            if stream is not None:
+                stream.begin()
+            msg, usage = _complete(
+                stream=stream,
                 messages=[{"role": "system", "content": prompt}],
                 tools=None,
                 model=context.model,
@@ -0,0 +1,241 @@
+"""
+Semantic response cache for repeated store questions.
+
+Customers ask the same handful of things again and again ("delivery charge
+koto?", "return policy?", "ki ki ache"). For those intents a validated reply
+is cached and served again — skipping the planner, tools and response LLM —
+when a later question is a confident match:
+
+  * key: (conversation, intent, reply language, tenant context version). The
+    reply prompt carries the customer's name, memory and history, so a reply
+    is only ever served back to the conversation it was written for;
+  * match: identical normalized text, else embedding cosine >= MIN_SCORE;
+  * TTL + per-tenant LRU bound; tenants themselves are LRU-bounded.
+
+The context version is a fingerprint of everything a cached answer was built
+from — StoreConfig, BehaviorRules, AgentIdentity, the active RAG chunks and
+the tenant's CatalogVersion (bumped by every product write) — read from the
+database, so an edit made through any process invalidates entries
+everywhere. post_save/post_delete signals also drop the local entries right
+away (context/signals.py, back/signals.py).
+"""
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Intents whose answer is about store data — not the conversation state, an
+# order, or a specific product the customer named.
+CACHEABLE_INTENTS = frozenset({
+    "ASK_DELIVERY", "ASK_PAYMENT", "ASK_FAQ", "STORE_INFO", "CATALOG",
+})
+
+TTL_SECONDS = 6 * 3600
+MAX_ENTRIES_PER_TENANT = 200
+MAX_TENANTS = 1000
+MIN_SCORE = 0.95
+VERSION_TTL_SECONDS = 5.0   # re-read the DB fingerprint at most this often
+
+_PUNCT_RE = re.compile(r"[^\w\s]", re.UNICODE)
+_SPACE_RE = re.compile(r"\s+")
+
+_lock = threading.Lock()
+# {user_id: OrderedDict[(conversation_id, intent, lang, norm_text) -> CacheEntry]}
+_tenants: "OrderedDict[int, OrderedDict]" = OrderedDict()
+# {user_id: (read_at_monotonic, version)}
+_versions: dict[int, tuple[float, str]] = {}
+
+
+@dataclass
+class CacheEntry:
+    conversation_id: int
+    intent: str
+    lang: str
+    version: str
+    norm_text: str
+    embedding: list
+    text: str
+    images: list = field(default_factory=list)
+    cards: list = field(default_factory=list)
+    credits: float = 0.0
+    created: float = field(default_factory=time.monotonic)
+    hits: int = 0
+
+
+@dataclass
+class CacheLookup:
+    """One cacheable turn: the hit (if any) plus what ``store`` needs on a miss."""
+    user_id: int
+    conversation_id: int
+    intent: str
+    lang: str
+    version: str
+    norm_text: str
+    embedding: list | None = None
+    entry: CacheEntry | None = None
+    score: float = 0.0
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def normalize(text):
+    text = _PUNCT_RE.sub(" ", (text or "").lower())
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def context_version(user_id):
+    """Fingerprint of the tenant data a cached reply depends on."""
+    now = time.monotonic()
+    cached = _versions.get(user_id)
+    if cached and now - cached[0] < VERSION_TTL_SECONDS:
+        return cached[1]
+
+    from django.db.models import Count, Max
+
+    from back.models import CatalogVersion
+    from context.models import AgentIdentity, BehaviorRules, RAGChunk, StoreConfig
+
+    parts = [
+        StoreConfig.objects.filter(user_id=user_id).values_list("updated_at", flat=True).first(),
+        BehaviorRules.objects.filter(user_id=user_id).values_list("updated_at", flat=True).first(),
+        AgentIdentity.objects.filter(user_id=user_id).values_list("updated_at", flat=True).first(),
+        tuple(RAGChunk.objects.filter(user_id=user_id, is_active=True).aggregate(
+            n=Count("id"), last=Max("updated_at"),
+        ).values()),
+        CatalogVersion.current(user_id),
+    ]
+    version = hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:16]
+    _versions[user_id] = (now, version)
+    return version
+
+
+def invalidate(user_id):
+    """Drop every cached reply for a tenant (signal handlers call this)."""
+    with _lock:
+        _tenants.pop(user_id, None)
+        _versions.pop(user_id, None)
+
+
+def clear():
+    with _lock:
+        _tenants.clear()
+        _versions.clear()
+
+
+def _key(item):
+    """Registry key of a CacheEntry or CacheLookup."""
+    return (item.conversation_id, item.intent, item.lang, item.norm_text)
+
+
+def _enabled():
+    return _setting("AI_RESPONSE_CACHE_ENABLED", True)
+
+
+def lookup(context, intent_name, text):
+    """Return a CacheLookup for a cacheable turn (``.entry`` set on a hit),
+    or None when this turn must not use the cache at all."""
+    if not _enabled() or intent_name not in CACHEABLE_INTENTS:
+        return None
+    norm = normalize(text)
+    if not norm:
+        return None
+
+    from .response import _detect_lang
+
+    user_id = context.user.pk
+    probe = CacheLookup(
+        user_id=user_id,
+        conversation_id=context.conversation.pk,
+        intent=intent_name,
+        lang=_detect_lang(context),
+        version=context_version(user_id),
+        norm_text=norm,
+    )
+    ttl = _setting("AI_RESPONSE_CACHE_TTL", TTL_SECONDS)
+    now = time.monotonic()
+
+    with _lock:
+        entries = _tenants.get(user_id)
+        if entries is None:
+            return probe
+        _tenants.move_to_end(user_id)
+        for key in [k for k, e in entries.items() if now - e.created > ttl or e.version != probe.version]:
+            del entries[key]
+        exact = entries.get(_key(probe))
+        if exact is not None:
+            entries.move_to_end(_key(probe))
+            exact.hits += 1
+            probe.entry, probe.score = exact, 1.0
+            return probe
+        candidates = [
+            e for e in entries.values()
+            if e.conversation_id == probe.conversation_id and e.intent == probe.intent
+            and e.lang == probe.lang and e.embedding
+        ]
+    if not candidates:
+        return probe
+
+    # Near-duplicate wording — only worth an embedding call when something
+    # with the same intent is cached.
+    from context.embeddings import generate_embedding
+    from context.search import cosine_similarity
+
+    probe.embedding = generate_embedding(norm)
+    if not probe.embedding:
+        return probe
+    best, best_score = None, 0.0
+    for e in candidates:
+        score = cosine_similarity(probe.embedding, e.embedding)
+        if score > best_score:
+            best, best_score = e, score
+    if best is not None and best_score >= _setting("AI_RESPONSE_CACHE_MIN_SCORE", MIN_SCORE):
+        with _lock:
+            entries = _tenants.get(user_id)
+            key = _key(best)
+            if entries is not None and entries.get(key) is best:
+                entries.move_to_end(key)
+                best.hits += 1
+                probe.entry, probe.score = best, best_score
+    return probe
+
+
+def store(probe, response, credits=0.0):
+    """Cache a validated reply for ``probe``'s question."""
+    if probe is None or probe.entry is not None or not (response and response.text):
+        return
+    if probe.embedding is None:
+        from context.embeddings import generate_embedding
+        probe.embedding = generate_embedding(probe.norm_text) or []
+
+    entry = CacheEntry(
+        conversation_id=probe.conversation_id,
+        intent=probe.intent,
+        lang=probe.lang,
+        version=probe.version,
+        norm_text=probe.norm_text,
+        embedding=probe.embedding,
+        text=response.text,
+        images=list(response.images or []),
+        cards=list(response.cards or []),
+        credits=float(credits or 0),
+    )
+    max_entries = _setting("AI_RESPONSE_CACHE_MAX_ENTRIES", MAX_ENTRIES_PER_TENANT)
+    with _lock:
+        entries = _tenants.setdefault(probe.user_id, OrderedDict())
+        _tenants.move_to_end(probe.user_id)
+        entries[_key(entry)] = entry
+        entries.move_to_end(_key(entry))
+        while len(entries) > max_entries:
+            entries.popitem(last=False)
+        while len(_tenants) > MAX_TENANTS:
+            evicted, _ = _tenants.popitem(last=False)
+            _versions.pop(evicted, None)
@@ -1,10 +1,18 @@
 import json
 import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlsplit
 
 import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
 
 from back.models import Integration
 
+from . import media_cache
+
 logger = logging.getLogger(__name__)
 
 GRAPH_API_BASE = "https://graph.facebook.com/v19.0"
@@ -21,7 +29,7 @@ _MAX_IMAGE_BYTES = 15 * 1024 * 1024
 def _download_image(url, timeout=25):
     """Download image bytes for binary upload. Returns (bytes|None, error|None)."""
     try:
-        resp = requests.get(
+        resp = _session(url).get(
             url, timeout=timeout,
             headers={"User-Agent": _IMAGE_UA, "Accept": "image/*"},
         )
@@ -34,6 +42,114 @@ def _download_image(url, timeout=25):
         return None, str(exc)[:100]
 
 
+# ---------------------------------------------------------------------------
+# Delivery plumbing: pooled connections, media prefetch, rate limits
+#
+# Everything the customer sees (cards, images, texts) is still sent one
+# request at a time, in order. What they do not see — downloading catalog
+# images and uploading WhatsApp media — runs on a shared pool as soon as a
+# reply starts, so a 5-image reply costs one download/upload round in
+# parallel plus five small sends instead of five sequential round trips.
+# ---------------------------------------------------------------------------
+
+POOL_MAXSIZE = 16               # keep-alive connections per platform/CDN host
+DELIVERY_WORKERS = 8            # shared prefetch pool (SENDER_DELIVERY_WORKERS; 0 = inline)
+RATE_LIMIT_MAX_WAIT = 10.0      # longest a send waits out a platform backoff
+RATE_LIMIT_DEFAULT_BACKOFF = 2.0
+# Graph API throttling codes (app/page/account level, WhatsApp throughput).
+_GRAPH_RATE_LIMIT_CODES = {4, 17, 32, 613, 80006, 130429}
+
+_sessions: dict[str, requests.Session] = {}
+_pool = None
+_lock = threading.Lock()
+_backoff_until: dict[int, float] = {}   # integration pk -> time.monotonic()
+
+
+def _session(url) -> requests.Session:
+    """Keep-alive session shared by every send to ``url``'s host."""
+    host = urlsplit(url).netloc
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host] = session
+        return session
+
+
+def _get_pool():
+    global _pool
+    size = getattr(settings, "SENDER_DELIVERY_WORKERS", DELIVERY_WORKERS)
+    if size <= 0:
+        return None
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=size, thread_name_prefix="delivery")
+        return _pool
+
+
+def _prefetch(fn, items):
+    """Start ``fn(item)`` for every item; returns futures in item order."""
+    pool = _get_pool()
+    if pool is not None:
+        return [pool.submit(fn, item) for item in items]
+    done = []
+    for item in items:
+        future = Future()
+        future.set_result(fn(item))
+        done.append(future)
+    return done
+
+
+def _retry_after(resp):
+    """Seconds to back off when ``resp`` says we are rate limited, else None."""
+    try:
+        body = resp.json()
+    except ValueError:
+        body = None
+    if not isinstance(body, dict):     # error pages and proxies answer with anything
+        body = {}
+    if resp.status_code != 429:
+        error = body.get("error")
+        if not isinstance(error, dict) or error.get("code") not in _GRAPH_RATE_LIMIT_CODES:
+            return None
+    try:
+        return float(resp.headers["Retry-After"])
+    except (KeyError, ValueError):
+        pass
+    try:
+        return float(body["parameters"]["retry_after"])   # Telegram
+    except (KeyError, TypeError, ValueError):
+        return RATE_LIMIT_DEFAULT_BACKOFF
+
+
+def _wait_backoff(key):
+    if key is None:
+        return
+    with _lock:
+        remaining = _backoff_until.get(key, 0.0) - time.monotonic()
+    if remaining > 0:
+        time.sleep(min(remaining, RATE_LIMIT_MAX_WAIT))
+
+
+def _request(url, key=None, timeout=10, **kwargs):
+    """POST through the pooled session. A rate-limited answer puts the
+    integration ``key`` on backoff (shared by every send of that integration
+    in this process) and is retried once after waiting it out."""
+    for attempt in range(2):
+        _wait_backoff(key)
+        resp = _session(url).post(url, timeout=timeout, **kwargs)
+        delay = _retry_after(resp) if not resp.ok else None
+        if delay is None or key is None or attempt:
+            return resp
+        with _lock:
+            _backoff_until[key] = max(_backoff_until.get(key, 0.0), time.monotonic() + delay)
+        logger.warning("Platform rate limit integration=%s — backing off %.1fs", key, delay)
+    return resp
+
+
 def _normalize_texts(text):
     if text is None:
         return []
@@ -84,6 +200,56 @@ def send_reply(conversation, text, image_urls=None, product_cards=None):
     return result
 
 
+def send_typing(conversation):
+    """Show the platform's typing indicator to the customer.
+
+    Used while a streamed reply is still being generated. Best effort: returns
+    True when the platform accepted the request, never raises.
+    """
+    platform = conversation.platform
+    try:
+        integration = Integration.get_active(conversation.user, platform)
+        if not integration or not integration.access_token:
+            return False
+        token = integration.access_token
+        if platform in ("messenger", "instagram"):
+            ok, _ = _post(f"{GRAPH_API_BASE}/me/messages", {"Authorization": f"Bearer {token}"}, {
+                "recipient": {"id": conversation.customer_id},
+                "sender_action": "typing_on",
+            })
+            return ok
+        if platform == "telegram":
+            ok, _ = _post(f"https://api.telegram.org/bot{token}/sendChatAction", {}, {
+                "chat_id": conversation.customer_id, "action": "typing",
+            })
+            return ok
+        if platform == "whatsapp":
+            # WhatsApp ties the indicator to the customer's last inbound message
+            # (it also marks that message as read).
+            from back.models import Message
+            wamid = (
+                Message.objects.filter(conversation=conversation, sender="customer")
+                .exclude(mid__isnull=True).exclude(mid="")
+                .order_by("-timestamp").values_list("mid", flat=True).first()
+            )
+            if not wamid:
+                return False
+            ok, _ = _post(
+                f"{GRAPH_API_BASE}/{integration.integration_id}/messages",
+                {"Authorization": f"Bearer {token}", "Content-Type": "application/json"},
+                {
+                    "messaging_product": "whatsapp",
+                    "status": "read",
+                    "message_id": wamid,
+                    "typing_indicator": {"type": "text"},
+                },
+            )
+            return ok
+    except Exception:
+        logger.exception("send_typing failed conv=%s platform=%s", conversation.pk, platform)
+    return False
+
+
 # ---------------------------------------------------------------------------
 # Platform senders
 # ---------------------------------------------------------------------------
@@ -94,53 +260,54 @@ def _whatsapp(conversation, integration, texts, image_urls, product_cards=None):
     url = f"{GRAPH_API_BASE}/{phone_number_id}/messages"
     headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
     to = conversation.customer_id
+    key = integration.pk
 
     sent = {"cards": 0, "images": 0, "texts": 0}
     errors = []
 
+    # Upload every image not cached yet as media up front; the link is the
+    # fallback.
+    images = _public_urls(image_urls)[:5]
+    cached = media_cache.lookup(integration, images)
+    uncached = [u for u in images if u not in cached]
+    uploads = dict(zip(uncached, _prefetch(lambda img_url: _whatsapp_upload_media(url, headers, img_url, key), uncached)))
+
+    def send_image(image):
+        return _post(url, headers, {"messaging_product": "whatsapp", "to": to, "type": "image", "image": image}, key)
+
     # WhatsApp has no card carousel — send each product's first image with a
     # name + price caption as a fallback.
     for card in (product_cards or [])[:5]:
-        images = _public_urls(card.get("images"))
-        if not images:
+        card_images = _public_urls(card.get("images"))
+        if not card_images:
             continue
-        ok, err = _post(url, headers, {
-            "messaging_product": "whatsapp",
-            "to": to,
-            "type": "image",
-            "image": {"link": images[0], "caption": _card_caption(card)},
-        })
+        ok, err = send_image({"link": card_images[0], "caption": _card_caption(card)})
         if ok:
             sent["cards"] += 1
         else:
             errors.append(err)
 
-    for img_url in _public_urls(image_urls)[:5]:
-        ok, err = _post(url, headers, {
-            "messaging_product": "whatsapp",
-            "to": to,
-            "type": "image",
-            "image": {"link": img_url},
-        })
-        if ok:
-            sent["images"] += 1
+    for img_url in images:
+        media_err = None
+        if img_url in cached:
+            ok, err = send_image({"id": cached[img_url]})
+            if not ok:
+                # Revoked before its expiry — drop it and send the link.
+                media_cache.forget(integration, img_url)
+                ok, err = send_image({"link": img_url})
         else:
-            media_id, media_err = _whatsapp_upload_media(url, headers, img_url)
+            media_id, media_err = uploads[img_url].result()
             if media_id:
-                ok2, err2 = _post(url, headers, {
-                    "messaging_product": "whatsapp",
-                    "to": to,
-                    "type": "image",
-                    "image": {"id": media_id},
-                })
-                if ok2:
-                    sent["images"] += 1
-                else:
-                    errors.append(err2)
+                media_cache.remember(integration, img_url, media_id)
             else:
-                errors.append(err)
-                if media_err:
-                    errors.append(media_err)
+                logger.warning("WA media upload failed for %s (%s) — sending link", img_url, media_err)
+            ok, err = send_image({"id": media_id} if media_id else {"link": img_url})
+        if ok:
+            sent["images"] += 1
+        else:
+            errors.append(err)
+            if media_err:
+                errors.append(media_err)
 
     for text in texts:
         ok, err = _post(url, headers, {
@@ -148,7 +315,7 @@ def _whatsapp(conversation, integration, texts, image_urls, product_cards=None):
             "to": to,
             "type": "text",
             "text": {"body": text, "preview_url": False},
-        })
+        }, key)
         if ok:
             sent["texts"] += 1
         else:
@@ -162,10 +329,16 @@ def _messenger(conversation, integration, texts, image_urls, product_cards=None)
     url = f"{GRAPH_API_BASE}/me/messages"
     headers = {"Authorization": f"Bearer {token}"}
     recipient = {"id": conversation.customer_id}
+    key = integration.pk
 
     sent = {"cards": 0, "images": 0, "texts": 0}
     errors = []
 
+    images = _public_urls(image_urls)[:5]
+    cached = media_cache.lookup(integration, images)
+    uncached = [u for u in images if u not in cached]
+    downloads = dict(zip(uncached, _prefetch(_download_image, uncached)))
+
     # Send product cards as a generic template carousel (max 10 elements)
     if product_cards:
         elements = []
@@ -202,21 +375,30 @@ def _messenger(conversation, integration, texts, image_urls, product_cards=None)
                         },
                     }
                 },
-            })
+            }, key)
             if ok:
                 sent["cards"] += 1
             else:
                 errors.append(err)
 
-    for img_url in _public_urls(image_urls)[:5]:
-        ok, err = _messenger_send_image(url, headers, recipient, img_url)
+    for img_url in images:
+        if img_url in cached:
+            ok, err = _post(url, headers, {
+                "recipient": recipient,
+                "message": {"attachment": {"type": "image", "payload": {"attachment_id": cached[img_url]}}},
+            }, key)
+            if not ok:
+                media_cache.forget(integration, img_url)
+                ok, err = _messenger_send_image(url, headers, recipient, img_url, _download_image(img_url), integration)
+        else:
+            ok, err = _messenger_send_image(url, headers, recipient, img_url, downloads[img_url].result(), integration)
         if ok:
             sent["images"] += 1
         else:
             errors.append(err)
 
     for text in texts:
-        ok, err = _post(url, headers, {"recipient": recipient, "message": {"text": text}})
+        ok, err = _post(url, headers, {"recipient": recipient, "message": {"text": text}}, key)
         if ok:
             sent["texts"] += 1
         else:
@@ -225,14 +407,17 @@ def _messenger(conversation, integration, texts, image_urls, product_cards=None)
     return {"ok": not errors, "sent": sent, "errors": errors}
 
 
-def _messenger_send_image(url, headers, recipient, img_url):
+def _messenger_send_image(url, headers, recipient, img_url, download, integration):
     """Send one image to Messenger. Binary upload first (the platform cannot
-    fetch many external CDNs — ERP etc. — by URL), URL payload as fallback."""
-    data, err = _download_image(img_url)
+    fetch many external CDNs — ERP etc. — by URL), URL payload as fallback.
+    ``download`` is the prefetched ``_download_image`` result; the returned
+    attachment id is cached for the next send of the same image."""
+    key = integration.pk
+    data, err = download
     if data is not None:
         try:
-            resp = requests.post(
-                url,
+            resp = _request(
+                url, key,
                 headers=headers,
                 params={"access_token": _bearer_token(headers)},
                 timeout=45,
@@ -245,6 +430,10 @@ def _messenger_send_image(url, headers, recipient, img_url):
                 },
             )
             if resp.ok:
+                try:
+                    media_cache.remember(integration, img_url, resp.json().get("attachment_id"))
+                except ValueError:
+                    pass
                 return True, None
             msg = f"{url} binary upload: {resp.text[:200]}"
             logger.warning("Platform send failed %s", msg)
@@ -259,7 +448,7 @@ def _messenger_send_image(url, headers, recipient, img_url):
     return _post(url, headers, {
         "recipient": recipient,
         "message": {"attachment": {"type": "image", "payload": {"url": img_url, "is_reusable": True}}},
-    })
+    }, key)
 
 
 def _bearer_token(headers):
@@ -274,33 +463,45 @@ def _telegram(conversation, integration, texts, image_urls, product_cards=None):
     token = integration.access_token
     chat_id = conversation.customer_id
     base = f"https://api.telegram.org/bot{token}"
+    key = integration.pk
 
     sent = {"cards": 0, "images": 0, "texts": 0}
     errors = []
 
+    images = _public_urls(image_urls)[:5]
+    cached = media_cache.lookup(integration, images)
+    uncached = [u for u in images if u not in cached]
+    downloads = dict(zip(uncached, _prefetch(_download_image, uncached)))
+
     # Telegram has no card carousel — send each product's first image with a
     # name + price caption as a fallback.
     for card in (product_cards or [])[:5]:
-        images = _public_urls(card.get("images"))
-        if not images:
+        card_images = _public_urls(card.get("images"))
+        if not card_images:
             continue
         ok, err = _post(f"{base}/sendPhoto", {}, {
-            "chat_id": chat_id, "photo": images[0], "caption": _card_caption(card),
-        })
+            "chat_id": chat_id, "photo": card_images[0], "caption": _card_caption(card),
+        }, key)
         if ok:
             sent["cards"] += 1
         else:
             errors.append(err)
 
-    for img_url in _public_urls(image_urls)[:5]:
-        ok, err = _telegram_send_photo(base, chat_id, img_url)
+    for img_url in images:
+        if img_url in cached:
+            ok, err = _post(f"{base}/sendPhoto", {}, {"chat_id": chat_id, "photo": cached[img_url]}, key)
+            if not ok:
+                media_cache.forget(integration, img_url)
+                ok, err = _telegram_send_photo(base, chat_id, img_url, _download_image(img_url), integration)
+        else:
+            ok, err = _telegram_send_photo(base, chat_id, img_url, downloads[img_url].result(), integration)
         if ok:
             sent["images"] += 1
         else:
             errors.append(err)
 
     for text in texts:
-        ok, err = _post(f"{base}/sendMessage", {}, {"chat_id": chat_id, "text": text})
+        ok, err = _post(f"{base}/sendMessage", {}, {"chat_id": chat_id, "text": text}, key)
         if ok:
             sent["texts"] += 1
         else:
@@ -309,7 +510,7 @@ def _telegram(conversation, integration, texts, image_urls, product_cards=None):
     return {"ok": not errors, "sent": sent, "errors": errors}
 
 
-def _whatsapp_upload_media(url, headers, img_url):
+def _whatsapp_upload_media(url, headers, img_url, key=None):
     """Download an image and upload it to WhatsApp as reusable media.
     Returns (media_id|None, error|None)."""
     data, err = _download_image(img_url)
@@ -319,8 +520,10 @@ def _whatsapp_upload_media(url, headers, img_url):
         import re as _re
         mime = "image/png" if img_url.lower().endswith(".png") else "image/jpeg"
         upload_url = _re.sub(r"/messages$", "/media", url)
-        resp = requests.post(
-            upload_url, headers=headers, timeout=45,
+        # Content-Type must be the multipart boundary requests sets itself.
+        upload_headers = {k: v for k, v in headers.items() if k != "Content-Type"}
+        resp = _request(
+            upload_url, key, headers=upload_headers, timeout=45,
             files={"file": ("image.jpg", data, mime)},
             data={"messaging_product": "whatsapp", "type": mime},
         )
@@ -331,25 +534,33 @@ def _whatsapp_upload_media(url, headers, img_url):
         return None, f"WA media upload error: {exc}"
 
 
-def _telegram_send_photo(base, chat_id, img_url):
-    """Send one photo to Telegram. Binary upload first, URL as fallback."""
-    data, err = _download_image(img_url)
+def _telegram_send_photo(base, chat_id, img_url, download, integration):
+    """Send one photo to Telegram. Binary upload first, URL as fallback.
+    ``download`` is the prefetched ``_download_image`` result; the uploaded
+    photo's file_id is cached for the next send of the same image."""
+    key = integration.pk
+    data, err = download
     if data is not None:
         try:
-            resp = requests.post(
-                f"{base}/sendPhoto",
+            resp = _request(
+                f"{base}/sendPhoto", key,
                 timeout=45,
                 data={"chat_id": chat_id},
                 files={"photo": ("photo.jpg", data, "image/jpeg")},
             )
             if resp.ok:
+                try:
+                    photo = resp.json()["result"]["photo"]
+                    media_cache.remember(integration, img_url, photo[-1]["file_id"])   # largest size
+                except (ValueError, KeyError, IndexError, TypeError):
+                    pass
                 return True, None
             return False, f"sendPhoto binary: {resp.text[:200]}"
         except requests.RequestException as exc:
             return False, f"sendPhoto binary request error: {exc}"
 
     logger.warning("%s image download failed (%s) — URL fallback", img_url, err)
-    return _post(f"{base}/sendPhoto", {}, {"chat_id": chat_id, "photo": img_url})
+    return _post(f"{base}/sendPhoto", {}, {"chat_id": chat_id, "photo": img_url}, key)
 
 
 def _card_caption(card):
@@ -359,10 +570,13 @@ def _card_caption(card):
     return f"{name} — ৳{price}" if price else name
 
 
-def _post(url, headers, payload):
-    """POST to a platform API. Returns (ok, error_message_or_None)."""
+def _post(url, headers, payload, key=None):
+    """POST to a platform API. Returns (ok, error_message_or_None).
+
+    ``key`` (the integration pk) opts into rate-limit backoff and retry.
+    """
     try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=10)
+        resp = _request(url, key, headers=headers, json=payload)
         if not resp.ok:
             msg = f"{url} {payload.get('type', '')}: {resp.text[:200]}"
             logger.warning("Platform send failed %s", msg)
@@ -91,9 +91,19 @@ def get_stage(conversation) -> str:
 
 
 def get_session(conversation):
-    """Get (or create) the SessionContext for a conversation (P1-9 wiring)."""
+    """Get (or create) the SessionContext for a conversation (P1-9 wiring).
+
+    The row is cached on the conversation object (``conversation.session``,
+    also filled by ``select_related("session")``), so every step of a turn
+    shares one query and one instance.
+    """
     from context.models import SessionContext
+    try:
+        return conversation.session
+    except SessionContext.DoesNotExist:
+        pass
     session, _ = SessionContext.objects.get_or_create(conversation=conversation)
+    conversation.session = session
     return session
 
 
@@ -958,7 +968,7 @@ class WorkflowEngine:
         try:
             from api.products.factory import get_active_source, get_provider, is_external
             source = get_active_source(conversation.user)
-            if source and source.mode == "live" and is_external(conversation.user):
+            if source and source.reads_live and is_external(conversation.user):
                 r = get_provider(conversation.user).get_product(pid)
                 if r:
                     return cls._dedupe_variations(r.get("variations") or [])
@@ -0,0 +1,170 @@
+"""
+Early partial send for streamed replies.
+
+The ResponseGenerator streams text-only replies token by token; a
+``StreamingReply`` buffers the deltas and, as soon as a paragraph (or, in a
+long paragraph, a sentence) is finished, runs it through
+``ResponseValidator.check_chunk`` and sends it as its own bubble — the customer
+starts reading while the model is still writing. A typing indicator is kept
+up in between.
+
+Anything that fails the chunk check stops early sending for the rest of the
+turn; the remainder then goes out through the normal final gate
+(``ResponseValidator.validate`` → ``Orchestrator._save_and_send``). Only the
+text after the delivered parts (``remaining_text``, or ``undelivered_text``
+when the reply no longer continues them) is gated and sent.
+"""
+import logging
+import re
+import time
+
+from django.utils import timezone
+
+from .validator import ResponseValidator
+
+logger = logging.getLogger(__name__)
+
+# The final reply is capped at 3 bubbles (pipeline._split_text_messages); keep
+# at least one for the remainder, which may still be corrected.
+MAX_EARLY_PARTS = 2
+# Inside a long paragraph, flush at the last finished sentence once this much
+# text is buffered.
+SENTENCE_FLUSH_CHARS = 160
+# Platforms drop the typing indicator after a few seconds or on each message.
+TYPING_REFRESH_SECONDS = 5.0
+
+_SENTENCE_END_RE = re.compile(r"(?<!\d)[।!?.](?=\s)")
+
+
+class StreamingReply:
+    """Sink for one turn's streamed reply. Never raises into the generator."""
+
+    def __init__(self, conversation, context, send=None, typing=None):
+        if send is None or typing is None:
+            from .sender import send_reply, send_typing
+            send = send or send_reply
+            typing = typing or send_typing
+        self.conversation = conversation
+        self.context = context
+        self._send = send
+        self._typing = typing
+        self.active = True
+        self.buffer = ""
+        self.sent_parts: list[str] = []
+        self.deliveries: list[dict] = []
+        self.first_sent_at = None
+        self.stop_reason = ""
+        self._last_typing = 0.0
+
+    # -- generator side -----------------------------------------------------
+
+    def begin(self):
+        """Generation is starting — show the typing indicator."""
+        if self.active:
+            self._keep_typing(force=True)
+
+    def feed(self, delta):
+        if not self.active or not delta:
+            return
+        self.buffer += delta
+        while self.active and len(self.sent_parts) < MAX_EARLY_PARTS:
+            part = self._take_part()
+            if part is None:
+                break
+            self._flush(part)
+        if self.active:
+            self._keep_typing()
+
+    def end_turn(self, final):
+        """One LLM call finished. For a non-final call (it asked for tools)
+        the buffered text is discarded; if something already went out, early
+        sending stops because later text may no longer follow on from it."""
+        self.buffer = ""
+        if not final and self.sent_parts:
+            self._stop("tool_call_after_send")
+
+    # -- final send side ----------------------------------------------------
+
+    def remaining_text(self, final_text):
+        """The part of ``final_text`` not yet delivered, or None when the
+        streamed parts are not a verbatim prefix of it (the final gate
+        rewrote the reply)."""
+        final_text = final_text or ""
+        cursor = 0
+        for part in self.sent_parts:
+            idx = final_text.find(part, cursor)
+            if idx < 0 or final_text[cursor:idx].strip():
+                return None
+            cursor = idx + len(part)
+        return final_text[cursor:].strip()
+
+    def undelivered_text(self, final_text):
+        """``final_text`` without the parts already sent — what is left to
+        send when ``remaining_text`` finds the reply was rewritten."""
+        rest = final_text or ""
+        for part in self.sent_parts:
+            rest = rest.replace(part, "", 1)
+        return "\n\n".join(p.strip() for p in re.split(r"\n\s*\n", rest) if p.strip())
+
+    def summary(self):
+        return {
+            "parts": len(self.sent_parts),
+            "stopped": self.stop_reason or None,
+            "deliveries": self.deliveries,
+        }
+
+    # -- internals ----------------------------------------------------------
+
+    def _take_part(self):
+        head, sep, rest = self.buffer.partition("\n\n")
+        if sep:
+            self.buffer = rest
+            return head.strip() or self._take_part()
+        if len(self.buffer) >= SENTENCE_FLUSH_CHARS:
+            ends = list(_SENTENCE_END_RE.finditer(self.buffer))
+            if ends:
+                cut = ends[-1].end()
+                part, self.buffer = self.buffer[:cut].strip(), self.buffer[cut:]
+                return part or None
+        return None
+
+    def _flush(self, part):
+        issues = ResponseValidator.check_chunk(
+            part, self.context, sent_chars=sum(len(p) for p in self.sent_parts),
+        )
+        if issues:
+            self._stop(",".join(issues))
+            return
+        try:
+            delivery = self._send(self.conversation, [part])
+        except Exception:
+            logger.exception("Streamed part send failed conv=%s", self.conversation.pk)
+            self._stop("send_failed")
+            return
+        if not (delivery or {}).get("ok"):
+            # Not delivered — let the final send carry this part.
+            self.deliveries.append(delivery)
+            self._stop("send_failed")
+            return
+        if self.first_sent_at is None:
+            self.first_sent_at = timezone.now()
+        self.sent_parts.append(part)
+        self.deliveries.append(delivery)
+        self._last_typing = 0.0  # a new message clears the indicator
+
+    def _stop(self, reason):
+        if self.active:
+            logger.info("Streaming stopped conv=%s after %d part(s): %s",
+                        self.conversation.pk, len(self.sent_parts), reason)
+        self.active = False
+        self.stop_reason = self.stop_reason or reason
+
+    def _keep_typing(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_typing < TYPING_REFRESH_SECONDS:
+            return
+        self._last_typing = now
+        try:
+            self._typing(self.conversation)
+        except Exception:
+            logger.debug("Typing indicator failed conv=%s", self.conversation.pk, exc_info=True)
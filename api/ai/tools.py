@@ -1,15 +1,16 @@
 import json
 import logging
 import re
+import threading
 import time
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from difflib import SequenceMatcher
 from typing import Any
 
 from django.core.files.storage import default_storage
 from django.db import transaction
-from django.db.models import DecimalField, F, Q, Value
-from django.db.models.functions import Coalesce
+from django.db.models import F, Q, Value
 
 from back.models import Conversation, OrderItem, Product, ProductImages, Sale
 from context.models import AgentIdentity, StoreConfig, BehaviorRules
@@ -58,6 +59,9 @@ class BaseTool:
     permission: str = "public"  # "public" | "customer" | "staff" | "manager" | "owner"
     timeout_ms: int = 10000
     retry_count: int = 1
+    # Writes state (orders, tickets, customer records). The Executor never runs
+    # these concurrently with other plan steps.
+    side_effects: bool = False
 
     def execute(self, args: dict, user, conversation) -> ToolResult:
         raise NotImplementedError
@@ -379,37 +383,26 @@ def _tok_matches_name(tok, word):
 def _latinized_search(user, query, limit=10):
     """Romanized-Bengali query → Bengali product names.
 
-    "lebur achar" can never match a catalog named "লেবুর আচার" through the DB
-    icontains, so latinize each product name and score the query's meaningful
-    tokens against its words. Only the top-scoring tier is returned — a
-    distinctive query ("lebur achar") then yields just লেবুর আচার instead of
-    every product that merely shares the category word ("achar"). Pure-English
-    queries (and pure-Bengali ones — the DB handles those) return nothing,
-    keeping this a narrow bridge instead of a second full search.
+    "lebur achar" can never match a catalog named "লেবুর আচার" through a
+    substring match, so the query's meaningful tokens are scored against each
+    product's latinized name words (precomputed by the product index). Only
+    the top-scoring tier is returned — a distinctive query ("lebur achar")
+    then yields just লেবুর আচার instead of every product that merely shares
+    the category word ("achar"). Pure-English queries (and pure-Bengali ones —
+    the substring match handles those) return nothing, keeping this a narrow
+    bridge instead of a second full search.
     """
     tokens = _content_tokens(query)
     if not tokens:
         return []
-    candidates = list(Product.objects.filter(user=user, status=True)[:500])
-    scored = []
-    for p in candidates:
-        name_latin = _latinize_bn(p.name or "").lower()
-        if not name_latin:
-            continue
-        words = set(re.findall(r"[a-z0-9]+", name_latin))
-        if not words:
-            continue
-        score = 0
-        for tok in tokens:
-            if any(_tok_matches_name(tok, w) for w in words):
-                score += 1
-        if score:
-            scored.append((score, p))
-    scored.sort(key=lambda x: x[0], reverse=True)
+    from . import product_index
+
+    index = product_index.get_index(user.pk)
+    scored = index.latin_matches(tokens)
     if not scored:
         return []
-    top = scored[0][0]
-    return [_product_row(p) for s, p in scored if s == top][:limit]
+    top = max(scored.values())
+    return [dict(index.docs[i].row) for i in sorted(scored) if scored[i] == top][:limit]
 
 
 
@@ -482,6 +475,33 @@ def _build_focus_payload(product, full=True):
     return payload
 
 
+# Plan steps run concurrently on one shared Conversation. While the executor
+# runs a step it installs a list here: focus changes are recorded instead of
+# written, and the executor applies them in plan order (apply_focus_changes).
+_focus_local = threading.local()
+
+
+@contextmanager
+def deferred_focus(changes):
+    """Record this thread's focus changes into ``changes`` instead of
+    writing them to the conversation."""
+    previous = getattr(_focus_local, "changes", None)
+    _focus_local.changes = changes
+    try:
+        yield changes
+    finally:
+        _focus_local.changes = previous
+
+
+def apply_focus_changes(conversation, changes):
+    """Write focus changes recorded under ``deferred_focus``, in order."""
+    for products in changes:
+        if products:
+            _focus_products(conversation, products)
+        else:
+            _clear_focus_product(conversation)
+
+
 def _focus_products(conversation, products):
     """Prepend ``products`` (row/details dicts) to the rolling focus list.
 
@@ -493,6 +513,10 @@ def _focus_products(conversation, products):
     incoming = [p for p in products if p and p.get("pid")]
     if not incoming:
         return
+    deferred = getattr(_focus_local, "changes", None)
+    if deferred is not None:
+        deferred.append(incoming)
+        return
 
     existing = parse_focus_products(conversation.current_product)
     ordered, seen = [], set()
@@ -518,6 +542,10 @@ def _focus_products(conversation, products):
 def _clear_focus_product(conversation):
     if not conversation:
         return
+    deferred = getattr(_focus_local, "changes", None)
+    if deferred is not None:
+        deferred.append([])
+        return
     Conversation.objects.filter(pk=conversation.pk).update(current_product="")
     conversation.current_product = ""
 
@@ -895,7 +923,7 @@ def tool_search_products(user, query, limit=10, conversation=None, min_price=Non
     from api.products.factory import get_active_source, get_provider, is_external
     try:
         source = get_active_source(user)
-        if source and source.mode == "live" and is_external(user):
+        if source and source.reads_live and is_external(user):
             provider = get_provider(user)
             if not (query and query.strip()):
                 rows = provider.list_products(limit=limit)
@@ -935,28 +963,15 @@ def tool_search_products(user, query, limit=10, conversation=None, min_price=Non
                             )
                             return out
 
-            # Multi-strategy: try ALL successive query variations (don't break on
-            # first batch — the first variation can return irrelevant results
-            # while individual words match perfectly). Dedup by external_id.
-            all_results = []
-            seen_ids = set()
-            attempted = 0
-            errored = 0
-            for variation in _generate_search_queries(query):
-                if len(seen_ids) >= max_external_attempts * limit:
-                    break
-                attempted += 1
-                try:
-                    rows = provider.search(variation, limit)
-                    rows = rows or []
-                    for r in rows:
-                        eid = r.get("external_id")
-                        if eid and eid not in seen_ids:
-                            seen_ids.add(eid)
-                            all_results.append(_external_row(r))
-                except Exception:
-                    errored += 1
-                    logger.exception("External search failed for variation=%s", variation)
+            # Multi-strategy: try ALL query variations (don't stop at the first
+            # batch — the first variation can return irrelevant results while
+            # individual words match perfectly). They run concurrently on the
+            # shared search pool, deduped by external_id in variation order.
+            rows, attempted, errored = provider.search_many(
+                _generate_search_queries(query), limit,
+                want=max_external_attempts * limit,
+            )
+            all_results = [_external_row(r) for r in rows]
 
             all_results = _filter_by_budget(all_results, min_price, max_price)
             all_results = all_results[:limit]
@@ -1001,7 +1016,7 @@ def tool_search_products(user, query, limit=10, conversation=None, min_price=Non
         # LOCAL catalog (it belongs to a different store). Say unavailable.
         try:
             source = get_active_source(user)
-            if source and source.mode == "live" and is_external(user):
+            if source and source.reads_live and is_external(user):
                 return {
                     "products": [],
                     "total": 0,
@@ -1048,64 +1063,62 @@ def tool_search_products(user, query, limit=10, conversation=None, min_price=Non
             except Product.DoesNotExist:
                 _clear_focus_product(conversation)
 
-    # Generic / empty query → show featured first, then fill with anything
+    # Generic / empty query → show featured first, then fill with anything.
+    # Both paths read the tenant's in-memory product index (api/ai/product_index.py),
+    # which keeps the DB's featured-then-name order.
+    from . import product_index
+
+    index = product_index.get_index(user.pk)
     generic = _is_generic_catalog_query(query)
     if generic:
-        qs = Product.objects.filter(user=user, status=True).order_by("-featured_product", "name")
-        products_list = list(qs[:limit])
+        docs = index.docs[:limit]
     else:
-        # Multi-strategy: build one combined OR query across all variations and fields
-        combined_q = Q()
-        for variation in _generate_search_queries(query):
-            combined_q |= (
-                Q(name__icontains=variation)
-                | Q(description__icontains=variation)
-                | Q(pid__icontains=variation)
-                | Q(external_id__icontains=variation)
-            )
-        qs = Product.objects.filter(user=user, status=True).filter(combined_q).order_by("-featured_product", "name")
+        # Multi-strategy: any variation contained in name, description, pid or
+        # external_id matches (same set the icontains OR used to select).
+        variations = list(_generate_search_queries(query))
+        matched = index.match(variations)
 
         # Budget filter — use effective price (discounted if available, else price)
         if min_price is not None or max_price is not None:
-            qs = qs.annotate(
-                _eff_price=Coalesce("discounted_price", "price", output_field=DecimalField())
-            )
-            if min_price is not None:
-                qs = qs.filter(_eff_price__gte=min_price)
-            if max_price is not None:
-                qs = qs.filter(_eff_price__lte=max_price)
+            matched = {
+                i for i in matched
+                if (min_price is None or index.docs[i].eff_price >= min_price)
+                and (max_price is None or index.docs[i].eff_price <= max_price)
+            }
+
+        # BM25 relevance first; featured/name order breaks ties.
+        scores = index.scores(product_index.query_terms(query, variations), matched)
+        ranked = sorted(matched, key=lambda i: (-scores[i], i))
 
-        # Dedup by pid (the combined query can return the same product via different variations)
+        # Dedup by pid (two rows can share a pid across sources)
         seen = set()
-        products_list = []
-        for p in qs:
-            if p.pid not in seen:
-                seen.add(p.pid)
-                products_list.append(p)
-                if len(products_list) >= limit:
-                    break
-
-        # F6 relevance guard: the OR-combined query floods on loose tokens —
+        docs = []
+        for i in ranked:
+            doc = index.docs[i]
+            if doc.pid not in seen:
+                seen.add(doc.pid)
+                docs.append(doc)
+
+        # F6 relevance guard: the OR-combined match floods on loose tokens —
         # "Komlar achar nai?" matches every "achar" product. When the query has
         # ≥2 meaningful tokens, only keep products that match at least half of
         # them (name tokens), so a specific query returns specific results.
         tokens = [t for t in re.split(r"[\s,.;:!?/]+", (query or "").lower())
                   if len(t) >= 3 and t not in _STOPWORDS]
-        if len(tokens) >= 2 and len(products_list) > (limit or 10):
-            def _token_hits(p):
-                name = ((p.name or "") + " " + (p.description or "")).lower()
-                return sum(1 for t in tokens if t in name)
+        if len(tokens) >= 2 and len(docs) > (limit or 10):
             need = max(1, len(tokens) // 2)
-            kept = [p for p in products_list if _token_hits(p) >= need]
+            kept = [d for d in docs if sum(1 for t in tokens if t in d.text) >= need]
             if kept:
-                products_list = kept[:limit]
+                docs = kept
+        docs = docs[:limit]
 
-    results = [_product_row(p) for p in products_list]
+    results = [dict(d.row) for d in docs]
 
     # Romanized-Bengali bridge: "lebur achar" must match a catalog named
-    # "লেবুর আচার". The DB icontains can't compare latin against Bengali text,
-    # so when the DB search came up short, score the latinized product names
-    # and append the best (most token matches) matches first.
+    # "লেবুর আচার". The index's substring match can't compare latin against
+    # Bengali text, so when it came up short, score the query tokens against
+    # the index's latinized name words and append the best (most token
+    # matches) products first.
     if not generic and query and query.strip() and len(results) < limit:
         latin_seen = {r["pid"] for r in results}
         for row in _latinized_search(user, query, limit=limit):
@@ -1217,7 +1230,7 @@ def tool_get_product_details(user, pid, conversation=None):
     external_error = False
     try:
         source = get_active_source(user)
-        if source and source.mode == "live" and is_external(user):
+        if source and source.reads_live and is_external(user):
             provider = get_provider(user)
             r = provider.get_product(pid)
             if not r and provider.last_error is None:
@@ -1270,7 +1283,7 @@ def tool_get_product_details(user, pid, conversation=None):
     if external_error:
         try:
             source = get_active_source(user)
-            if source and source.mode == "live" and is_external(user):
+            if source and source.reads_live and is_external(user):
                 return {
                     "pid": "",
                     "name": "",
@@ -1325,7 +1338,7 @@ def tool_send_images(user, pid="", pids=None, conversation=None):
         # focus — send cards for the whole catalog instead of erroring.
         source = get_active_source(user)
         external_active = bool(source) and is_external(user)
-        live_mode = bool(source) and source.mode == "live" and external_active
+        live_mode = bool(source) and source.reads_live and external_active
         if live_mode:
             # External live store: fetch the provider's catalog (local DB rows
             # belong to a different store — never send those).
@@ -1358,7 +1371,7 @@ def tool_send_images(user, pid="", pids=None, conversation=None):
 
     source = get_active_source(user)
     external_active = bool(source) and is_external(user)
-    live_mode = bool(source) and source.mode == "live" and external_active
+    live_mode = bool(source) and source.reads_live and external_active
 
     products = []
     seen_pids = set()
@@ -1445,7 +1458,7 @@ def tool_create_order(user, conversation, customer_name, customer_phone, custome
     # Determine external context once.
     source = get_active_source(user)
     external_active = bool(source) and is_external(user)
-    live_mode = bool(source) and source.mode == "live" and external_active
+    live_mode = bool(source) and source.reads_live and external_active
     provider = None
     if live_mode:
         try:
@@ -1993,6 +2006,7 @@ class SendImagesTool(BaseTool):
 
 class CreateOrderTool(BaseTool):
     name = "create_order"
+    side_effects = True
     description = "Create a new pending order. Only call after you have confirmed the items with the customer and collected name, phone, and address."
     parameters = {
         "type": "object",
@@ -2063,6 +2077,7 @@ class GetOrderStatusTool(BaseTool):
 
 class UpdateCustomerTool(BaseTool):
     name = "update_customer"
+    side_effects = True
     description = "Save or update customer contact details in the conversation record."
     parameters = {
         "type": "object",
@@ -2089,6 +2104,7 @@ class UpdateCustomerTool(BaseTool):
 
 class CreateTicketTool(BaseTool):
     name = "create_ticket"
+    side_effects = True
     description = "Create a support ticket and hand the conversation to a human agent. Use when: customer requests human, complaint escalation, or issue is beyond AI scope."
     parameters = {
         "type": "object",
@@ -2192,6 +2208,7 @@ class FindPreviousTicketsTool(BaseTool):
 
 class GetPaymentLinkTool(BaseTool):
     name = "get_payment_link"
+    side_effects = True
     description = "Generate a payment link for a pending order so the customer can pay."
     parameters = {
         "type": "object",
@@ -9,6 +9,10 @@ Catches the classic failure modes before anything reaches the customer:
   - unsafe/profanity in the generated text -> neutral templated reply
   - wrong media cardinality -> capped to platform rules
 
+``check_chunk`` is the streaming counterpart: a part of a reply that is still
+being generated may only go out early when none of the corrections above
+would touch it.
+
 Validation is intentionally correction-oriented: instead of raising, it returns
 a fixed Response plus a list of issue codes (persisted for observability).
 """
@@ -35,6 +39,43 @@ _HAS_BN_SCRIPT = re.compile(r"[\u0980-\u09FF]")
 
 class ResponseValidator:
 
+    @staticmethod
+    def check_chunk(text: str, context: ConversationContext, sent_chars: int = 0) -> list[str]:
+        """Checks for one streamed part before it is sent ahead of the full reply.
+
+        Unlike ``validate`` nothing is corrected — a part that ``validate``
+        would rewrite must not reach the customer early, so any issue code
+        returned here means "hold this part (and the rest) for the final gate".
+        ``sent_chars`` is the length of the parts already streamed.
+        """
+        from .response import ResponseGenerator, _clean_media_markdown
+
+        issues: list[str] = []
+        if not (text or "").strip():
+            return ["empty_response"]
+        if _UNSAFE_RE.search(text):
+            issues.append("unsafe_content")
+        if sent_chars + len(text) > _MAX_TEXT_LEN:
+            issues.append("too_long_text")
+        if _clean_media_markdown(text) != text.strip():
+            issues.append("media_markdown")
+        if re.search(r"\*\*|__|\*[^*\s]", text) or (sent_chars == 0 and re.match(r"\s*[-*]\s+", text)):
+            issues.append("broken_markdown")
+        lines = [ln.strip() for ln in text.split("\n") if ln.strip()]
+        if len(lines) != len(set(lines)):
+            issues.append("repeated_line")
+        conv = getattr(context, "conversation", None)
+        if (conv is not None and getattr(conv, "language_detected", "") == "bn"
+                and not _HAS_BN_SCRIPT.search(text)):
+            issues.append("wrong_language")
+        if re.search(r"\bord_[a-z0-9]+\b", text):
+            issues.append("order_reference")
+        if re.search(r"(স্টকে নেই|আছে না|নাই|out of stock|unavailable)", text, re.IGNORECASE):
+            issues.append("stock_claim")
+        if ResponseGenerator._search_meta_text(text) or ResponseGenerator._promises_images(text):
+            issues.append("meta_text")
+        return issues
+
     @staticmethod
     def validate(response: Response, context: ConversationContext) -> tuple[Response, list[str]]:
         """Run the safety/quality checks. Returns (fixed_response, issue_codes)."""
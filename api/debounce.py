@@ -0,0 +1,123 @@
+"""
+Adaptive burst window for the batch pipeline (api/webhooks.py).
+
+A flat wait made every single-message turn ("price?") pay the full window in
+dead latency. Instead, each turn waits about as long as this conversation's
+customers actually pause between messages inside a burst, learned from
+``MessageBatch.timestamp``:
+
+  * terminal signals (a trailing question mark, an image already analyzed)
+    fire almost immediately;
+  * otherwise the wait is the 90th-percentile in-burst gap of the
+    conversation (or, with too little history, of the whole platform) plus
+    headroom, clamped to [MIN_WAIT_SECONDS, MAX_WAIT_SECONDS];
+  * no burst is ever held longer than MAX_BURST_SECONDS from its first message.
+"""
+import logging
+import re
+import time
+
+from django.utils import timezone
+
+from back.models import MessageBatch
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WAIT_SECONDS = 7.0    # no usable history yet (old flat window)
+MIN_WAIT_SECONDS = 2.0
+MAX_WAIT_SECONDS = 12.0
+TERMINAL_WAIT_SECONDS = 0.5   # question / analyzed image — reply right away
+MAX_BURST_SECONDS = 20.0      # cap from the burst's FIRST message
+BURST_GAP_CEILING = 30.0      # longer pauses start a new burst; not learned from
+GAP_QUANTILE = 0.9
+GAP_HEADROOM = 1.25
+MIN_SAMPLES = 5
+CONVERSATION_SAMPLE = 40
+PLATFORM_SAMPLE = 2000
+PLATFORM_CACHE_SECONDS = 300
+
+_TERMINAL_RE = re.compile(r"[?？؟]\s*$")
+# _persist_message folds vision analysis into the text as "[Image: ...]".
+_ANALYZED_IMAGE_MARKER = "[Image:"
+
+# {platform: (computed_at_monotonic, [gaps])}
+_platform_gap_cache: dict[str, tuple[float, list[float]]] = {}
+
+
+def is_terminal(text):
+    """True when the customer's last message clearly ends their turn."""
+    text = (text or "").strip()
+    return bool(_TERMINAL_RE.search(text)) or _ANALYZED_IMAGE_MARKER in text
+
+
+def _burst_gaps(timestamps):
+    """In-burst gaps (seconds) between consecutive timestamps."""
+    ordered = sorted(timestamps)
+    gaps = []
+    for prev, cur in zip(ordered, ordered[1:]):
+        gap = (cur - prev).total_seconds()
+        if 0 < gap <= BURST_GAP_CEILING:
+            gaps.append(gap)
+    return gaps
+
+
+def _quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+
+def conversation_gaps(conversation_id):
+    timestamps = MessageBatch.objects.filter(
+        conversation_id=conversation_id,
+    ).order_by("-timestamp").values_list("timestamp", flat=True)[:CONVERSATION_SAMPLE]
+    return _burst_gaps(list(timestamps))
+
+
+def platform_gaps(platform):
+    """Recent in-burst gaps across all conversations on a platform (cached)."""
+    cached = _platform_gap_cache.get(platform)
+    if cached and time.monotonic() - cached[0] < PLATFORM_CACHE_SECONDS:
+        return cached[1]
+    by_conv: dict[int, list] = {}
+    rows = MessageBatch.objects.filter(platform=platform).order_by(
+        "-timestamp"
+    ).values_list("conversation_id", "timestamp")[:PLATFORM_SAMPLE]
+    for cid, ts in rows:
+        by_conv.setdefault(cid, []).append(ts)
+    gaps = []
+    for stamps in by_conv.values():
+        gaps.extend(_burst_gaps(stamps))
+    _platform_gap_cache[platform] = (time.monotonic(), gaps)
+    return gaps
+
+
+def burst_delay(conversation_id, platform=""):
+    """Seconds to wait before running the pipeline for this conversation."""
+    pending = list(
+        MessageBatch.objects.filter(
+            conversation_id=conversation_id, processed=False,
+        ).order_by("timestamp").values_list("timestamp", "message_text")
+    )
+    if not pending:
+        return DEFAULT_WAIT_SECONDS
+
+    first_ts, last_text = pending[0][0], pending[-1][1]
+    if is_terminal(last_text):
+        wait, basis = TERMINAL_WAIT_SECONDS, "terminal"
+    else:
+        gaps, basis = conversation_gaps(conversation_id), "conversation"
+        if len(gaps) < MIN_SAMPLES and platform:
+            gaps, basis = platform_gaps(platform), "platform"
+        if len(gaps) >= MIN_SAMPLES:
+            wait = _quantile(gaps, GAP_QUANTILE) * GAP_HEADROOM
+            wait = max(MIN_WAIT_SECONDS, min(MAX_WAIT_SECONDS, wait))
+        else:
+            wait, basis = DEFAULT_WAIT_SECONDS, "default"
+
+    elapsed = (timezone.now() - first_ts).total_seconds()
+    delay = max(0.0, min(wait, MAX_BURST_SECONDS - elapsed))
+    logger.info(
+        "Burst window conv=%s basis=%s wait=%.1fs elapsed=%.1fs delay=%.1fs",
+        conversation_id, basis, wait, elapsed, delay,
+    )
+    return delay
@@ -0,0 +1,254 @@
+"""
+Durable background job queue backed by ``back.BackgroundJob``.
+
+Webhook views only enqueue work here; consumers (``manage.py run_ai_workers``
+or the embedded worker of a web process) lease jobs from the table and run
+the registered handler. Because the queue lives in the database, a restart
+never drops work and any process on any host can pick it up.
+
+Leasing is a conditional UPDATE (``WHERE status=queued``) so it is safe on
+every backend without row locks: exactly one worker wins each job. A leased
+job whose ``leased_until`` passes (worker crashed / was killed) becomes
+claimable again — the visibility timeout. Failed jobs are retried with
+exponential backoff until ``max_attempts``.
+"""
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from back.models import BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = 300          # visibility timeout — longest expected single job
+RETRY_BASE_SECONDS = 5       # backoff: 5s, 10s, 20s, ... capped below
+RETRY_MAX_SECONDS = 600
+POLL_INTERVAL = 1.0          # idle sleep between empty claim rounds
+PURGE_AFTER = timedelta(days=1)
+PURGE_EVERY_SECONDS = 600
+
+# kind -> dotted path of the handler. Handlers receive the payload as kwargs.
+HANDLERS = {
+    "process_webhook": "api.webhooks._process_webhook_job",
+    "batch_pipeline": "api.webhooks._fire_batch_pipeline",
+    "fetch_profile": "api.webhooks._fetch_profile_job",
+    "product_images": "back.product_csv.fetch_product_images",
+}
+
+
+def enqueue(kind, payload=None, delay=0, dedupe_key="", max_attempts=5):
+    """Persist a job to run ``delay`` seconds from now.
+
+    With a ``dedupe_key``, an already-queued job with the same key is pushed
+    to the new run time instead of adding a second row — this is how rapid
+    message bursts collapse into one pipeline run.
+
+    Returns the BackgroundJob row (new or rescheduled).
+    """
+    run_at = timezone.now() + timedelta(seconds=delay)
+    if dedupe_key:
+        existing = BackgroundJob.objects.filter(
+            dedupe_key=dedupe_key, status="queued",
+        ).order_by("pk").first()
+        if existing is not None:
+            updated = BackgroundJob.objects.filter(
+                pk=existing.pk, status="queued",
+            ).update(run_at=run_at, payload=payload or {}, updated_at=timezone.now())
+            if updated:
+                existing.run_at = run_at
+                return existing
+    return BackgroundJob.objects.create(
+        kind=kind,
+        payload=payload or {},
+        dedupe_key=dedupe_key,
+        run_at=run_at,
+        max_attempts=max_attempts,
+    )
+
+
+def _claimable(now):
+    return Q(status="queued", run_at__lte=now) | Q(status="running", leased_until__lt=now)
+
+
+def claim(worker_id, limit=1, lease_seconds=LEASE_SECONDS):
+    """Lease up to ``limit`` due jobs for ``worker_id``. Returns the leased rows."""
+    now = timezone.now()
+    candidates = list(
+        BackgroundJob.objects.filter(_claimable(now))
+        .order_by("run_at")
+        .values_list("pk", flat=True)[: limit * 4]
+    )
+    claimed = []
+    for pk in candidates:
+        won = BackgroundJob.objects.filter(_claimable(now), pk=pk).update(
+            status="running",
+            leased_by=worker_id,
+            leased_until=now + timedelta(seconds=lease_seconds),
+            attempts=F("attempts") + 1,
+            updated_at=now,
+        )
+        if won:
+            claimed.append(pk)
+            if len(claimed) >= limit:
+                break
+    if not claimed:
+        return []
+    return list(BackgroundJob.objects.filter(pk__in=claimed).order_by("run_at"))
+
+
+def _backoff(attempts):
+    return min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1)))
+
+
+def run_job(job, worker_id):
+    """Execute one leased job and record the outcome. Never raises."""
+    close_old_connections()
+    try:
+        handler = import_string(HANDLERS[job.kind])
+    except Exception as exc:
+        logger.error("No handler for job kind=%s id=%s", job.kind, job.pk)
+        BackgroundJob.objects.filter(pk=job.pk, leased_by=worker_id).update(
+            status="failed", leased_until=None, last_error=f"No handler: {exc}"[:2000],
+            updated_at=timezone.now(),
+        )
+        return False
+
+    try:
+        handler(**(job.payload or {}))
+    except Exception as exc:
+        if job.attempts >= job.max_attempts:
+            logger.exception("Job %s kind=%s failed permanently after %d attempts", job.pk, job.kind, job.attempts)
+            BackgroundJob.objects.filter(pk=job.pk, leased_by=worker_id).update(
+                status="failed", leased_until=None, last_error=repr(exc)[:2000],
+                updated_at=timezone.now(),
+            )
+        else:
+            delay = _backoff(job.attempts)
+            logger.warning(
+                "Job %s kind=%s attempt %d/%d failed (%s) — retrying in %ss",
+                job.pk, job.kind, job.attempts, job.max_attempts, exc, delay,
+            )
+            now = timezone.now()
+            BackgroundJob.objects.filter(pk=job.pk, leased_by=worker_id).update(
+                status="queued",
+                leased_until=None,
+                run_at=now + timedelta(seconds=delay),
+                last_error=repr(exc)[:2000],
+                updated_at=now,
+            )
+        return False
+    else:
+        BackgroundJob.objects.filter(pk=job.pk, leased_by=worker_id).update(
+            status="done", leased_until=None, updated_at=timezone.now(),
+        )
+        return True
+    finally:
+        close_old_connections()
+
+
+def purge_finished(older_than=PURGE_AFTER):
+    """Delete jobs that finished (done/failed) more than ``older_than`` ago.
+
+    Age is measured from ``updated_at``. Status transitions go through
+    ``.update()``, which skips ``auto_now`` — so each one sets it explicitly.
+    Returns the row count.
+    """
+    cutoff = timezone.now() - older_than
+    deleted, _ = BackgroundJob.objects.filter(
+        status__in=("done", "failed"), updated_at__lt=cutoff,
+    ).delete()
+    return deleted
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def run_worker(concurrency=4, stop_event=None, worker_id=None, poll_interval=POLL_INTERVAL):
+    """Consume jobs until ``stop_event`` is set.
+
+    ``concurrency`` jobs run at once on a local thread pool; the claim loop only
+    leases as many jobs as there are free slots so a busy worker never hoards
+    work that another process could be running.
+    """
+    stop_event = stop_event or threading.Event()
+    worker_id = worker_id or default_worker_id()
+    in_flight = set()
+    lock = threading.Lock()
+    last_purge = 0.0
+
+    def _done(fut, pk):
+        with lock:
+            in_flight.discard(pk)
+
+    logger.info("Job worker %s started (concurrency=%d)", worker_id, concurrency)
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ai-job") as pool:
+        while not stop_event.is_set():
+            with lock:
+                free = concurrency - len(in_flight)
+            jobs = []
+            if free > 0:
+                try:
+                    close_old_connections()
+                    jobs = claim(worker_id, limit=free)
+                except Exception:
+                    logger.exception("Job claim failed worker=%s", worker_id)
+            for job in jobs:
+                with lock:
+                    in_flight.add(job.pk)
+                fut = pool.submit(run_job, job, worker_id)
+                fut.add_done_callback(lambda f, pk=job.pk: _done(f, pk))
+
+            if time.monotonic() - last_purge > PURGE_EVERY_SECONDS:
+                last_purge = time.monotonic()
+                try:
+                    purge_finished()
+                except Exception:
+                    logger.exception("Job purge failed")
+
+            if not jobs:
+                stop_event.wait(poll_interval)
+    logger.info("Job worker %s stopped", worker_id)
+
+
+# ---------------------------------------------------------------------------
+# Embedded worker — keeps single-service deployments working without a
+# separate `run_ai_workers` process. Started once per web process: from
+# gunicorn's post_worker_init hook (gunicorn.conf.py) or passenger_wsgi.py.
+# ---------------------------------------------------------------------------
+
+_embedded_pid = None
+_embedded_lock = threading.Lock()
+
+
+def start_embedded_worker():
+    """Start an in-process consumer thread if AI_WORKER_EMBEDDED is on.
+
+    Call it in the serving process itself, never in a parent that forks the
+    workers (a thread does not survive fork). Repeated calls in one process
+    start one consumer.
+    """
+    global _embedded_pid
+    if not getattr(settings, "AI_WORKER_EMBEDDED", True):
+        return
+    with _embedded_lock:
+        if _embedded_pid == os.getpid():
+            return
+        _embedded_pid = os.getpid()
+    threading.Thread(
+        target=run_worker,
+        kwargs={"concurrency": getattr(settings, "AI_WORKER_CONCURRENCY", 8)},
+        name="ai-job-worker",
+        daemon=True,
+    ).start()
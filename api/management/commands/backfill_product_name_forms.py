@@ -0,0 +1,74 @@
+"""Management command: (re)compute the stored search forms of product names.
+
+    python manage.py backfill_product_name_forms                # every product
+    python manage.py backfill_product_name_forms --user alice   # one user's products
+    python manage.py backfill_product_name_forms --check        # count stale rows only
+
+Product.name_latin / name_tokens are written by a pre_save signal. Run this
+once after the migration that added them, and again whenever the
+transliteration rules (_latinize_bn) change.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Recompute Product.name_latin / name_tokens from the current transliteration rules."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", dest="username", default=None, help="Limit to a single username.")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--check", action="store_true", help="Report stale rows without writing.")
+
+    def handle(self, *args, **options):
+        from api.ai import product_index
+        from back.models import CatalogVersion, Product
+
+        qs = Product.objects.all()
+        username = options.get("username")
+        if username:
+            try:
+                qs = qs.filter(user=User.objects.get(username=username))
+            except User.DoesNotExist:
+                self.stderr.write(self.style.ERROR(f"User '{username}' not found."))
+                return
+
+        batch_size = options["batch_size"]
+        scanned = 0
+        stale = []
+        updated = 0
+        users = set()
+        rows = qs.only("id", "user_id", "name", "name_latin", "name_tokens").order_by("id")
+        for product in rows.iterator(chunk_size=batch_size):
+            scanned += 1
+            latin, tokens = product_index.name_forms(product.name)
+            if (latin, tokens) == (product.name_latin, product.name_tokens):
+                continue
+            product.name_latin, product.name_tokens = latin, tokens
+            stale.append(product)
+            users.add(product.user_id)
+            if len(stale) >= batch_size:
+                updated += self._flush(stale, options["check"])
+                stale = []
+        updated += self._flush(stale, options["check"])
+
+        if options["check"]:
+            self.stdout.write(f"{updated} of {scanned} product(s) have stale name forms.")
+            return
+        # bulk_update skips signals — drop the affected in-process indexes and
+        # bump the tenants' CatalogVersion so other processes rebuild theirs.
+        for user_id in users:
+            CatalogVersion.bump(user_id)
+            product_index.invalidate(user_id)
+        self.stdout.write(self.style.SUCCESS(f"Done — updated {updated} of {scanned} product(s)."))
+
+    @staticmethod
+    def _flush(products, dry_run):
+        from back.models import Product
+
+        if products and not dry_run:
+            Product.objects.bulk_update(products, ["name_latin", "name_tokens"])
+        return len(products)
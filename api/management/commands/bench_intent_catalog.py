@@ -0,0 +1,88 @@
+"""Management command: benchmark the catalog-name intent fallback.
+
+    python manage.py bench_intent_catalog
+    python manage.py bench_intent_catalog --sizes 100 1000 20000 --messages 500
+
+Compares the old per-message loop over product names with the precomputed
+NameMatcher (api/ai/product_index.py) on a synthetic romanized-Bengali
+catalog. No database — this isolates matching cost from the index refresh.
+(The old code only looked at the first 50 products; the loop here checks
+them all, which is what the matcher answers for.)
+"""
+
+import random
+import re
+import time
+
+from django.core.management.base import BaseCommand
+
+_SYLLABLES = ["ba", "bi", "da", "do", "ja", "jo", "ka", "ko", "la", "ma", "na", "pa",
+              "ra", "sa", "ta", "ti", "cha", "sho", "gol", "lpai", "tul", "mon"]
+_UNITS = ["500g", "1kg", "200ml", "pack", "box", "xl", "combo"]
+_FILLER = ["bhai", "ache", "dam", "koto", "den", "apu", "please", "ta", "naki", "kemon"]
+
+
+def _word(rng):
+    return "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 3)))
+
+
+def _legacy_match(text, names):
+    """The pre-index rule: every name scanned per message."""
+    words = [w for w in re.split(r"[\s,.;:!?]+", text.lower()) if len(w) >= 3]
+    if not words and len(text.strip()) < 3:
+        return False
+    lowered = text.lower()
+    for name in names:
+        name = (name or "").strip().lower()
+        if not name:
+            continue
+        if name in lowered or any(w in name for w in words):
+            return True
+    return False
+
+
+class Command(BaseCommand):
+    help = "Benchmark intent catalog matching: per-message name loop vs NameMatcher."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 5000, 20000])
+        parser.add_argument("--messages", type=int, default=300)
+
+    def handle(self, *args, **options):
+        from api.ai.product_index import NameMatcher
+
+        rng = random.Random(7)
+        n_messages = options["messages"]
+
+        self.stdout.write(f"{'products':>9} {'build ms':>9} {'matcher us/msg':>15} "
+                          f"{'legacy us/msg':>14} {'speedup':>8} {'hit %':>6}")
+        for n in options["sizes"]:
+            names = [f"{_word(rng)} {_word(rng)} {rng.choice(_UNITS)}".title() for _ in range(n)]
+            messages = []
+            for _ in range(n_messages):
+                words = [rng.choice(_FILLER) for _ in range(rng.randint(1, 4))]
+                if rng.random() < 0.3:
+                    words.insert(0, rng.choice(names).split()[rng.randint(0, 1)].lower())
+                elif rng.random() < 0.5:
+                    words.insert(0, _word(rng))
+                messages.append(" ".join(words) + rng.choice(["", "?", " ?"]))
+
+            t0 = time.perf_counter()
+            matcher = NameMatcher(names)
+            build_ms = (time.perf_counter() - t0) * 1000
+
+            t0 = time.perf_counter()
+            got = [matcher.matches(m) for m in messages]
+            matcher_us = (time.perf_counter() - t0) * 1e6 / n_messages
+
+            t0 = time.perf_counter()
+            expected = [_legacy_match(m, names) for m in messages]
+            legacy_us = (time.perf_counter() - t0) * 1e6 / n_messages
+
+            if got != expected:
+                diff = sum(a != b for a, b in zip(got, expected))
+                self.stderr.write(f"{diff} result mismatch(es) at n={n}")
+            hit = 100.0 * sum(got) / n_messages
+            speedup = f"{legacy_us / matcher_us:.0f}x" if matcher_us else "-"
+            self.stdout.write(f"{n:>9} {build_ms:>9.1f} {matcher_us:>15.1f} "
+                              f"{legacy_us:>14.1f} {speedup:>8} {hit:>6.1f}")
@@ -0,0 +1,47 @@
+"""Management command: consume the durable AI job queue.
+
+    python manage.py run_ai_workers                  # 8 concurrent jobs
+    python manage.py run_ai_workers --concurrency 16
+
+Run as many of these as needed, on any host that shares the database — jobs
+are leased, so each one is processed by exactly one worker.
+"""
+
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Run AI background workers that consume BackgroundJob rows (webhooks, batch pipeline)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=getattr(settings, "AI_WORKER_CONCURRENCY", 8),
+            help="Jobs processed in parallel by this process.",
+        )
+
+    def handle(self, *args, **options):
+        from api.jobs import default_worker_id, run_worker
+        from api.webhooks import recover_zombie_batches
+
+        stop = threading.Event()
+
+        def _shutdown(signum, frame):
+            self.stdout.write("Stopping workers after in-flight jobs finish...")
+            stop.set()
+
+        signal.signal(signal.SIGTERM, _shutdown)
+        signal.signal(signal.SIGINT, _shutdown)
+
+        recover_zombie_batches()
+
+        worker_id = default_worker_id()
+        self.stdout.write(self.style.SUCCESS(
+            f"AI worker {worker_id} running (concurrency={options['concurrency']})"
+        ))
+        run_worker(concurrency=options["concurrency"], stop_event=stop, worker_id=worker_id)
@@ -0,0 +1,55 @@
+"""Management command: keep every active external ProductSource synced.
+
+    python manage.py run_product_sync                   # run until stopped
+    python manage.py run_product_sync --concurrency 4   # syncs in parallel (all tenants)
+    python manage.py run_product_sync --once            # sync what is due, then exit (cron)
+    python manage.py run_product_sync --cache-live      # move live sources to cached_live first
+
+Each source syncs every ``sync_interval_minutes`` (± jitter). Several
+schedulers may run against the same database — sources are leased.
+"""
+
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Run the scheduled product sync for all active external ProductSources."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=getattr(settings, "PRODUCT_SYNC_CONCURRENCY", 2),
+            help="Sources synced in parallel by this process.",
+        )
+        parser.add_argument("--once", action="store_true", help="Exit once nothing is due.")
+        parser.add_argument(
+            "--cache-live",
+            action="store_true",
+            help="Serve active live sources from a scheduled local mirror (mode=cached_live).",
+        )
+
+    def handle(self, *args, **options):
+        from api.products.scheduler import cache_live_sources, run_scheduler
+
+        if options["cache_live"]:
+            moved = cache_live_sources()
+            self.stdout.write(f"Switched {moved} live source(s) to cached_live.")
+
+        stop = threading.Event()
+
+        def _shutdown(signum, frame):
+            self.stdout.write("Stopping after in-flight syncs finish...")
+            stop.set()
+
+        signal.signal(signal.SIGTERM, _shutdown)
+        signal.signal(signal.SIGINT, _shutdown)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Product sync scheduler running (concurrency={options['concurrency']})"
+        ))
+        run_scheduler(concurrency=options["concurrency"], stop_event=stop, once=options["once"])
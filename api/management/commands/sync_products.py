@@ -2,6 +2,7 @@
 
     python manage.py sync_products                 # all active non-internal sources
     python manage.py sync_products --user alice     # only this user's active source
+    python manage.py sync_products --full           # ignore updated-since cursors, disable removed products
 """
 
 from django.contrib.auth import get_user_model
@@ -22,6 +23,11 @@ class Command(BaseCommand):
             default=None,
             help="Limit sync to a single username.",
         )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Re-read the whole catalog even where the remote supports incremental sync.",
+        )
 
     def handle(self, *args, **options):
         from back.models import ProductSource
@@ -44,10 +50,11 @@ class Command(BaseCommand):
 
         for source in sources:
             self.stdout.write(f"Syncing {source.sid} ({source.provider}) for {source.user}...")
-            result = sync_products(source)
+            result = sync_products(source, full=options["full"])
             self.stdout.write(
                 self.style.SUCCESS(
-                    f"  created={result['created']} updated={result['updated']} "
+                    f"  {result['mode']}: created={result['created']} updated={result['updated']} "
+                    f"unchanged={result['unchanged']} disabled={result['disabled']} "
                     f"errors={len(result['errors'])}"
                 )
             )
@@ -6,7 +6,10 @@ Resolves the correct ProductProvider for a user based on their active
 ProductSource. If no active source exists, the InternalProvider is returned.
 """
 
+from django.conf import settings
+
 from .providers.base import ProductProvider
+from .providers.cached import CachedProvider
 from .providers.external import ExternalProvider
 from .providers.internal import InternalProvider
 from .providers.shopify import ShopifyProvider
@@ -36,11 +39,19 @@ def get_active_source(user):
 
 
 def get_provider(user) -> ProductProvider:
-    """Return the provider for the user's active source (internal if none)."""
+    """Return the provider for the user's active source (internal if none).
+
+    Live external sources come wrapped in the read-through CachedProvider;
+    sync and connection tests use ``get_provider_for_source`` (uncached).
+    """
     source = get_active_source(user)
     if source is None:
         return InternalProvider(None, user=user)
-    return get_provider_for_source(source, user=user)
+    provider = get_provider_for_source(source, user=user)
+    if (source.reads_live and source.provider != "internal"
+            and getattr(settings, "PRODUCT_CACHE_ENABLED", True)):
+        provider = CachedProvider(provider)
+    return provider
 
 
 def is_external(user) -> bool:
@@ -34,15 +34,98 @@ The canonical order_payload passed to create_order:
 """
 
 import abc
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+POOL_MAXSIZE = 16           # keep-alive connections per remote host
+SEARCH_WORKERS = 16         # shared fan-out pool (PRODUCT_SEARCH_WORKERS)
+SEARCH_CONCURRENCY = 4      # variations of one search in flight (PRODUCT_SEARCH_CONCURRENCY)
+SEARCH_DEADLINE = 8.0       # seconds for a whole fan-out (PRODUCT_SEARCH_DEADLINE)
+SYNC_PAGE_CONCURRENCY = 4   # catalog pages fetched ahead during sync
+
+_sessions: dict[str, requests.Session] = {}
+_search_pool = None
+_lock = threading.Lock()
+
+
+def http_session(url) -> requests.Session:
+    """Keep-alive ``requests.Session`` shared by every provider talking to
+    ``url``'s host, so concurrent searches reuse pooled connections."""
+    host = urlsplit(url).netloc
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[host] = session
+        return session
+
+
+def _get_search_pool():
+    global _search_pool
+    with _lock:
+        if _search_pool is None:
+            _search_pool = ThreadPoolExecutor(
+                max_workers=getattr(settings, "PRODUCT_SEARCH_WORKERS", SEARCH_WORKERS),
+                thread_name_prefix="product-search",
+            )
+        return _search_pool
 
 
 class ProductProvider(abc.ABC):
+    # Sync hooks (api/products/sync.py). ``supports_updated_since``: the
+    # remote can list only products changed after a timestamp.
+    # ``exact_page_size``: a page shorter than ``per_page`` is the last one.
+    supports_updated_since = False
+    exact_page_size = True
+
     def __init__(self, source, user=None):
         # ``source`` is a ProductSource instance (or None for internal).
         # ``user`` is always available for ORM scoping.
         self.source = source
         self.user = user if user is not None else (getattr(source, "user", None))
 
+    # Providers report a remote failure by setting ``last_error`` and
+    # returning []/None. The attribute is shared by every thread using the
+    # instance, so concurrent callers go through ``call_checked``, which also
+    # keeps the error of the current thread's own call.
+    @property
+    def last_error(self):
+        return self.__dict__.get("_last_error")
+
+    @last_error.setter
+    def last_error(self, exc):
+        self.__dict__["_last_error"] = exc
+        self._call_errors.error = exc
+
+    @property
+    def _call_errors(self):
+        return self.__dict__.setdefault("_call_errors_local", threading.local())
+
+    def call_checked(self, method, *args):
+        """``getattr(self, method)(*args)``, raising the error that call
+        reported through ``last_error``. Safe on a provider shared by
+        several threads: another call can neither mask nor claim it."""
+        local = self._call_errors
+        local.error = None
+        value = getattr(self, method)(*args)
+        error, local.error = local.error, None
+        if error is not None:
+            raise error
+        return value
+
     @abc.abstractmethod
     def test_connection(self) -> dict:
         """Return {"ok": bool, "message": str}."""
@@ -66,3 +149,100 @@ class ProductProvider(abc.ABC):
     @abc.abstractmethod
     def get_order_status(self, external_order_id) -> dict:
         """Return a normalized order-status dict."""
+
+    def search_many(self, queries, limit=5, want=None, deadline=None):
+        """Run ``search`` for every query concurrently on the shared pool.
+
+        At most PRODUCT_SEARCH_CONCURRENCY queries are in flight at once.
+        Stops issuing new ones once ``want`` distinct ``external_id``s are in,
+        and gives up on whatever is still running after ``deadline`` seconds.
+
+        Returns ``(rows, attempted, errored)``: rows de-duplicated by
+        external_id in query order; a query that raised, reported
+        ``last_error`` or timed out counts as errored.
+        """
+        queries = list(queries)
+        if deadline is None:
+            deadline = getattr(settings, "PRODUCT_SEARCH_DEADLINE", SEARCH_DEADLINE)
+        cap = max(1, getattr(settings, "PRODUCT_SEARCH_CONCURRENCY", SEARCH_CONCURRENCY))
+        pool = _get_search_pool()
+        t_end = time.monotonic() + deadline
+
+        done_rows: dict[int, list] = {}
+        running = {}
+        seen = set()
+        attempted = errored = 0
+        next_index = 0
+        timed_out = False
+
+        while next_index < len(queries) or running:
+            while next_index < len(queries) and len(running) < cap and not (want and len(seen) >= want):
+                running[pool.submit(self.call_checked, "search", queries[next_index], limit)] = next_index
+                attempted += 1
+                next_index += 1
+            if not running:
+                break
+            remaining = t_end - time.monotonic()
+            if remaining <= 0:
+                timed_out = True
+                break
+            done, _ = wait(list(running), timeout=remaining, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                try:
+                    rows = future.result() or []
+                except Exception:
+                    errored += 1
+                    logger.exception("External search failed for variation=%s", queries[index])
+                    continue
+                done_rows[index] = rows
+                seen.update(r.get("external_id") for r in rows if r.get("external_id"))
+            if want and len(seen) >= want:
+                break
+
+        if timed_out:
+            errored += len(running)
+            logger.warning("External search deadline: %d of %d variation(s) unfinished",
+                           len(running), attempted)
+        for future in running:
+            future.cancel()  # late results are ignored
+
+        out = []
+        emitted = set()
+        for index in sorted(done_rows):
+            for r in done_rows[index]:
+                eid = r.get("external_id")
+                if eid and eid not in emitted:
+                    emitted.add(eid)
+                    out.append(r)
+        return out, attempted, errored
+
+    # ------------------------------------------------------------------ sync
+    def fetch_page(self, page, per_page, updated_since=None) -> list:
+        """One catalog page for sync. Unlike ``list_products`` this raises on
+        failure, so a broken page never looks like the end of the catalog."""
+        return self.call_checked("list_products", per_page, page)
+
+    def iter_pages(self, per_page=100, updated_since=None, concurrency=SYNC_PAGE_CONCURRENCY):
+        """Yield the catalog page by page, in order, with up to
+        ``concurrency`` pages fetched ahead. Raises if any page fails."""
+        with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="product-sync") as pool:
+            window = deque()
+            page = 1
+            previous = None
+            while True:
+                while len(window) < max(1, concurrency):
+                    window.append(pool.submit(self.fetch_page, page, per_page, updated_since))
+                    page += 1
+                rows = window.popleft().result()
+                if not rows:
+                    break
+                ids = [r.get("external_id") for r in rows]
+                if ids == previous:
+                    raise RuntimeError("Remote returned the same page twice (page parameter ignored?)")
+                previous = ids
+                yield rows
+                if self.exact_page_size and len(rows) < per_page:
+                    break
+            for future in window:
+                future.cancel()
@@ -0,0 +1,195 @@
+"""Read-through cache around any ProductProvider (live external sources).
+
+    provider = CachedProvider(WooCommerceProvider(source))
+
+``search`` / ``get_product`` / ``list_products`` answers are kept per
+ProductSource with a per-method TTL:
+
+  * fresh            → served from memory;
+  * stale (< SWR)    → served from memory while one background call refreshes it;
+  * older / missing  → fetched; if the remote fails, any entry still held
+                       (up to STALE_MAX) is served instead of an error, so a
+                       flapping ERP no longer turns into "catalog unavailable";
+  * clean misses (no product / no rows, remote healthy) are cached for
+    NEGATIVE_TTL so repeated look-ups of a wrong pid don't hit the remote.
+
+Orders and connection tests always go to the remote. Per-source hit/miss
+counters (this process) are available from ``stats(source_id)``.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+
+from .base import ProductProvider, _get_search_pool
+
+logger = logging.getLogger(__name__)
+
+TTLS = {"search": 120, "get_product": 300, "list_products": 300}   # seconds
+NEGATIVE_TTL = 30
+SWR_SECONDS = 600           # stale window served while revalidating in the background
+STALE_MAX = 24 * 3600       # oldest entry still served when the remote is down
+MAX_ENTRIES = 5000
+
+_entries: "OrderedDict[tuple, _Entry]" = OrderedDict()
+_refreshing: set = set()
+_counters: dict[int, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+_lock = threading.Lock()
+
+
+class _Entry:
+    __slots__ = ("value", "stored", "ttl")
+
+    def __init__(self, value, ttl):
+        self.value = value
+        self.stored = time.monotonic()
+        self.ttl = ttl
+
+    def age(self):
+        return time.monotonic() - self.stored
+
+
+def _copy(value):
+    # Callers annotate result dicts; never hand out the cached objects.
+    if isinstance(value, list):
+        return [dict(r) if isinstance(r, dict) else r for r in value]
+    if isinstance(value, dict):
+        return dict(value)
+    return value
+
+
+def _ttl(method):
+    overrides = getattr(settings, "PRODUCT_CACHE_TTLS", None) or {}
+    return overrides.get(method, TTLS[method])
+
+
+def _count(source_id, name):
+    with _lock:
+        _counters[source_id][name] += 1
+
+
+def stats(source_id):
+    """{"hits", "stale", "misses", "negative_hits", "stale_on_error", "errors", "hit_rate"}."""
+    with _lock:
+        c = dict(_counters.get(source_id, {}))
+    cached = c.get("hits", 0) + c.get("stale", 0) + c.get("negative_hits", 0)
+    served = cached + c.get("stale_on_error", 0)  # a miss answered from cache
+    total = cached + c.get("misses", 0)
+    c["hit_rate"] = round(served / total, 3) if total else 0.0
+    return c
+
+
+def invalidate(source_id=None):
+    with _lock:
+        if source_id is None:
+            _entries.clear()
+            return
+        for key in [k for k in _entries if k[0] == source_id]:
+            del _entries[key]
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+        _refreshing.clear()
+        _counters.clear()
+
+
+class CachedProvider(ProductProvider):
+    """Wraps ``inner`` with the same interface. ``last_error`` is set, as on
+    the providers, only when a remote failure could not be covered by a
+    cached answer."""
+
+    def __init__(self, inner: ProductProvider):
+        super().__init__(inner.source, user=inner.user)
+        self.inner = inner
+        self.last_error = None
+        self.source_id = getattr(inner.source, "pk", None)
+
+    # ------------------------------------------------------------- internals
+    def _call(self, method, *args):
+        """Remote call; returns (value, error). The error is the one this
+        call raised or reported — never another thread's (see call_checked)."""
+        try:
+            return self.inner.call_checked(method, *args), None
+        except Exception as exc:
+            logger.warning("Provider %s%r failed: %s", method, args, exc)
+            return None, exc
+
+    def _store(self, key, method, value):
+        ttl = _ttl(method) if value else NEGATIVE_TTL
+        with _lock:
+            _entries[key] = _Entry(value, ttl)
+            _entries.move_to_end(key)
+            while len(_entries) > MAX_ENTRIES:
+                _entries.popitem(last=False)
+
+    def _revalidate(self, key, method, args):
+        with _lock:
+            if key in _refreshing:
+                return
+            _refreshing.add(key)
+
+        def run():
+            try:
+                value, error = self._call(method, *args)
+                if error is None:
+                    self._store(key, method, value)
+            finally:
+                with _lock:
+                    _refreshing.discard(key)
+
+        _get_search_pool().submit(run)
+
+    def _cached(self, method, *args):
+        key = (self.source_id, method, args)
+        with _lock:
+            entry = _entries.get(key)
+            if entry is not None:
+                _entries.move_to_end(key)
+
+        if entry is not None:
+            age = entry.age()
+            if age < entry.ttl:
+                _count(self.source_id, "hits" if entry.value else "negative_hits")
+                return _copy(entry.value)
+            if entry.value and age < entry.ttl + SWR_SECONDS:
+                _count(self.source_id, "stale")
+                self._revalidate(key, method, args)
+                return _copy(entry.value)
+
+        _count(self.source_id, "misses")
+        value, error = self._call(method, *args)
+        if error is not None:
+            _count(self.source_id, "errors")
+            if entry is not None and entry.value and entry.age() < STALE_MAX:
+                _count(self.source_id, "stale_on_error")
+                logger.info("Provider %s unavailable — serving %.0fs old %s result",
+                            self.source_id, entry.age(), method)
+                return _copy(entry.value)
+            self.last_error = error
+            return value
+        self._store(key, method, value)
+        return _copy(value)
+
+    # ------------------------------------------------------------- interface
+    def search(self, query, limit=5) -> list:
+        return self._cached("search", query, int(limit)) or []
+
+    def get_product(self, external_id):
+        return self._cached("get_product", str(external_id))
+
+    def list_products(self, limit=50, page=1) -> list:
+        return self._cached("list_products", int(limit), int(page)) or []
+
+    def test_connection(self) -> dict:
+        return self.inner.test_connection()
+
+    def create_order(self, order_payload: dict) -> dict:
+        return self.inner.create_order(order_payload)
+
+    def get_order_status(self, external_order_id) -> dict:
+        return self.inner.get_order_status(external_order_id)
@@ -17,7 +17,7 @@ import time
 
 import requests
 
-from .base import ProductProvider
+from .base import ProductProvider, http_session
 
 TIMEOUT = 20
 RETRY_ATTEMPTS = 3
@@ -51,6 +51,9 @@ def _to_int(value):
 
 
 class ExternalProvider(ProductProvider):
+    # The ERP pages with its own page size and has no "changed since" filter.
+    exact_page_size = False
+
     # ------------------------------------------------------------------ helpers
     def __init__(self, source, user=None):
         super().__init__(source, user=user)
@@ -90,7 +93,7 @@ class ExternalProvider(ProductProvider):
         last_exc = None
         for attempt in range(RETRY_ATTEMPTS):
             try:
-                r = requests.get(url, params=params, headers=self._headers(), timeout=TIMEOUT)
+                r = http_session(url).get(url, params=params, headers=self._headers(), timeout=TIMEOUT)
                 if r.status_code >= 500 and attempt < RETRY_ATTEMPTS - 1:
                     time.sleep(RETRY_DELAY)
                     continue
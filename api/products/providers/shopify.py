@@ -8,7 +8,7 @@ import re
 
 import requests
 
-from .base import ProductProvider
+from .base import ProductProvider, http_session
 
 TIMEOUT = 15
 API_VERSION = "2024-01"
@@ -50,6 +50,8 @@ def normalize_product(item):
 
 
 class ShopifyProvider(ProductProvider):
+    supports_updated_since = True
+
     @property
     def _base(self):
         return (self.source.store_url or "").rstrip("/") + f"/admin/api/{API_VERSION}"
@@ -63,7 +65,7 @@ class ShopifyProvider(ProductProvider):
 
     def _get(self, path, params=None):
         url = self._base + path
-        return requests.get(url, headers=self._headers, params=params or {}, timeout=TIMEOUT)
+        return http_session(url).get(url, headers=self._headers, params=params or {}, timeout=TIMEOUT)
 
     def test_connection(self) -> dict:
         try:
@@ -83,6 +85,24 @@ class ShopifyProvider(ProductProvider):
         except Exception:
             return []
 
+    def iter_pages(self, per_page=100, updated_since=None, concurrency=1):
+        """Shopify pages by cursor (``since_id``), so pages come one at a time."""
+        since_id = 0
+        limit = min(int(per_page), 250)
+        while True:
+            params = {"limit": limit, "since_id": since_id}
+            if updated_since:
+                params["updated_at_min"] = updated_since.isoformat()
+            r = self._get("/products.json", params)
+            r.raise_for_status()
+            items = r.json().get("products") or []
+            if not items:
+                return
+            yield [normalize_product(i) for i in items]
+            if len(items) < limit:
+                return
+            since_id = max(int(i["id"]) for i in items)
+
     def get_product(self, external_id):
         try:
             r = self._get(f"/products/{external_id}.json")
@@ -8,7 +8,7 @@ import re
 
 import requests
 
-from .base import ProductProvider
+from .base import ProductProvider, http_session
 
 TIMEOUT = 15
 
@@ -41,6 +41,8 @@ def normalize_product(item):
 
 
 class WooCommerceProvider(ProductProvider):
+    supports_updated_since = True
+
     @property
     def _base(self):
         return (self.source.store_url or "").rstrip("/") + "/wp-json/wc/v3"
@@ -51,7 +53,7 @@ class WooCommerceProvider(ProductProvider):
 
     def _get(self, path, params=None):
         url = self._base + path
-        return requests.get(url, auth=self._auth, params=params or {}, timeout=TIMEOUT)
+        return http_session(url).get(url, auth=self._auth, params=params or {}, timeout=TIMEOUT)
 
     def test_connection(self) -> dict:
         try:
@@ -71,6 +73,14 @@ class WooCommerceProvider(ProductProvider):
         except Exception:
             return []
 
+    def fetch_page(self, page, per_page, updated_since=None) -> list:
+        params = {"per_page": min(int(per_page), 100), "page": int(page), "orderby": "id", "order": "asc"}
+        if updated_since:
+            params["modified_after"] = updated_since.isoformat()
+        r = self._get("/products", params)
+        r.raise_for_status()
+        return [normalize_product(i) for i in (r.json() or [])]
+
     def get_product(self, external_id):
         try:
             r = self._get(f"/products/{external_id}")
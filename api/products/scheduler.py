@@ -0,0 +1,171 @@
+"""
+Scheduled product sync for every active external ProductSource.
+
+``manage.py run_product_sync`` loops over sources whose ``next_sync_at`` has
+passed, syncs them on a small thread pool (PRODUCT_SYNC_CONCURRENCY at once,
+across all tenants) and books the next run ``sync_interval_minutes`` later,
+jittered by ±JITTER so sources added together don't keep hitting their
+remotes — or our database — in lockstep.
+
+A source is claimed with a conditional UPDATE that pushes ``next_sync_at``
+LEASE_SECONDS ahead, the same visibility-timeout idea as api/jobs.py: any
+number of schedulers can run, each source syncs in exactly one of them, and
+a crashed run is picked up again once the lease passes.
+
+Runs are incremental where the provider supports it; a full pass (which also
+disables products removed upstream) happens at least every FULL_SYNC_HOURS.
+
+``cached_live`` sources are "live" sources whose chat reads are served from
+the local mirror (see ProductSource.reads_live); they are synced at least
+every CACHED_LIVE_INTERVAL_MINUTES. ``cache_live_sources()`` moves existing
+live sources over.
+"""
+import logging
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from back.models import ProductSource
+
+from .sync import sync_products
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = 1800            # longest expected single sync
+POLL_INTERVAL = 15.0            # idle sleep between empty claim rounds
+JITTER = 0.1                    # ± fraction of the interval
+CACHED_LIVE_INTERVAL_MINUTES = 10
+RETRY_MINUTES = 15              # after a failed sync (capped by the interval)
+FULL_SYNC_HOURS = 24
+
+SCHEDULED_MODES = ("sync", "cached_live")
+
+
+def _schedulable():
+    return (
+        ProductSource.objects.filter(is_active=True, mode__in=SCHEDULED_MODES)
+        .exclude(provider="internal")
+    )
+
+
+def interval(source):
+    minutes = max(1, source.sync_interval_minutes or 60)
+    if source.mode == "cached_live":
+        minutes = min(minutes, CACHED_LIVE_INTERVAL_MINUTES)
+    return timedelta(minutes=minutes)
+
+
+def next_run(source, now, failed=False):
+    """When ``source`` should sync next, jittered by ±JITTER."""
+    base = interval(source)
+    if failed:
+        base = min(base, timedelta(minutes=RETRY_MINUTES))
+    seconds = base.total_seconds()
+    return now + timedelta(seconds=seconds + random.uniform(-JITTER, JITTER) * seconds)
+
+
+def claim(limit=1, lease_seconds=LEASE_SECONDS):
+    """Lease up to ``limit`` due sources. Returns the leased rows."""
+    now = timezone.now()
+    due = Q(next_sync_at__isnull=True) | Q(next_sync_at__lte=now)
+    candidates = list(
+        _schedulable().filter(due).order_by("next_sync_at").values_list("pk", "next_sync_at")[: limit * 4]
+    )
+    lease = now + timedelta(seconds=lease_seconds)
+    claimed = []
+    for pk, booked in candidates:
+        # Only wins if nobody has re-booked the source since we read it.
+        unchanged = Q(next_sync_at__isnull=True) if booked is None else Q(next_sync_at=booked)
+        if ProductSource.objects.filter(unchanged, pk=pk).update(next_sync_at=lease):
+            claimed.append(pk)
+            if len(claimed) >= limit:
+                break
+    if not claimed:
+        return []
+    return list(ProductSource.objects.filter(pk__in=claimed).select_related("user"))
+
+
+def needs_full_sync(source, now):
+    return source.last_full_sync is None or now - source.last_full_sync > timedelta(hours=FULL_SYNC_HOURS)
+
+
+def run_source(source):
+    """Sync one leased source and book its next run. Never raises."""
+    close_old_connections()
+    failed = True
+    try:
+        result = sync_products(source, full=needs_full_sync(source, timezone.now()))
+        failed = source.status == "error"
+        logger.info(
+            "Scheduled sync source=%s %s: created=%d updated=%d unchanged=%d disabled=%d errors=%d",
+            source.pk, result["mode"], result["created"], result["updated"],
+            result["unchanged"], result["disabled"], len(result["errors"]),
+        )
+    except Exception:
+        logger.exception("Scheduled sync failed source=%s", source.pk)
+    finally:
+        try:
+            ProductSource.objects.filter(pk=source.pk).update(
+                next_sync_at=next_run(source, timezone.now(), failed=failed),
+            )
+        except Exception:
+            logger.exception("Could not book next sync source=%s", source.pk)
+        close_old_connections()
+    return not failed
+
+
+def cache_live_sources():
+    """Switch active live external sources to ``cached_live``. Returns the count.
+
+    Chat keeps querying the remote until the first scheduled sync has filled
+    the mirror, so the switch never serves an empty catalog.
+    """
+    return (
+        ProductSource.objects.filter(is_active=True, mode="live")
+        .exclude(provider="internal")
+        .update(mode="cached_live", next_sync_at=None)
+    )
+
+
+def run_scheduler(concurrency=None, stop_event=None, poll_interval=POLL_INTERVAL, once=False):
+    """Sync due sources until ``stop_event`` is set (or, with ``once``, until
+    nothing is due). At most ``concurrency`` syncs run at a time."""
+    concurrency = max(1, concurrency or getattr(settings, "PRODUCT_SYNC_CONCURRENCY", 2))
+    stop_event = stop_event or threading.Event()
+    in_flight = set()
+    lock = threading.Lock()
+
+    def _done(fut, pk):
+        with lock:
+            in_flight.discard(pk)
+
+    logger.info("Product sync scheduler started (concurrency=%d)", concurrency)
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="product-sync-run") as pool:
+        while not stop_event.is_set():
+            with lock:
+                free = concurrency - len(in_flight)
+                busy = bool(in_flight)
+            sources = []
+            if free > 0:
+                try:
+                    close_old_connections()
+                    sources = claim(limit=free)
+                except Exception:
+                    logger.exception("Product sync claim failed")
+            for source in sources:
+                with lock:
+                    in_flight.add(source.pk)
+                fut = pool.submit(run_source, source)
+                fut.add_done_callback(lambda f, pk=source.pk: _done(f, pk))
+
+            if once and not sources and not busy:
+                break
+            if not sources:
+                stop_event.wait(1.0 if once else poll_interval)
+    logger.info("Product sync scheduler stopped")
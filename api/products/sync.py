@@ -1,13 +1,33 @@
-"""Product sync — pull normalized products from a source and UPSERT locally."""
+"""Product sync — stream normalized products from a source and UPSERT locally.
 
+Pages are fetched a few at a time (``ProductProvider.iter_pages``) and written
+in chunks with one ``bulk_create(update_conflicts=True)`` per chunk, keyed on
+(source, external_id). Each row keeps a hash of the synced fields, so items
+that did not change since the last run are not written at all.
+
+  * full sync        — the whole catalog; after a clean run, local products
+                       the remote no longer lists are disabled (status=False).
+  * incremental sync — providers with ``supports_updated_since`` are asked
+                       only for products changed since ``source.last_synced``.
+                       Deletions can't be seen this way; run a full sync
+                       (``sync_products --full``) periodically for those.
+"""
+
+import hashlib
+import json
+import logging
 from decimal import Decimal, InvalidOperation
 
 from django.utils import timezone
 
 from .factory import get_provider_for_source
 
-MAX_PAGES = 20         # safety cap (a few hundred products at per_page=50)
-PER_PAGE = 50
+logger = logging.getLogger(__name__)
+
+PER_PAGE = 100
+CHUNK_SIZE = 500       # rows per bulk upsert / disable statement
+
+_SYNCED_FIELDS = ["name", "description", "price", "discounted_price", "stock_quantity", "status"]
 
 
 def _to_decimal(value):
@@ -22,62 +42,136 @@ def _to_decimal(value):
         return Decimal("0")
 
 
-def sync_products(source) -> dict:
+def _fields(item):
+    discounted = item.get("discounted_price")
+    return {
+        "name": item.get("name") or "Unnamed",
+        "description": item.get("description") or "",
+        "price": _to_decimal(item.get("price")),
+        "discounted_price": _to_decimal(discounted) if discounted else None,
+        "stock_quantity": int(item.get("stock") or 0),
+        "status": bool(item.get("in_stock", True)),
+    }
+
+
+def content_hash(fields):
+    """Stable hash of the synced fields (Decimals compared as strings)."""
+    payload = json.dumps([fields[f] for f in _SYNCED_FIELDS], default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+def sync_products(source, full=False) -> dict:
     """Pull products from ``source`` and upsert into local Product rows.
 
-    Returns {"created": int, "updated": int, "errors": [str]}.
+    Returns {"created", "updated", "unchanged", "disabled": int,
+    "errors": [str], "mode": "full" | "incremental"}.
     """
-    from back.models import Product
+    from back.models import CatalogVersion, Product
 
-    result = {"created": 0, "updated": 0, "errors": []}
+    started = timezone.now()
     provider = get_provider_for_source(source, user=source.user)
+    incremental = bool(not full and source.last_synced and provider.supports_updated_since)
+    result = {"created": 0, "updated": 0, "unchanged": 0, "disabled": 0, "errors": [],
+              "mode": "incremental" if incremental else "full"}
+
+    known = dict(
+        Product.objects.filter(source=source).exclude(external_id=None)
+        .values_list("external_id", "content_hash")
+    )
+    seen = set()
+    pending = {}
+
+    def flush():
+        if not pending:
+            return
+        _upsert(source, pending.items(), started)
+        for external_id in pending:
+            result["updated" if external_id in known else "created"] += 1
+        pending.clear()
 
     try:
-        all_items = []
-        for page in range(1, MAX_PAGES + 1):
-            batch = provider.list_products(limit=PER_PAGE, page=page)
-            if not batch:
-                break
-            all_items.extend(batch)
-            if len(batch) < PER_PAGE:
-                break
-
-        for item in all_items:
-            external_id = item.get("external_id")
-            if not external_id:
-                result["errors"].append("Skipped product with no external_id")
-                continue
-            try:
-                discounted = item.get("discounted_price")
-                defaults = {
-                    "name": item.get("name") or "Unnamed",
-                    "description": item.get("description") or "",
-                    "price": _to_decimal(item.get("price")),
-                    "discounted_price": _to_decimal(discounted) if discounted else None,
-                    "stock_quantity": int(item.get("stock") or 0),
-                    "status": bool(item.get("in_stock", True)),
-                }
-                obj, created = Product.objects.update_or_create(
-                    user=source.user,
-                    source=source,
-                    external_id=str(external_id),
-                    defaults=defaults,
-                )
-                if created:
-                    result["created"] += 1
-                else:
-                    result["updated"] += 1
-            except Exception as e:
-                result["errors"].append(f"{external_id}: {e}")
-
-        source.last_synced = timezone.now()
+        pages = provider.iter_pages(
+            per_page=PER_PAGE, updated_since=source.last_synced if incremental else None,
+        )
+        for rows in pages:
+            for item in rows:
+                external_id = item.get("external_id")
+                if not external_id:
+                    result["errors"].append("Skipped product with no external_id")
+                    continue
+                external_id = str(external_id)
+                try:
+                    fields = _fields(item)
+                except Exception as e:
+                    result["errors"].append(f"{external_id}: {e}")
+                    continue
+                seen.add(external_id)
+                fields["content_hash"] = content_hash(fields)
+                if known.get(external_id) == fields["content_hash"]:
+                    result["unchanged"] += 1
+                    continue
+                pending[external_id] = fields
+                if len(pending) >= CHUNK_SIZE:
+                    flush()
+        flush()
+
+        if not incremental:
+            result["disabled"] = _disable_missing(source, seen)
+
+        source.last_synced = started
+        if not incremental:
+            source.last_full_sync = started
         source.status = "connected"
         source.last_error = ""
         source.save()
     except Exception as e:
+        # Nothing is disabled after a failed page: the catalog was only partly read.
+        logger.warning("Product sync failed for source %s: %s", source.pk, e)
         result["errors"].append(str(e))
         source.status = "error"
         source.last_error = str(e)
         source.save()
 
+    # bulk writes skip the Product signals — drop this tenant's caches here
+    # and bump its CatalogVersion for other processes. Rows upserted before a
+    # failure count too.
+    if result["created"] or result["updated"] or result["disabled"]:
+        CatalogVersion.bump(source.user_id)
+    from api.ai import product_index, response_cache
+    product_index.invalidate(source.user_id)
+    response_cache.invalidate(source.user_id)
     return result
+
+
+def _upsert(source, items, now):
+    from api.ai.product_index import name_forms
+    from back.models import Product
+
+    objs = []
+    for external_id, fields in items:
+        latin, tokens = name_forms(fields["name"])
+        objs.append(Product(
+            user=source.user, source=source, external_id=external_id,
+            name_latin=latin, name_tokens=tokens, last_synced=now, **fields,
+        ))
+    Product.objects.bulk_create(
+        objs,
+        update_conflicts=True,
+        unique_fields=["source", "external_id"],
+        update_fields=_SYNCED_FIELDS + ["content_hash", "name_latin", "name_tokens", "last_synced"],
+    )
+
+
+def _disable_missing(source, seen):
+    from back.models import Product
+
+    active = (
+        Product.objects.filter(source=source, status=True).exclude(external_id=None)
+        .values_list("external_id", flat=True)
+    )
+    missing = [eid for eid in active if eid not in seen]
+    now = timezone.now()
+    for i in range(0, len(missing), CHUNK_SIZE):
+        Product.objects.filter(source=source, external_id__in=missing[i:i + CHUNK_SIZE]) \
+            .update(status=False, content_hash="", last_synced=now)
+    return len(missing)
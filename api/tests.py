@@ -1,3 +1,1031 @@
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.utils import timezone
+
+from api import debounce, jobs, webhooks
+from api.ai import product_index, response_cache, sender
+from api.ai.context import PlanStep, Response
+from api.ai.executor import Executor
+from api.ai.streaming import StreamingReply
+from api.ai.tools import (
+    BaseTool, ToolRegistry, ToolResult, _focus_products, _generate_search_queries, _latinize_bn,
+    parse_focus_products, tool_search_products,
+)
+from api.products.providers import cached as provider_cache
+from api.products import scheduler
+from api.products.providers.base import ProductProvider
+from api.products.sync import sync_products
+from api.webhooks import (
+    _acquire_conversation_lease, _fire_batch_pipeline, _release_conversation_lease,
+)
+from back.models import (
+    BackgroundJob, Conversation, ConversationLease, Integration, Message, MessageBatch, Product, ProductSource,
+)
+
+
+class JobQueueTests(TestCase):
+    def test_dedupe_key_reschedules_instead_of_duplicating(self):
+        first = jobs.enqueue("batch_pipeline", {"conversation_id": 1}, delay=5, dedupe_key="batch_pipeline:1")
+        second = jobs.enqueue("batch_pipeline", {"conversation_id": 1}, delay=30, dedupe_key="batch_pipeline:1")
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(BackgroundJob.objects.count(), 1)
+        self.assertGreater(BackgroundJob.objects.get().run_at, first.run_at)
+
+    def test_claim_leases_each_job_once(self):
+        jobs.enqueue("fetch_profile", {"conv_id": 1, "customer_id": "x"})
+        self.assertEqual(len(jobs.claim("w1", limit=5)), 1)
+        self.assertEqual(jobs.claim("w2", limit=5), [])
+
+    def test_future_jobs_are_not_claimed(self):
+        jobs.enqueue("fetch_profile", {"conv_id": 1, "customer_id": "x"}, delay=60)
+        self.assertEqual(jobs.claim("w1"), [])
+
+    def test_expired_lease_is_reclaimed(self):
+        jobs.enqueue("fetch_profile", {"conv_id": 1, "customer_id": "x"})
+        jobs.claim("w1")
+        BackgroundJob.objects.update(leased_until=timezone.now() - timedelta(seconds=1))
+        reclaimed = jobs.claim("w2")
+        self.assertEqual(len(reclaimed), 1)
+        self.assertEqual(reclaimed[0].leased_by, "w2")
+        self.assertEqual(reclaimed[0].attempts, 2)
+
+    def test_failure_retries_with_backoff_then_fails(self):
+        jobs.enqueue("fetch_profile", {"conv_id": 1, "customer_id": "x"}, max_attempts=2)
+        with mock.patch("api.webhooks._fetch_profile_job", side_effect=RuntimeError("boom")):
+            job = jobs.claim("w1")[0]
+            self.assertFalse(jobs.run_job(job, "w1"))
+            job.refresh_from_db()
+            self.assertEqual(job.status, "queued")
+            self.assertGreater(job.run_at, timezone.now())
+
+            BackgroundJob.objects.update(run_at=timezone.now())
+            job = jobs.claim("w1")[0]
+            jobs.run_job(job, "w1")
+            job.refresh_from_db()
+            self.assertEqual(job.status, "failed")
+            self.assertIn("boom", job.last_error)
+
+    def test_webhook_persist_failure_is_retried(self):
+        user = get_user_model().objects.create_user(username="hook_user", password="x1234567")
+        integration = Integration.objects.create(user=user, platform="messenger", access_token="tok")
+        jobs.enqueue("process_webhook", {
+            "integration_id": integration.pk, "platform": "messenger",
+            "messages": [{"message_id": "m.1", "customer_id": "c1", "text": "hi"},
+                         {"message_id": "m.2", "customer_id": "c1", "text": "there"}],
+        })
+        job = jobs.claim("w1")[0]
+        real = webhooks._persist_message
+
+        def flaky(user, platform, msg_data, *args):
+            if msg_data["message_id"] == "m.2":
+                raise RuntimeError("db down")
+            return real(user, platform, msg_data, *args)
+
+        with mock.patch("api.webhooks._persist_message", side_effect=flaky):
+            self.assertTrue(jobs.run_job(job, "w1"))
+        retry = BackgroundJob.objects.get(kind="process_webhook", status="queued")
+        self.assertEqual([m["message_id"] for m in retry.payload["messages"]], ["m.2"])
+        self.assertEqual(retry.payload["attempt"], 2)
+        self.assertEqual(Message.objects.filter(mid="m.1").count(), 1)
+
+    def test_redelivered_image_is_not_analyzed_again(self):
+        from billing.models import Plan, UserBalance
+
+        user = get_user_model().objects.create_user(username="vision_user", password="x1234567")
+        plan, _ = Plan.objects.get_or_create(name="free")
+        UserBalance.objects.update_or_create(user=user, defaults={
+            "plan": plan, "credits_remaining": 10, "renewal_date": timezone.now().date(),
+        })
+        msg = {"message_id": "m.img", "customer_id": "c9", "text": "",
+               "attachments": {"type": "image", "url": "https://cdn.example.com/x.jpg"}}
+        with mock.patch("api.ai.media.analyze_image_structured", return_value={"description": "a cradle"}) as vision, \
+                mock.patch("billing.deductions.deduct_for_reply"):
+            for _ in range(2):
+                webhooks._persist_message(user, "messenger", dict(msg), "tok", True)
+        self.assertEqual(vision.call_count, 1)
+        self.assertEqual(Message.objects.filter(mid="m.img").count(), 1)
+
+    def test_success_marks_done(self):
+        jobs.enqueue("process_webhook", {"integration_id": 999999, "platform": "messenger", "messages": []})
+        job = jobs.claim("w1")[0]
+        self.assertTrue(jobs.run_job(job, "w1"))
+        job.refresh_from_db()
+        self.assertEqual(job.status, "done")
+
+    def test_purge_measures_age_from_completion(self):
+        # Enqueued (and last saved) two days ago, retried until it finishes now.
+        jobs.enqueue("process_webhook", {"integration_id": 999999, "platform": "messenger", "messages": []})
+        BackgroundJob.objects.update(updated_at=timezone.now() - timedelta(days=2))
+        job = jobs.claim("w1")[0]
+        jobs.run_job(job, "w1")
+        self.assertEqual(jobs.purge_finished(), 0)
+        BackgroundJob.objects.update(updated_at=timezone.now() - jobs.PURGE_AFTER - timedelta(minutes=1))
+        self.assertEqual(jobs.purge_finished(), 1)
+
+
+class ConversationLeaseTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(username="lease_user", password="x1234567")
+        self.conv = Conversation.objects.create(user=user, platform="messenger", customer_id="c1")
+
+    def test_only_one_owner_at_a_time(self):
+        self.assertTrue(_acquire_conversation_lease(self.conv.pk, "a"))
+        self.assertFalse(_acquire_conversation_lease(self.conv.pk, "b"))
+        _release_conversation_lease(self.conv.pk, "a")
+        self.assertTrue(_acquire_conversation_lease(self.conv.pk, "b"))
+
+    def test_expired_lease_can_be_taken_over(self):
+        self.assertTrue(_acquire_conversation_lease(self.conv.pk, "a"))
+        ConversationLease.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertTrue(_acquire_conversation_lease(self.conv.pk, "b"))
+
+    def test_busy_lease_requeues_batch_job(self):
+        _acquire_conversation_lease(self.conv.pk, "a")
+        _fire_batch_pipeline(self.conv.pk)
+        job = BackgroundJob.objects.get()
+        self.assertEqual(job.kind, "batch_pipeline")
+        self.assertEqual(job.payload, {"conversation_id": self.conv.pk})
+
+    def _crash_turn(self, reply_saved):
+        def process(orch, conversation, incoming_message):
+            orch._reply_saved = reply_saved
+            raise RuntimeError("memory extraction blew up")
+        Integration.objects.create(user=self.conv.user, platform="messenger", access_token="tok", is_enabled=True)
+        MessageBatch.objects.create(conversation=self.conv, message_text="price?", platform="messenger")
+        return mock.patch("api.ai.orchestrator.Orchestrator.process", autospec=True, side_effect=process)
+
+    def test_crash_after_reply_is_not_retried(self):
+        with self._crash_turn(reply_saved=True):
+            _fire_batch_pipeline(self.conv.pk)
+        self.assertFalse(MessageBatch.objects.filter(processed=False).exists())
+
+    def test_crash_before_reply_keeps_batches_for_retry(self):
+        with self._crash_turn(reply_saved=False), self.assertRaises(RuntimeError):
+            _fire_batch_pipeline(self.conv.pk)
+        self.assertTrue(MessageBatch.objects.filter(processed=False).exists())
+
+
+class BurstWindowTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(username="burst_user", password="x1234567")
+        self.conv = Conversation.objects.create(user=user, platform="whatsapp", customer_id="c2")
+
+    def _batch(self, text, seconds_ago, processed=False):
+        b = MessageBatch.objects.create(conversation=self.conv, message_text=text, platform="whatsapp", processed=processed)
+        MessageBatch.objects.filter(pk=b.pk).update(timestamp=timezone.now() - timedelta(seconds=seconds_ago))
+
+    def test_question_fires_almost_immediately(self):
+        self._batch("price koto?", 0)
+        self.assertLessEqual(debounce.burst_delay(self.conv.pk, "whatsapp"), debounce.TERMINAL_WAIT_SECONDS)
+
+    def test_no_history_uses_default_window(self):
+        self._batch("ami ekta", 0)
+        self.assertAlmostEqual(debounce.burst_delay(self.conv.pk), debounce.DEFAULT_WAIT_SECONDS, delta=0.1)
+
+    def test_learns_fast_typist_gaps(self):
+        # Earlier bursts with ~1s gaps between messages.
+        for i in range(8):
+            self._batch("x", 600 - i, processed=True)
+        self._batch("ami ekta", 0)
+        self.assertEqual(debounce.burst_delay(self.conv.pk), debounce.MIN_WAIT_SECONDS)
+
+    def test_max_burst_cap(self):
+        self._batch("first", debounce.MAX_BURST_SECONDS - 1)
+        self._batch("still typing", 0)
+        self.assertLessEqual(debounce.burst_delay(self.conv.pk), 1.1)
+
+
+class StreamingReplyTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(username="stream_user", password="x1234567")
+        self.conv = Conversation.objects.create(user=user, platform="telegram", customer_id="c3")
+        self.context = mock.Mock(conversation=self.conv, tool_results=[])
+        self.sent = []
+
+    def _sink(self):
+        def send(conversation, texts):
+            self.sent.extend(texts)
+            return {"ok": True, "sent": {"texts": len(texts)}, "errors": []}
+        return StreamingReply(self.conv, self.context, send=send, typing=lambda c: True)
+
+    def test_flushes_finished_paragraphs_only(self):
+        sink = self._sink()
+        for delta in ["Hello the", "re!\n", "\nThe price is 450", ".00 taka"]:
+            sink.feed(delta)
+        self.assertEqual(self.sent, ["Hello there!"])
+        self.assertEqual(sink.remaining_text("Hello there!\n\nThe price is 450.00 taka"), "The price is 450.00 taka")
+
+    def test_unsafe_part_stops_streaming(self):
+        sink = self._sink()
+        sink.feed("Hi!\n\nchud\n\nBye\n\n")
+        self.assertEqual(self.sent, ["Hi!"])
+        self.assertFalse(sink.active)
+        self.assertIn("unsafe_content", sink.stop_reason)
+
+    def test_rewritten_reply_is_not_a_prefix(self):
+        sink = self._sink()
+        sink.feed("Hi!\n\n")
+        self.assertIsNone(sink.remaining_text("Sorry, I can't respond to that."))
+
+    def test_tool_call_turn_discards_buffer(self):
+        sink = self._sink()
+        sink.feed("Let me check")
+        sink.end_turn(final=False)
+        self.assertTrue(sink.active)
+        self.assertEqual(sink.buffer, "")
+        self.assertEqual(self.sent, [])
+
+    def _orchestrator(self, sink):
+        from api.ai.orchestrator import Orchestrator
+
+        orch = Orchestrator()
+        orch._stream = sink
+        orch._received_at = None
+        return orch
+
+    def test_rewrite_after_streaming_sends_only_the_rest(self):
+        sink = self._sink()
+        sink.feed("Hi!\n\n")
+        orch = self._orchestrator(sink)
+        response = orch._final_gate(Response(text="Hi!\n\nchud"), self.context, "r1")
+        self.assertIn("unsafe_content", orch._validation_issues)
+        self.assertNotIn("Hi!", response.text)
+        with mock.patch("api.ai.sender.send_reply", return_value={"ok": True, "sent": {}, "errors": []}) as send:
+            orch._save_and_send(self.conv, response, "r1", streamed="Hi!")
+        self.assertNotIn("Hi!", send.call_args.args[1])
+        self.assertTrue(Message.objects.get(conversation=self.conv, sender="bot").text.startswith("Hi!\n\n"))
+
+    def test_fully_streamed_reply_is_saved_without_resending(self):
+        sink = self._sink()
+        sink.feed("Hi!\n\nPrice is 450 taka.\n\n")
+        orch = self._orchestrator(sink)
+        response = orch._final_gate(Response(text=""), self.context, "r2")
+        self.assertEqual(response.text, "")
+        with mock.patch("api.ai.sender.send_reply") as send:
+            orch._save_and_send(self.conv, response, "r2", streamed="Hi!\n\nPrice is 450 taka.")
+        send.assert_not_called()
+        self.assertEqual(Message.objects.get(conversation=self.conv, sender="bot").text, "Hi!\n\nPrice is 450 taka.")
+
+    def test_early_parts_are_capped(self):
+        sink = self._sink()
+        sink.feed("One.\n\nTwo.\n\nThree.\n\nFour.")
+        self.assertEqual(self.sent, ["One.", "Two."])
+        self.assertEqual(sink.remaining_text("One.\n\nTwo.\n\nThree.\n\nFour."), "Three.\n\nFour.")
+
+
+@mock.patch("context.embeddings.generate_embedding", return_value=[1.0, 0.0])
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        response_cache.clear()
+        self.user = get_user_model().objects.create_user(username="cache_user", password="x1234567")
+        conv = Conversation.objects.create(user=self.user, platform="messenger", customer_id="c4")
+        conv.language_detected = "bn"
+        self.context = mock.Mock(user=self.user, conversation=conv)
+
+    def _remember(self, text, reply="ডেলিভারি চার্জ ৬০ টাকা।"):
+        probe = response_cache.lookup(self.context, "ASK_DELIVERY", text)
+        response_cache.store(probe, Response(text=reply), credits=0.25)
+        return probe
+
+    def test_exact_repeat_hits(self, _emb):
+        self._remember("Delivery charge koto?")
+        probe = response_cache.lookup(self.context, "ASK_DELIVERY", "delivery  charge KOTO")
+        self.assertIsNotNone(probe.entry)
+        self.assertEqual(probe.entry.credits, 0.25)
+
+    def test_similar_wording_hits_by_embedding(self, _emb):
+        self._remember("Delivery charge koto?")
+        probe = response_cache.lookup(self.context, "ASK_DELIVERY", "delivery kharoch koto")
+        self.assertIsNotNone(probe.entry)
+        self.assertEqual(probe.score, 1.0)
+
+    def test_other_intent_misses(self, _emb):
+        self._remember("Delivery charge koto?")
+        probe = response_cache.lookup(self.context, "ASK_PAYMENT", "Delivery charge koto?")
+        self.assertIsNone(probe.entry)
+
+    def test_reply_is_never_served_to_another_customer(self, _emb):
+        self._remember("Delivery charge koto?", reply="Rahim bhai, Mirpur e delivery 60 taka.")
+        other = Conversation.objects.create(user=self.user, platform="messenger", customer_id="c5")
+        other.language_detected = "bn"
+        other_context = mock.Mock(user=self.user, conversation=other)
+        for text in ("Delivery charge koto?", "delivery kharoch koto"):
+            self.assertIsNone(response_cache.lookup(other_context, "ASK_DELIVERY", text).entry)
+        probe = response_cache.lookup(self.context, "ASK_DELIVERY", "Delivery charge koto?")
+        self.assertEqual(probe.entry.text, "Rahim bhai, Mirpur e delivery 60 taka.")
+
+    def test_non_cacheable_intent_is_skipped(self, _emb):
+        self.assertIsNone(response_cache.lookup(self.context, "CREATE_ORDER", "order korbo"))
+
+    def test_product_change_invalidates(self, _emb):
+        self._remember("ki ki ache")
+        Product.objects.create(user=self.user, name="Achar", price=100)
+        probe = response_cache.lookup(self.context, "ASK_DELIVERY", "ki ki ache")
+        self.assertIsNone(probe.entry)
+
+    def test_stock_only_write_changes_context_version(self, _emb):
+        product = Product.objects.create(user=self.user, name="Achar", price=100, stock_quantity=5)
+        before = response_cache.context_version(self.user.pk)
+        product.stock_quantity = 4
+        product.save(update_fields=["stock_quantity"])   # as create_order does
+        response_cache._versions.clear()    # as seen from another process
+        self.assertNotEqual(response_cache.context_version(self.user.pk), before)
+
+    def test_lru_bound(self, _emb):
+        with self.settings(AI_RESPONSE_CACHE_MAX_ENTRIES=2, AI_RESPONSE_CACHE_MIN_SCORE=1.01):
+            for q in ("one", "two", "three"):
+                self._remember(q)
+        cached = [key[3] for key in response_cache._tenants[self.user.pk]]
+        self.assertEqual(cached, ["two", "three"])
+
+
+class _FakeTool(BaseTool):
+    def __init__(self, name, delay=0.0, result=None, side_effects=False, log=None):
+        self.name = name
+        self.delay = delay
+        self.result = result
+        self.side_effects = side_effects
+        self.log = log if log is not None else []
+
+    def execute(self, args, user, conversation):
+        self.log.append(("start", self.name, dict(args)))
+        time.sleep(self.delay)
+        self.log.append(("end", self.name))
+        return self.result or ToolResult.success({"ok": self.name}, tool=self.name)
+
+
+class _FocusTool(_FakeTool):
+    """Focuses a product named after the tool, like search_products does."""
+
+    def execute(self, args, user, conversation):
+        time.sleep(self.delay)
+        _focus_products(conversation, [{"pid": self.name, "name": self.name}])
+        return ToolResult.success({"ok": self.name}, tool=self.name)
+
+
+@mock.patch("api.ai.executor.Executor._write_audit")
+class ExecutorTests(TestCase):
+    def setUp(self):
+        self._saved_tools = ToolRegistry._tools
+        ToolRegistry._tools = {}
+        self.log = []
+        user = get_user_model().objects.create_user(username="exec_user", password="x1234567")
+        self.context = mock.Mock(user=user, conversation=None)
+
+    def tearDown(self):
+        ToolRegistry._tools = self._saved_tools
+
+    def _tool(self, name, **kwargs):
+        ToolRegistry.register(_FakeTool(name, log=self.log, **kwargs))
+
+    def test_independent_steps_overlap(self, _audit):
+        for name in ("kb", "order_status", "inventory"):
+            self._tool(name, delay=0.2)
+        t0 = time.monotonic()
+        results = Executor.execute([PlanStep("kb"), PlanStep("order_status"), PlanStep("inventory")], self.context)
+        self.assertLess(time.monotonic() - t0, 0.5)
+        self.assertEqual([r.data["ok"] for r in results], ["kb", "order_status", "inventory"])
+        runs = {c.kwargs["plan_run"] for c in _audit.call_args_list}
+        self.assertEqual(len(runs), 1)
+        self.assertTrue(all(c.kwargs["start_offset_ms"] < 150 for c in _audit.call_args_list))
+
+    def test_depends_on_waits(self, _audit):
+        self._tool("slow", delay=0.1)
+        self._tool("after")
+        Executor.execute([PlanStep("slow"), PlanStep("after", depends_on=[0])], self.context)
+        self.assertLess(self.log.index(("end", "slow")), self.log.index(("start", "after", {})))
+
+    def test_propagated_pid_reaches_waiting_step(self, _audit):
+        self._tool("search_products", delay=0.1,
+                   result=ToolResult.success({"products": [{"pid": 7}]}, tool="search_products"))
+        self._tool("get_product_details")
+        Executor.execute([PlanStep("search_products"), PlanStep("get_product_details")], self.context)
+        self.assertIn(("start", "get_product_details", {"pid": 7}), self.log)
+
+    def test_side_effect_step_waits_for_earlier_steps(self, _audit):
+        self._tool("kb", delay=0.1)
+        self._tool("write", side_effects=True)
+        self._tool("later")
+        Executor.execute([PlanStep("kb"), PlanStep("write"), PlanStep("later")], self.context)
+        order = [e[1] for e in self.log]
+        self.assertEqual(order, ["kb", "kb", "write", "write", "later", "later"])
+
+    def test_timeout_runs_fallback(self, _audit):
+        self._tool("stuck", delay=0.5)
+        self._tool("backup")
+        results = Executor.execute(
+            [PlanStep("stuck", fallback="backup", timeout_ms=50), PlanStep("backup")],
+            self.context,
+        )
+        self.assertEqual([r.state for r in results], ["error", "success", "success"])
+        self.assertIn("Timed out", results[0].error)
+
+    def test_failure_drops_later_results(self, _audit):
+        self._tool("broken", result=ToolResult.as_error("down", tool="broken"))
+        self._tool("kb", delay=0.05)
+        self._tool("write", side_effects=True)
+        results = Executor.execute([PlanStep("broken"), PlanStep("kb"), PlanStep("write")], self.context)
+        self.assertEqual([r.tool for r in results], ["broken"])
+        self.assertNotIn(("start", "write", {}), self.log)
+
+    def test_focus_changes_follow_plan_order(self, _audit):
+        conv = Conversation.objects.create(user=self.context.user, platform="messenger", customer_id="f1")
+        self.context.conversation = conv
+        ToolRegistry.register(_FocusTool("slow_pick", delay=0.1))
+        ToolRegistry.register(_FocusTool("fast_pick"))
+        Executor.execute([PlanStep("slow_pick"), PlanStep("fast_pick")], self.context)
+        conv.refresh_from_db()
+        # As if run one after the other: the later step's product is the newest.
+        self.assertEqual([p["pid"] for p in parse_focus_products(conv.current_product)], ["fast_pick", "slow_pick"])
+
+    def test_inline_mode_is_sequential(self, _audit):
+        self._tool("a", delay=0.05)
+        self._tool("b")
+        with self.settings(AI_EXECUTOR_MAX_WORKERS=0):
+            Executor.execute([PlanStep("a"), PlanStep("b")], self.context)
+        self.assertEqual([e[1] for e in self.log], ["a", "a", "b", "b"])
+
+
+class ProductIndexTests(TestCase):
+    def setUp(self):
+        product_index.invalidate()
+        self.user = get_user_model().objects.create_user(username="index_user", password="x1234567")
+
+    def _product(self, name, description="", price=100, **kwargs):
+        return Product.objects.create(user=self.user, name=name, description=description, price=price, **kwargs)
+
+    def _names(self, query, **kwargs):
+        return [p["name"] for p in tool_search_products(self.user, query, **kwargs)["products"]]
+
+    def test_match_equals_icontains(self):
+        from django.db.models import Q
+
+        self._product("Mastela Baby Cradle", "Wooden swing cradle")
+        self._product("Aveeno Baby Lotion", "Daily moisture", external_id="AV-77")
+        self._product("জলপাইয়ের আচার", "Homemade olive pickle")
+        self._product("Feeding Bottle", "BPA free", status=False)
+        index = product_index.get_index(self.user.pk)
+        for query in ("baby", "av-7", "dolna ache?", "জলপাই আচার", "pickle", "le"):
+            variations = list(_generate_search_queries(query))
+            combined = Q()
+            for v in variations:
+                combined |= Q(name__icontains=v) | Q(description__icontains=v) \
+                    | Q(pid__icontains=v) | Q(external_id__icontains=v)
+            expected = set(Product.objects.filter(user=self.user, status=True).filter(combined)
+                           .values_list("pid", flat=True))
+            got = {index.docs[i].pid for i in index.match(variations)}
+            self.assertEqual(got, expected, query)
+
+    def test_bm25_ranks_name_hits_first(self):
+        self._product("Baby Walker", "Pairs well with a cradle")
+        self._product("Mastela Cradle", "Wooden")
+        self.assertEqual(self._names("dolna")[0], "Mastela Cradle")
+
+    def test_romanized_query_finds_bengali_name(self):
+        self._product("লেবুর আচার")
+        self._product("আমের আচার")
+        self.assertEqual(self._names("lebur achar"), ["লেবুর আচার"])
+
+    def test_budget_filter(self):
+        self._product("Cradle Small", price=900)
+        self._product("Cradle Large", price=3000, discounted_price=2500)
+        self.assertEqual(self._names("cradle", max_price=1000), ["Cradle Small"])
+        self.assertEqual(self._names("cradle", min_price=2000), ["Cradle Large"])
+
+    def test_save_invalidates(self):
+        self._product("Cradle")
+        self.assertEqual(self._names("walker"), [])
+        self._product("Baby Walker")
+        self.assertEqual(self._names("walker"), ["Baby Walker"])
+
+    def test_stock_only_write_is_seen_by_other_processes(self):
+        product = self._product("Cradle", stock_quantity=5)
+        index = product_index.get_index(self.user.pk)
+        product.stock_quantity = 0
+        with mock.patch("api.ai.product_index.invalidate"):     # the signal fires in another process
+            product.save(update_fields=["stock_quantity"])
+        product_index._checked[self.user.pk] = 0
+        rebuilt = product_index.get_index(self.user.pk)
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual(rebuilt.docs[0].row["stock"], 0)
+
+    def test_search_makes_no_queries_once_built(self):
+        self._product("Cradle")
+        index = product_index.get_index(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertIs(product_index.get_index(self.user.pk), index)
+            index.match(["cradle"])
+
+    def test_registry_evicts_least_recently_used_tenant(self):
+        other = get_user_model().objects.create_user(username="index_other", password="x1234567")
+        Product.objects.create(user=other, name="Walker", price=10)
+        self._product("Cradle")
+        product_index.get_index(self.user.pk)
+        budget = product_index._indexes[self.user.pk].nbytes
+        with self.settings(PRODUCT_INDEX_MAX_BYTES=budget):
+            product_index.get_index(other.pk)
+        self.assertEqual(list(product_index._indexes), [other.pk])
+        self.assertNotIn(self.user.pk, product_index._checked)
+        self.assertEqual(len(product_index.get_index(self.user.pk)), 1)     # rebuilt on demand
+
+    def test_match_cache_is_bounded(self):
+        self._product("লেবুর আচার")
+        index = product_index.get_index(self.user.pk)
+        with mock.patch.object(product_index, "MATCH_CACHE_MAX", 3):
+            index.latin_matches([f"lebu{i}" for i in range(10)])
+        self.assertLessEqual(len(index._match_cache), 3)
+
+
+class ProductNameFormsTests(TestCase):
+    NAMES = [
+        "জলপাইয়ের আচার", "লেবুর আচার", "আমের আচার", "তেঁতুল", "বরই আচার ৫০০ গ্রাম",
+        "Mastela Baby Cradle", "Aveeno Lotion 200ml", "শিশুর দোলনা (Cradle)", "", "ড়ঢ়য় test",
+    ]
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="forms_user", password="x1234567")
+
+    def test_stored_forms_match_live_latinization(self):
+        for name in self.NAMES:
+            p = Product.objects.create(user=self.user, name=name, price=10)
+            p.refresh_from_db()
+            self.assertEqual(p.name_latin, _latinize_bn(name).lower(), name)
+            self.assertEqual(p.name_tokens, product_index.name_forms(name)[1], name)
+
+    def test_rename_refreshes_forms(self):
+        p = Product.objects.create(user=self.user, name="আমের আচার", price=10)
+        p.name = "লেবুর আচার"
+        p.save()
+        p.refresh_from_db()
+        self.assertEqual(p.name_latin, "lebur achar")
+
+    def test_backfill_fixes_stale_rows(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        for name in self.NAMES:
+            Product.objects.create(user=self.user, name=name, price=10)
+        Product.objects.update(name_latin="", name_tokens="")
+        call_command("backfill_product_name_forms", stdout=StringIO())
+        for p in Product.objects.all():
+            self.assertEqual((p.name_latin, p.name_tokens), product_index.name_forms(p.name))
+        out = StringIO()
+        call_command("backfill_product_name_forms", "--check", stdout=out)
+        self.assertIn("0 of", out.getvalue())
+
+
+class _SlowProvider(ProductProvider):
+    def __init__(self, delays, rows_per_query=2):
+        super().__init__(None)
+        self.delays = delays
+        self.rows_per_query = rows_per_query
+        self.calls = []
+
+    def search(self, query, limit=5):
+        self.calls.append(query)
+        time.sleep(self.delays.get(query, 0.05))
+        if query == "boom":
+            raise RuntimeError("down")
+        return [{"external_id": f"{query}-{i}", "name": query} for i in range(self.rows_per_query)]
+
+    test_connection = list_products = get_product = create_order = get_order_status = None
+
+
+class ProviderSearchFanoutTests(TestCase):
+    def test_variations_run_concurrently_in_order(self):
+        provider = _SlowProvider({"a": 0.3, "b": 0.1, "c": 0.1})
+        t0 = time.monotonic()
+        rows, attempted, errored = provider.search_many(["a", "b", "c"], limit=5)
+        self.assertLess(time.monotonic() - t0, 0.5)
+        self.assertEqual([r["external_id"] for r in rows], ["a-0", "a-1", "b-0", "b-1", "c-0", "c-1"])
+        self.assertEqual((attempted, errored), (3, 0))
+
+    def test_stops_issuing_once_enough_ids(self):
+        provider = _SlowProvider({})
+        with self.settings(PRODUCT_SEARCH_CONCURRENCY=1):
+            rows, attempted, _ = provider.search_many(["a", "b", "c", "d"], limit=5, want=4)
+        self.assertEqual(attempted, 2)
+        self.assertEqual(len(rows), 4)
+
+    def test_deadline_and_errors_count_as_errored(self):
+        provider = _SlowProvider({"slow": 1.0})
+        rows, attempted, errored = provider.search_many(["boom", "slow", "ok"], limit=5, deadline=0.3)
+        self.assertEqual([r["external_id"] for r in rows], ["ok-0", "ok-1"])
+        self.assertEqual((attempted, errored), (3, 2))
+
+
+class _FakeCatalog(ProductProvider):
+    def __init__(self, source):
+        super().__init__(source)
+        self.calls = 0
+        self.down = False
+        self.last_error = None
+
+    def get_product(self, external_id):
+        self.calls += 1
+        if self.down:
+            self.last_error = ConnectionError("refused")
+            return None
+        if external_id == "missing":
+            return None
+        return {"external_id": external_id, "name": f"Item {external_id}", "calls": self.calls}
+
+    test_connection = list_products = search = create_order = get_order_status = None
+
+
+class CachedProviderTests(TestCase):
+    def setUp(self):
+        provider_cache.clear()
+        self.inner = _FakeCatalog(mock.Mock(pk=41))
+        self.provider = provider_cache.CachedProvider(self.inner)
+
+    def test_repeat_lookup_is_served_from_cache(self):
+        self.provider.get_product("7")
+        self.assertEqual(self.provider.get_product("7")["calls"], 1)
+        self.assertEqual(self.inner.calls, 1)
+        self.assertEqual(provider_cache.stats(41)["hits"], 1)
+
+    def test_misses_are_cached_briefly(self):
+        self.assertIsNone(self.provider.get_product("missing"))
+        self.assertIsNone(self.provider.get_product("missing"))
+        self.assertEqual(self.inner.calls, 1)
+
+    def test_outage_serves_stale_entry(self):
+        self.provider.get_product("7")
+        self.inner.down = True
+        provider_cache._entries[(41, "get_product", ("7",))].ttl = 0
+        with mock.patch.object(provider_cache, "SWR_SECONDS", 0):
+            row = self.provider.get_product("7")
+        self.assertEqual(row["name"], "Item 7")
+        self.assertIsNone(self.provider.last_error)
+        self.assertEqual(provider_cache.stats(41)["stale_on_error"], 1)
+
+    def test_outage_without_entry_reports_error(self):
+        self.inner.down = True
+        self.assertIsNone(self.provider.get_product("7"))
+        self.assertIsNotNone(self.provider.last_error)
+
+    def test_concurrent_failure_is_not_cached(self):
+        reported, cleared = threading.Event(), threading.Event()
+        original = self.inner.get_product
+
+        def racy(external_id):
+            if external_id == "bad":
+                self.inner.last_error = ConnectionError("refused")
+                reported.set()
+                cleared.wait(timeout=2)
+                return None
+            reported.wait(timeout=2)
+            self.inner.last_error = None
+            cleared.set()
+            return original(external_id)
+
+        self.inner.get_product = racy
+        worker = threading.Thread(target=self.provider.get_product, args=("7",))
+        worker.start()
+        self.assertIsNone(self.provider.get_product("bad"))
+        worker.join()
+        self.assertNotIn((41, "get_product", ("bad",)), provider_cache._entries)
+        self.assertEqual(provider_cache.stats(41)["errors"], 1)
+
+    def test_stale_entry_is_revalidated_in_background(self):
+        self.provider.get_product("7")
+        provider_cache._entries[(41, "get_product", ("7",))].ttl = 0
+        self.assertEqual(self.provider.get_product("7")["calls"], 1)  # stale, served at once
+        for _ in range(50):
+            if self.inner.calls == 2:
+                break
+            time.sleep(0.01)
+        time.sleep(0.05)
+        self.assertEqual(self.provider.get_product("7")["calls"], 2)
+
+
+class _PagedCatalog(ProductProvider):
+    exact_page_size = False  # the test pages are shorter than PER_PAGE
+
+    def __init__(self, source, user=None):
+        super().__init__(source, user=user)
+
+    def fetch_page(self, page, per_page, updated_since=None):
+        if page in self.fail_pages:
+            raise ConnectionError(f"page {page} timed out")
+        return self.pages[page - 1] if page <= len(self.pages) else []
+
+    test_connection = list_products = get_product = search = create_order = get_order_status = None
+
+
+class _RacyCatalog(ProductProvider):
+    """Reports failures through the shared ``last_error``, which a
+    concurrent page clears while the failed page is still returning."""
+    exact_page_size = False
+
+    def __init__(self, source, user=None):
+        super().__init__(source, user=user)
+        self.cleared = threading.Event()
+
+    def list_products(self, limit=50, page=1):
+        if page == 2:
+            self.last_error = ConnectionError("page 2 timed out")
+            self.cleared.wait(timeout=2)
+            return []
+        self.last_error = None
+        if page == 3:
+            self.cleared.set()
+        return [{"external_id": str(page), "name": f"Item {page}", "price": "10", "stock": 3}] if page <= 3 else []
+
+    test_connection = get_product = search = create_order = get_order_status = None
+
+
+class ProductSyncTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="sync_user", password="x1234567")
+        self.source = ProductSource.objects.create(user=self.user, provider="external", mode="sync")
+        _PagedCatalog.fail_pages = ()
+        patcher = mock.patch("api.products.sync.get_provider_for_source", side_effect=_PagedCatalog)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _run(self, pages, **kwargs):
+        _PagedCatalog.pages = pages
+        return sync_products(self.source, **kwargs)
+
+    @staticmethod
+    def _item(eid, price="10"):
+        return {"external_id": eid, "name": f"Item {eid}", "price": price, "stock": 3}
+
+    def test_second_run_skips_unchanged_items(self):
+        first = self._run([[self._item("1"), self._item("2")], [self._item("3")]])
+        self.assertEqual((first["created"], first["updated"]), (3, 0))
+        with self.assertNumQueries(3):  # existing map, active ids, source save
+            second = self._run([[self._item("1"), self._item("2")], [self._item("3")]])
+        self.assertEqual((second["created"], second["updated"], second["unchanged"]), (0, 0, 3))
+
+    def test_changed_item_is_updated_in_place(self):
+        self._run([[self._item("1"), self._item("2")]])
+        pid = Product.objects.get(external_id="1").pid
+        result = self._run([[self._item("1", price="12"), self._item("2")]])
+        self.assertEqual((result["updated"], result["unchanged"]), (1, 1))
+        product = Product.objects.get(external_id="1")
+        self.assertEqual((product.pid, str(product.price)), (pid, "12.00"))
+        self.assertEqual(product.name_tokens, "item 1")
+
+    def test_missing_items_are_disabled_and_can_return(self):
+        self._run([[self._item("1"), self._item("2")]])
+        result = self._run([[self._item("1")]])
+        self.assertEqual(result["disabled"], 1)
+        self.assertFalse(Product.objects.get(external_id="2").status)
+
+        self._run([[self._item("1"), self._item("2")]])
+        self.assertTrue(Product.objects.get(external_id="2").status)
+
+    def test_failed_page_disables_nothing(self):
+        self._run([[self._item("1")], [self._item("2")]])
+        _PagedCatalog.fail_pages = (2,)
+        result = self._run([[self._item("1")], [self._item("3")]])
+        self.assertEqual(result["disabled"], 0)
+        self.assertEqual(Product.objects.filter(source=self.source, status=True).count(), 2)
+        self.assertEqual(self.source.status, "error")
+        self.assertIn("page 2", result["errors"][0])
+
+    def test_page_failure_is_not_lost_to_concurrent_pages(self):
+        self._run([[self._item("1")], [self._item("2")], [self._item("3")]])
+        with mock.patch("api.products.sync.get_provider_for_source", side_effect=_RacyCatalog):
+            result = sync_products(self.source)
+        self.assertEqual(result["disabled"], 0)
+        self.assertEqual(Product.objects.filter(source=self.source, status=True).count(), 3)
+        self.assertIn("page 2", result["errors"][0])
+
+
+class SyncSchedulerTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="sched_user", password="x1234567")
+        self.source = ProductSource.objects.create(
+            user=self.user, provider="external", mode="sync", is_active=True, sync_interval_minutes=30,
+        )
+
+    def test_claim_leases_each_source_once(self):
+        self.assertEqual([s.pk for s in scheduler.claim(limit=5)], [self.source.pk])
+        self.assertEqual(scheduler.claim(limit=5), [])
+
+    def test_next_run_is_jittered_within_bounds(self):
+        now = timezone.now()
+        for _ in range(20):
+            delay = (scheduler.next_run(self.source, now) - now).total_seconds()
+            self.assertTrue(1800 * 0.9 <= delay <= 1800 * 1.1)
+
+    @mock.patch("api.products.scheduler.sync_products")
+    def test_run_books_next_sync_and_first_run_is_full(self, sync):
+        sync.return_value = {"created": 0, "updated": 0, "unchanged": 0, "disabled": 0,
+                             "errors": [], "mode": "full"}
+        ProductSource.objects.filter(pk=self.source.pk).update(sync_interval_minutes=120)
+        (leased,) = scheduler.claim()
+        self.assertTrue(scheduler.run_source(leased))
+        self.assertTrue(sync.call_args.kwargs["full"])
+        self.source.refresh_from_db()
+        self.assertGreater(self.source.next_sync_at, timezone.now() + timedelta(minutes=100))
+
+    def test_cached_live_reads_live_until_first_sync(self):
+        self.source.mode = "live"
+        self.source.save()
+        self.assertEqual(scheduler.cache_live_sources(), 1)
+        self.source.refresh_from_db()
+        self.assertTrue(self.source.reads_live)
+        self.source.last_synced = timezone.now()
+        self.assertFalse(self.source.reads_live)
+        self.assertEqual(scheduler.interval(self.source), timedelta(minutes=10))
+
+
+class CatalogNameMatcherTests(TestCase):
+    def test_name_and_word_rules(self):
+        matcher = product_index.NameMatcher(["Jolpai Achar 500g", "Baby Dolna", "ab cd"])
+        self.assertTrue(matcher.matches("jolpai ache?"))       # word inside a name
+        self.assertTrue(matcher.matches("dol"))                # short fragment
+        self.assertTrue(matcher.matches("xab cdx"))            # whole name across words
+        self.assertFalse(matcher.matches("bhai dam koto"))
+        self.assertFalse(matcher.matches("ok"))
+
+    def test_intent_fallback_uses_index_without_queries(self):
+        from api.ai.intent import IntentDetector
+
+        user = get_user_model().objects.create_user(username="intent_user", password="x1234567")
+        Product.objects.create(user=user, name="Tetul Achar", price=100)
+        product_index.invalidate(user.pk)
+        context = mock.Mock(conversation=mock.Mock(user=user))
+        self.assertEqual(IntentDetector._match_catalog_product("tetul", context), "SEARCH_PRODUCT")
+        with self.assertNumQueries(0):
+            self.assertEqual(IntentDetector._match_catalog_product("achar?", context), "SEARCH_PRODUCT")
+            self.assertEqual(IntentDetector._match_catalog_product("hmm bhai", context), "")
+
+
+class IntentGoldenTests(TestCase):
+    """api/testdata/intent_golden.json: rule scores and final intent recorded
+    from the original IGNORECASE rule loop."""
+
+    def test_corpus_scores_unchanged(self):
+        import json
+        from pathlib import Path
+
+        from api.ai.intent import IntentDetector, _score_patterns
+
+        corpus = json.loads((Path(__file__).parent / "testdata" / "intent_golden.json").read_text(encoding="utf-8"))
+        for entry in corpus:
+            with self.subTest(text=entry["text"]):
+                # Same intents, same boosted confidences, same order (ties).
+                self.assertEqual(list(_score_patterns(entry["text"].strip()).items()),
+                                 list(entry["scores"].items()))
+                self.assertEqual(IntentDetector.detect_with_confidence(entry["text"]),
+                                 (entry["intent"], entry["confidence"]))
+
+
+class ConversationLoaderTests(TestCase):
+    def setUp(self):
+        from api.ai.context import invalidate_settings
+
+        invalidate_settings()
+        self.user = get_user_model().objects.create_user(username="loader_user", password="x1234567")
+        self.conv = Conversation.objects.create(user=self.user, platform="messenger", customer_id="c9")
+
+    def test_warm_build_reads_three_tables(self):
+        from api.ai.context import ConversationManager
+
+        ConversationManager.build(self.conv, incoming_text="hi")
+        with self.assertNumQueries(3):   # orders, history window, memory
+            ctx = ConversationManager.build(self.conv, incoming_text="hi")
+        self.assertEqual(ctx.settings.currency, "BDT")
+
+    def test_store_config_save_refreshes_settings(self):
+        from api.ai.context import ConversationManager
+        from context.models import StoreConfig
+
+        ConversationManager.build(self.conv)
+        store = StoreConfig.objects.get(user=self.user)
+        store.store_name = "Achar Ghar"
+        store.save()
+        self.assertEqual(ConversationManager.build(self.conv).settings.store_name, "Achar Ghar")
+
+    def test_last_bot_message_comes_from_history_window(self):
+        from api.ai.context import ConversationManager
+        from back.models import Message
+
+        bot = Message.objects.create(conversation=self.conv, sender="bot", text="Order korben?")
+        Message.objects.create(conversation=self.conv, sender="customer", text="ji")
+        ctx = ConversationManager.build(self.conv)
+        with self.assertNumQueries(0):
+            self.assertEqual(ConversationManager.last_bot_message(ctx), bot)
+
+    def test_session_is_loaded_once_per_conversation(self):
+        from api.ai.state import get_session
+
+        session = get_session(self.conv)
+        with self.assertNumQueries(0):
+            self.assertIs(get_session(self.conv), session)
+
+
+class _FakeResponse:
+    def __init__(self, status=200, body=None, headers=None, content=b"img"):
+        self.status_code = status
+        self.ok = status < 400
+        self.headers = headers or {}
+        self.content = content
+        self._body = body if body is not None else {}
+        self.text = str(self._body)
+
+    def json(self):
+        return self._body
+
+
+class _FakeSession:
+    """Records sends; media uploads answer with an id derived from the call count.
+
+    ``peak`` is the most downloads ever in flight at once. With
+    ``hold_downloads`` each download waits (up to a second) for a second one
+    to start, so overlapping downloads reach 2 quickly and serial ones stay at 1.
+    """
+
+    def __init__(self, responses=None, hold_downloads=False):
+        self.posts = []
+        self.downloads = 0
+        self.active = self.peak = 0
+        self.responses = list(responses or [])
+        self.hold_downloads = hold_downloads
+        self.cond = threading.Condition()
+
+    def get(self, url, **kwargs):
+        with self.cond:
+            self.downloads += 1
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            self.cond.notify_all()
+            if self.hold_downloads:
+                self.cond.wait_for(lambda: self.peak > 1, timeout=1)
+            self.active -= 1
+        return _FakeResponse()
+
+    def post(self, url, **kwargs):
+        with self.cond:
+            self.posts.append((url, kwargs))
+            if self.responses:
+                return self.responses.pop(0)
+            n = len(self.posts)
+        return _FakeResponse(body={"id": f"media-{n}"} if url.endswith("/media") else {})
+
+
+class DeliveryTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="sender_user", password="x1234567")
+        self.integration = Integration.objects.create(
+            user=self.user, platform="whatsapp", access_token="tok", integration_id="123",
+            is_enabled=True, is_connected=True,
+        )
+        self.conv = Conversation.objects.create(user=self.user, platform="whatsapp", customer_id="8801")
+        sender._backoff_until.clear()
+
+    def test_images_prefetched_and_sent_in_order(self):
+        session = _FakeSession(hold_downloads=True)
+        images = [f"https://cdn.example.com/{i}.jpg" for i in range(5)]
+        with mock.patch("api.ai.sender._session", return_value=session):
+            result = sender.send_reply(self.conv, ["first", "second"], image_urls=images)
+        self.assertTrue(result["ok"], result["errors"])
+        self.assertEqual(result["sent"], {"cards": 0, "images": 5, "texts": 2})
+        self.assertGreater(session.peak, 1)     # downloads overlapped
+        sends = [kw["json"] for url, kw in session.posts if url.endswith("/messages")]
+        self.assertEqual([s["type"] for s in sends], ["image"] * 5 + ["text"] * 2)
+        self.assertTrue(all("id" in s["image"] for s in sends[:5]))
+        self.assertEqual([s["text"]["body"] for s in sends[5:]], ["first", "second"])
+
+    def test_rate_limited_send_backs_off_and_retries(self):
+        session = _FakeSession(responses=[
+            _FakeResponse(status=400, body={"error": {"code": 130429}}, headers={"Retry-After": "0.01"}),
+        ])
+        with mock.patch("api.ai.sender._session", return_value=session):
+            result = sender.send_reply(self.conv, "hello")
+        self.assertTrue(result["ok"], result["errors"])
+        self.assertEqual(len(session.posts), 2)
+        self.assertIn(self.integration.pk, sender._backoff_until)
+
+    def test_non_object_error_body_is_not_rate_limited(self):
+        session = _FakeSession(responses=[_FakeResponse(status=400, body=["bad request"])])
+        with mock.patch("api.ai.sender._session", return_value=session):
+            result = sender.send_reply(self.conv, "hello")
+        self.assertFalse(result["ok"])
+        self.assertIn("bad request", result["errors"][0])   # reported, not a send_reply exception
+        self.assertEqual(len(session.posts), 1)
+        self.assertNotIn(self.integration.pk, sender._backoff_until)
 
-# Create your tests here.
+    def test_uploaded_media_is_reused_by_later_replies(self):
+        image = "https://cdn.example.com/shirt.jpg"
+        first, second = _FakeSession(), _FakeSession()
+        with mock.patch("api.ai.sender._session", return_value=first):
+            sender.send_reply(self.conv, None, image_urls=[image])
+        with mock.patch("api.ai.sender._session", return_value=second):
+            result = sender.send_reply(self.conv, None, image_urls=[image])
+        self.assertEqual(result["sent"]["images"], 1)
+        self.assertEqual(second.downloads, 0)
+        self.assertEqual([url.rsplit("/", 1)[1] for url, _ in second.posts], ["messages"])
+        self.assertEqual(second.posts[0][1]["json"]["image"], {"id": "media-1"})
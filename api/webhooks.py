@@ -1,51 +1,46 @@
+import copy
 import hashlib
 import hmac
 import json
 import logging
-import threading
-from concurrent.futures import ThreadPoolExecutor
+import uuid
+from datetime import timedelta
 
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.db import IntegrityError, close_old_connections
 from django.db.models import Q
 from django.http import HttpResponse
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 
-from back.models import Conversation, Integration, Message, MessageBatch
+from back import inbox
+from back.models import Conversation, ConversationLease, Integration, Message, MessageBatch
 
+from . import jobs
+from .debounce import burst_delay
 from .utils.parsers import parse_instagram, parse_messenger, parse_telegram, parse_whatsapp
 from .utils.whatsapp import download_whatsapp_media
 
 logger = logging.getLogger(__name__)
 
-# Bounded thread pool — handles burst traffic without spawning unlimited threads.
-_executor = ThreadPoolExecutor(max_workers=50)
+# All background work goes through the durable job queue (api/jobs.py) so a
+# restart never drops it and any worker process can run it. The per-conversation
+# debounce timer is a queued "batch_pipeline" job whose run_at is pushed forward
+# by every new message (dedupe_key); the window length is adaptive (api/debounce.py).
 
-# Per-conversation timers: {conversation_id: threading.Timer}
-# When a new message arrives for a conversation, any existing timer is cancelled
-# and a fresh 5-second timer is started. This ensures rapid bursts are combined
-# into one AI turn rather than triggering a pipeline call per message.
-_batch_timers: dict[int, threading.Timer] = {}
-_batch_timers_lock = threading.Lock()
+# Per-conversation serialization is a DB lease row (ConversationLease), not a
+# process-local lock: with several gunicorn workers / worker hosts, exactly one
+# of them may run the pipeline for a conversation at a time. A job that finds
+# the lease busy re-queues itself briefly; the lease holder drains any batches
+# that arrived while it was running, so bursts still collapse into one run.
 
-# Per-conversation pipeline locks — prevents overlapping run() calls for the
-# same conversation. When a timer fires and the lock is already held (previous
-# pipeline still running), this invocation skips; the unprocessed batches stay
-# in the DB and will be picked up by the next timer.
-_conv_locks: dict[int, threading.Lock] = {}
-_conv_locks_lock = threading.Lock()
-
-# Pending batches queue — when _fire_batch_pipeline can't acquire the lock,
-# the caller's batch PKs are appended here.  The running pipeline drains this
-# queue after finishing, so bursts collapse into ONE run instead of multiple
-# sequential runs with overlapping context.
-_pending_batches: dict[int, list[int]] = {}
-_pending_batches_lock = threading.Lock()
-
-BATCH_TIMER_SECONDS = 7  # wait for burst to settle (was 5s; increased for image analysis)
+PIPELINE_MAX_ATTEMPTS = 3
+WEBHOOK_MAX_ATTEMPTS = 3
+PIPELINE_LEASE_SECONDS = jobs.LEASE_SECONDS  # expires if the holder dies mid-turn
+LEASE_BUSY_RETRY_SECONDS = 2
 
 
 # ---------------------------------------------------------------------------
@@ -74,71 +69,89 @@ def _verify_meta_signature(body_bytes, app_secret, signature_header):
 # Background processing
 # ---------------------------------------------------------------------------
 
-def _schedule_batch_pipeline(conversation_id):
+def _schedule_batch_pipeline(conversation_id, platform=""):
+    """
+    (Re)start the batch window for a conversation.
+    Pushes the conversation's queued "batch_pipeline" job forward so rapid
+    message bursts are collapsed into one pipeline run that fires once the
+    burst has settled. The window adapts to the customer's typing rhythm and
+    fires almost at once on terminal messages (see api/debounce.py). The job
+    is durable and is picked up by whichever worker process is free when the
+    window expires.
     """
-    (Re)start the 7-second batch timer for a conversation.
-    Cancels any existing timer so rapid message bursts are collapsed into one
-    pipeline run that fires 7 seconds after the LAST message in the burst.
+    jobs.enqueue(
+        "batch_pipeline",
+        {"conversation_id": conversation_id},
+        delay=burst_delay(conversation_id, platform),
+        dedupe_key=f"batch_pipeline:{conversation_id}",
+        max_attempts=PIPELINE_MAX_ATTEMPTS,
+    )
+
 
-    The timer callback submits work to the shared thread pool rather than
-    running directly in a timer thread — this avoids spawning unlimited
-    database connections and keeps pipeline work managed by the same pool.
+def _acquire_conversation_lease(conversation_id, owner):
+    """Take the pipeline lease for a conversation. Returns True when won.
+
+    A conditional UPDATE on the lease row is atomic on every backend, so two
+    workers racing for the same conversation can never both win.
     """
-    with _batch_timers_lock:
-        existing = _batch_timers.get(conversation_id)
-        if existing is not None:
-            existing.cancel()
-        t = threading.Timer(BATCH_TIMER_SECONDS, lambda cid: _executor.submit(_fire_batch_pipeline, cid), args=(conversation_id,))
-        t.daemon = True
-        _batch_timers[conversation_id] = t
-        t.start()
+    try:
+        ConversationLease.objects.get_or_create(conversation_id=conversation_id)
+    except IntegrityError:
+        pass  # created concurrently by another worker (or conversation gone)
+    now = timezone.now()
+    won = ConversationLease.objects.filter(
+        Q(expires_at__isnull=True) | Q(expires_at__lt=now),
+        conversation_id=conversation_id,
+    ).update(owner=owner, expires_at=now + timedelta(seconds=PIPELINE_LEASE_SECONDS))
+    return bool(won)
+
+
+def _renew_conversation_lease(conversation_id, owner):
+    ConversationLease.objects.filter(conversation_id=conversation_id, owner=owner).update(
+        expires_at=timezone.now() + timedelta(seconds=PIPELINE_LEASE_SECONDS),
+    )
+
+
+def _release_conversation_lease(conversation_id, owner):
+    ConversationLease.objects.filter(conversation_id=conversation_id, owner=owner).update(
+        owner="", expires_at=None,
+    )
 
 
 def _fire_batch_pipeline(conversation_id):
     """
-    Called (via executor) after 7 seconds of silence for a conversation.
+    Job handler, run once a conversation's burst window has expired.
     Combines all unprocessed MessageBatch rows into a single AI turn.
 
-    Locks per-conversation so overlapping runs never happen.  Batch rows are
-    pinned by primary key to prevent concurrent runs from stealing each other's
-    batches.
+    Holds the conversation's DB lease so overlapping runs never happen, even
+    across processes and hosts. Batch rows are pinned by primary key to prevent
+    concurrent runs from stealing each other's batches. A pipeline crash
+    re-raises so the job queue retries the turn with backoff (the batches stay
+    unprocessed until a run succeeds).
     """
-    # Acquire per-conversation lock (non-blocking) — skip if already running.
-    with _conv_locks_lock:
-        conv_lock = _conv_locks.get(conversation_id)
-        if conv_lock is None:
-            conv_lock = threading.Lock()
-            _conv_locks[conversation_id] = conv_lock
-
-    if not conv_lock.acquire(blocking=False):
-        # Pipeline is already running. Merge our batches into the pending queue
-        # instead of creating a separate run. The running pipeline drains the
-        # queue after it finishes, keeping context coherent.
-        stray_pks = list(
-            MessageBatch.objects.filter(
-                conversation_id=conversation_id, processed=False,
-            ).order_by("timestamp").values_list("pk", flat=True)
+    owner = uuid.uuid4().hex
+    if not _acquire_conversation_lease(conversation_id, owner):
+        # Pipeline is already running elsewhere. The holder drains batches that
+        # arrive while it runs; re-check shortly in case it released just before
+        # our batches landed.
+        logger.info("Pipeline already running conv=%s — re-queued", conversation_id)
+        jobs.enqueue(
+            "batch_pipeline",
+            {"conversation_id": conversation_id},
+            delay=LEASE_BUSY_RETRY_SECONDS,
+            dedupe_key=f"batch_pipeline:{conversation_id}",
+            max_attempts=PIPELINE_MAX_ATTEMPTS,
         )
-        if stray_pks:
-            with _pending_batches_lock:
-                _pending_batches.setdefault(conversation_id, []).extend(stray_pks)
-            logger.info(
-                "Pipeline already running conv=%s — merged %d batches into pending queue",
-                conversation_id, len(stray_pks),
-            )
         return
 
     try:
-        with _batch_timers_lock:
-            _batch_timers.pop(conversation_id, None)
-
         close_old_connections()
         from types import SimpleNamespace
         from django.conf import settings
 
-        conversation = Conversation.objects.get(id=conversation_id)
+        conversation = Conversation.objects.select_related("user", "session").get(id=conversation_id)
 
-        # Guard: don't fire if AI was disabled since the timer was scheduled.
+        # Guard: don't fire if AI was disabled since the job was scheduled.
         # A temporarily-disabled conversation (human handoff) auto-re-enables
         # once its delay elapsed — new messages must wake it up again.
         ai_still_enabled = conversation.is_ai_enabled
@@ -184,78 +197,109 @@ def _fire_batch_pipeline(conversation_id):
             return
         combined_text = batch_items[-1].message_text
 
-        unified = SimpleNamespace(text=combined_text)
+        # received_at = first message of the burst, for time-to-first-reply.
+        unified = SimpleNamespace(text=combined_text, received_at=batch_items[0].timestamp)
+        # Single canonical AI path: the Orchestrator (intent → workflow →
+        # planner → executor → response generator). Legacy pipeline.py is
+        # no longer dispatched from here — see run_via_orchestrator().
+        from api.ai.orchestrator import ReplyAlreadySent, run_via_orchestrator
         try:
-            # Single canonical AI path: the Orchestrator (intent → workflow →
-            # planner → executor → response generator). Legacy pipeline.py is
-            # no longer dispatched from here — see run_via_orchestrator().
-            from api.ai.orchestrator import run_via_orchestrator
             run_via_orchestrator(conversation, unified)
+        except ReplyAlreadySent:
+            # The customer already has (part of) the reply and it may be
+            # billed — a retry would send it twice. Consume the batches.
+            logger.exception("Pipeline crashed after replying conv=%s — not retried", conversation_id)
         except Exception:
             logger.exception(
                 "Pipeline crashed conv=%s — batches preserved for retry", conversation_id
             )
-            return
+            raise
 
         # Only mark consumed AFTER pipeline completes successfully, and only
         # our pinned batches — never touch batches that arrived in the meantime.
         MessageBatch.objects.filter(pk__in=batch_pks).update(processed=True)
 
-        # Drain any batches that arrived (via _pending_batches merge) while
-        # the pipeline was running — process them immediately so close bursts
-        # collapse into one run.
-        with _pending_batches_lock:
-            merged_pks = _pending_batches.pop(conversation_id, [])
-        if merged_pks:
-            # Deduplicate: only process batches that weren't already handled.
-            fresh_pks = list(
-                MessageBatch.objects.filter(
-                    pk__in=merged_pks, processed=False,
-                ).order_by("timestamp").values_list("pk", flat=True)
+        # Drain batches that arrived while the pipeline was running — process
+        # them immediately (still holding the lease) so close bursts collapse
+        # into one follow-up run instead of racing a second worker.
+        fresh_pks = list(
+            MessageBatch.objects.filter(
+                conversation=conversation, processed=False,
+            ).order_by("timestamp").values_list("pk", flat=True)
+        )
+        if fresh_pks:
+            _renew_conversation_lease(conversation_id, owner)
+            logger.info("Draining %d merged batches for conv=%s", len(fresh_pks), conversation_id)
+            combined_text = "\n".join(
+                b.message_text
+                for b in MessageBatch.objects.filter(pk__in=fresh_pks)
+                if b.message_text.strip()
             )
-            if fresh_pks:
-                logger.info("Draining %d merged batches for conv=%s", len(fresh_pks), conversation_id)
-                combined_text = "\n".join(
-                    b.message_text
-                    for b in MessageBatch.objects.filter(pk__in=fresh_pks)
-                    if b.message_text.strip()
-                )
-                if combined_text.strip():
-                    unified = SimpleNamespace(text=combined_text)
-                    try:
-                        from api.ai.orchestrator import run_via_orchestrator
-                        run_via_orchestrator(conversation, unified)
-                        MessageBatch.objects.filter(pk__in=fresh_pks).update(processed=True)
-                    except Exception:
-                        logger.exception(
-                            "Merged pipeline crashed conv=%s — batches preserved", conversation_id
-                        )
-        elif MessageBatch.objects.filter(
-            conversation=conversation, processed=False
-        ).exists():
-            # Fallback: new batches arrived outside the merge path.
-            _schedule_batch_pipeline(conversation_id)
+            if combined_text.strip():
+                unified = SimpleNamespace(text=combined_text)
+                try:
+                    run_via_orchestrator(conversation, unified)
+                    MessageBatch.objects.filter(pk__in=fresh_pks).update(processed=True)
+                except ReplyAlreadySent:
+                    logger.exception(
+                        "Merged pipeline crashed after replying conv=%s — not retried", conversation_id
+                    )
+                    MessageBatch.objects.filter(pk__in=fresh_pks).update(processed=True)
+                except Exception:
+                    logger.exception(
+                        "Merged pipeline crashed conv=%s — batches preserved", conversation_id
+                    )
+                    _schedule_batch_pipeline(conversation_id, conversation.platform)
+            else:
+                MessageBatch.objects.filter(pk__in=fresh_pks).update(processed=True)
 
     except Conversation.DoesNotExist:
         pass
-    except Exception:
-        logger.exception("_fire_batch_pipeline failed for conversation=%s", conversation_id)
     finally:
-        conv_lock.release()
-        # Clean up the lock entry so the dict doesn't grow unbounded.
-        with _conv_locks_lock:
-            if _conv_locks.get(conversation_id) is conv_lock:
-                del _conv_locks[conversation_id]
+        _release_conversation_lease(conversation_id, owner)
         close_old_connections()
 
 
+def _process_webhook_job(integration_id, platform, messages, attempt=1):
+    """Job handler for "process_webhook" — resolves the token at run time so
+    access tokens never sit in the job table.
+
+    Messages that fail to persist are re-enqueued on their own (``attempt``
+    counts those rounds), so a retry never re-runs paid media work for the
+    messages of the batch that were already stored.
+    """
+    integration = Integration.objects.filter(pk=integration_id).first()
+    if integration is None:
+        logger.warning("process_webhook: integration=%s no longer exists", integration_id)
+        return
+    failed = _process_webhook(integration.user_id, platform, messages, integration.access_token or "")
+    if not failed:
+        return
+    if attempt >= WEBHOOK_MAX_ATTEMPTS:
+        logger.error(
+            "process_webhook: dropping %d message(s) after %d attempts integration=%s mids=%s",
+            len(failed), attempt, integration_id, [m.get("message_id") for m in failed],
+        )
+        return
+    jobs.enqueue(
+        "process_webhook",
+        {"integration_id": integration_id, "platform": platform, "messages": failed, "attempt": attempt + 1},
+        delay=jobs._backoff(attempt),
+        max_attempts=WEBHOOK_MAX_ATTEMPTS,
+    )
+
+
 def _process_webhook(user_id, platform, unified_messages, access_token):
     """
-    Runs in a thread pool worker. Persists each message and (re)starts the
-    per-conversation 5-second batch timer so rapid bursts are collapsed into
+    Runs in a job worker. Persists each message and (re)starts the
+    per-conversation batch window so rapid bursts are collapsed into
     one AI pipeline call. When AI is disabled for this platform, messages
     are still stored (for human agent view) but media analysis and pipeline
     scheduling are skipped.
+
+    Returns the messages (as received) that could not be persisted. Raises
+    only when nothing was attempted yet, so a job retry cannot store a
+    message twice.
     """
     logger.info("_process_webhook: starting user=%s platform=%s msgs=%s", user_id, platform, len(unified_messages))
     close_old_connections()
@@ -264,14 +308,23 @@ def _process_webhook(user_id, platform, unified_messages, access_token):
         ai_enabled = Integration.objects.filter(
             user=user, platform=platform, is_enabled=True
         ).exists()
+    except Exception:
+        logger.exception("_process_webhook crashed user_id=%s platform=%s", user_id, platform)
+        close_old_connections()
+        raise
 
+    try:
         conversation_ids = set()
+        failed = []
         for msg_data in unified_messages:
             try:
-                conv_id = _persist_message(user, platform, msg_data, access_token, ai_enabled)
+                # _persist_message enriches the attachments in place; a retry
+                # starts again from the message as received.
+                conv_id = _persist_message(user, platform, copy.deepcopy(msg_data), access_token, ai_enabled)
                 if conv_id:
                     conversation_ids.add(conv_id)
             except Exception:
+                failed.append(msg_data)
                 logger.exception(
                     "Failed to persist message mid=%s user=%s platform=%s",
                     msg_data.get("message_id"), user_id, platform,
@@ -279,9 +332,11 @@ def _process_webhook(user_id, platform, unified_messages, access_token):
         # Only schedule the AI pipeline when AI is active for this platform
         if ai_enabled:
             for cid in conversation_ids:
-                _schedule_batch_pipeline(cid)
-    except Exception:
-        logger.exception("_process_webhook crashed user_id=%s platform=%s", user_id, platform)
+                try:
+                    _schedule_batch_pipeline(cid, platform)
+                except Exception:
+                    logger.exception("Scheduling the pipeline failed conv=%s", cid)
+        return failed
     finally:
         close_old_connections()
 
@@ -303,19 +358,41 @@ def _persist_message(user, platform, msg_data, access_token, ai_enabled):
 
     # Fetch Messenger profile asynchronously so it never blocks message processing.
     if created and platform == "messenger":
-        _executor.submit(_fetch_and_update_profile, conv.pk, customer_id, access_token)
+        jobs.enqueue(
+            "fetch_profile",
+            {"conv_id": conv.pk, "customer_id": customer_id},
+            max_attempts=1,
+        )
 
     # Backfill name if we learned it and conversation was created without it
     if not created and msg_data.get("customer_name") and not conv.customer_name:
         Conversation.objects.filter(pk=conv.pk).update(
             customer_name=msg_data.get("customer_name")
         )
+        inbox.refresh(conv.pk)
+
+    # A redelivered or retried message is dropped here, before the media
+    # download and the paid vision/transcription calls below run again.
+    mid_available = bool(mid)
+    if mid:
+        existing_conv_id = Message.objects.filter(mid=mid).values_list("conversation_id", flat=True).first()
+        if existing_conv_id is not None:
+            if existing_conv_id != conv.pk:
+                logger.warning(
+                    "Mid collision mid=%s belongs to conv=%s but this is conv=%s — "
+                    "will create message without mid",
+                    mid, existing_conv_id, conv.pk,
+                )
+                mid_available = False
+            else:
+                logger.info("_persist_message: duplicate mid=%s conv=%s", mid, conv.pk)
+                return conv.id
 
     attachments = msg_data.get("attachments")
     msg_text = msg_data.get("text") or ""
     att_type = (attachments or {}).get("type", "")
 
-    # Download WhatsApp media while we're already in the background thread.
+    # Download WhatsApp media while we're already in the job worker.
     # Other platforms serve public URLs directly — no extra step needed.
     if platform == "whatsapp" and attachments and attachments.get("media_id"):
         try:
@@ -333,8 +410,8 @@ def _persist_message(user, platform, msg_data, access_token, ai_enabled):
     # --- Media understanding ---
     # For images: run vision analysis and fold the description into the message text.
     # For audio/voice: transcribe and use as the message text.
-    # This runs synchronously here (already in a background thread) so the result
-    # is available before the 5-second batch timer fires.
+    # This runs synchronously here (already in a job worker) so the result
+    # is in the batch row before the burst window is computed.
     # Skip analysis when AI is disabled for this platform — saves API costs.
     media_url = (attachments or {}).get("url") or ""
     if not media_url and isinstance((attachments or {}).get("payload"), dict):
@@ -437,26 +514,10 @@ def _persist_message(user, platform, msg_data, access_token, ai_enabled):
             msg_text = msg_text or "[Voice message received]"
 
     if mid:
-        mid_available = True
-        try:
-            existing_msg = Message.objects.get(mid=mid)
-            if existing_msg.conversation_id != conv.pk:
-                logger.warning(
-                    "Mid collision mid=%s belongs to conv=%s but this is conv=%s — "
-                    "will create message without mid",
-                    mid, existing_msg.conversation_id, conv.pk,
-                )
-                mid_available = False
-            else:
-                logger.info("_persist_message: duplicate mid=%s conv=%s", mid, conv.pk)
-                return conv.id
-        except Message.DoesNotExist:
-            pass
-
         if mid_available:
             try:
                 # get_or_create is race-safe: two webhook deliveries with the
-                # same mid (Meta retries) can pass the exists-check above
+                # same mid (Meta retries) can pass the duplicate check above
                 # simultaneously; the second insert would hit the unique
                 # constraint. get_or_create turns that into a fetch of the
                 # existing row and the retried payload is dropped below.
@@ -515,8 +576,19 @@ def _persist_message(user, platform, msg_data, access_token, ai_enabled):
     return conv.id
 
 
+def _fetch_profile_job(conv_id, customer_id):
+    """Job handler for "fetch_profile" — looks the page token up at run time."""
+    conv = Conversation.objects.filter(pk=conv_id).select_related("user").first()
+    if conv is None:
+        return
+    integration = Integration.get_active(conv.user, conv.platform)
+    if integration is None or not integration.access_token:
+        return
+    _fetch_and_update_profile(conv_id, customer_id, integration.access_token)
+
+
 def _fetch_and_update_profile(conv_id, customer_id, access_token):
-    """Fetch Messenger profile in a background thread. Never blocks message processing."""
+    """Fetch Messenger profile in a job worker. Never blocks message processing."""
     close_old_connections()
     try:
         from api.utils.get_msngr_profile import get_messenger_profile
@@ -531,12 +603,22 @@ def _fetch_and_update_profile(conv_id, customer_id, access_token):
             except Exception:
                 logger.warning("Failed to download profile pic for customer_id=%s", customer_id)
         Conversation.objects.filter(pk=conv_id).update(**update_kwargs)
+        inbox.refresh(conv_id)
     except Exception as exc:
         logger.warning("Failed to fetch Messenger profile for customer_id=%s: %s", customer_id, exc)
     finally:
         close_old_connections()
 
 
+def _enqueue_webhook(integration, platform, messages):
+    """Persist parsed messages as a durable job; the view returns immediately."""
+    jobs.enqueue(
+        "process_webhook",
+        {"integration_id": integration.pk, "platform": platform, "messages": messages},
+        max_attempts=WEBHOOK_MAX_ATTEMPTS,
+    )
+
+
 # ---------------------------------------------------------------------------
 # Base webhook view
 # ---------------------------------------------------------------------------
@@ -554,13 +636,7 @@ class _BaseWebhookView(View):
 
     def _submit(self, integration, messages):
         if messages:
-            _executor.submit(
-                _process_webhook,
-                integration.user_id,
-                self.platform,
-                messages,
-                integration.access_token or "",
-            )
+            _enqueue_webhook(integration, self.platform, messages)
 
 
 # ---------------------------------------------------------------------------
@@ -675,7 +751,7 @@ class TelegramWebhookView(_BaseWebhookView):
 # ---------------------------------------------------------------------------
 # Configured ONCE in the Meta App dashboard. Meta sends every connected page's
 # events here. We attribute each entry to an Integration by its page/IG id and
-# fan out to the existing background processor. This is purely additive — the
+# fan out to the durable job queue. This is purely additive — the
 # per-user webhook views above are untouched.
 
 # object -> (platform, parser)
@@ -792,15 +868,9 @@ class MetaAppWebhookView(View):
         if not messages:
             return
 
-        _executor.submit(
-            _process_webhook,
-            integration.user_id,
-            platform,
-            messages,
-            integration.access_token or "",
-        )
+        _enqueue_webhook(integration, platform, messages)
         logger.info(
-            "App-level webhook: submitted %s msgs to executor for user=%s",
+            "App-level webhook: enqueued %s msgs for user=%s",
             len(messages), integration.user_id,
         )
 
@@ -810,7 +880,11 @@ class MetaAppWebhookView(View):
 # ---------------------------------------------------------------------------
 
 def recover_zombie_batches():
-    """Fire the pipeline for any MessageBatch rows left behind after a crash/restart."""
+    """Re-queue the pipeline for MessageBatch rows that have no pending job.
+
+    Jobs themselves survive restarts; this only covers batches whose job was
+    lost or exhausted its retries (or rows written before the job queue).
+    """
     close_old_connections()
     orphan = MessageBatch.objects.filter(processed=False)
     if not orphan.exists():
@@ -823,7 +897,7 @@ def recover_zombie_batches():
             if not conv.is_ai_enabled:
                 orphan.filter(conversation_id=cid).update(processed=True)
                 continue
-            _fire_batch_pipeline(cid)
+            _schedule_batch_pipeline(cid, conv.platform)
         except Conversation.DoesNotExist:
             orphan.filter(conversation_id=cid).delete()
         except Exception:
@@ -7,7 +7,7 @@ from django.shortcuts import render
 from django.urls import path
 
 from .models import (
-    AuditLog, Conversation, Integration, Message, OrderItem, Package, PackageImages,
+    AuditLog, BackgroundJob, Conversation, Integration, Message, OrderItem, Package, PackageImages,
     PackageItem, Product, ProductImages, ProductSource, Sale, Setting,
     SupportTicket, ToolCallLog, UserProfile, UsageLog,
 )
@@ -231,7 +231,8 @@ class ConversationAdmin(admin.ModelAdmin):
             try:
                 selected_conv = Conversation.objects.get(pk=conv_id, user=selected_user)
                 conv_history = list(
-                    Message.objects.filter(conversation=selected_conv).order_by("timestamp")
+                    Message.objects.filter(conversation=selected_conv)
+                    .select_related("payload").order_by("timestamp")
                 )
                 tool_qs = ToolCallLog.objects.filter(conversation=selected_conv)
                 if tool_filter:
@@ -591,3 +592,22 @@ class AuditLogAdmin(admin.ModelAdmin):
             obj.conversation.platform if obj.conversation else "?",
         )
     conversation_link.short_description = "Conversation"
+
+
+@admin.register(BackgroundJob)
+class BackgroundJobAdmin(admin.ModelAdmin):
+    list_display = ["id", "kind", "status", "attempts", "max_attempts", "run_at", "leased_by", "updated_at"]
+    list_filter = ["kind", "status"]
+    search_fields = ["dedupe_key", "last_error", "leased_by"]
+    readonly_fields = [f.name for f in BackgroundJob._meta.fields]
+    ordering = ["-created_at"]
+    actions = ["requeue"]
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Requeue selected jobs now")
+    def requeue(self, request, queryset):
+        from django.utils import timezone
+        n = queryset.update(status="queued", attempts=0, run_at=timezone.now(), leased_until=None)
+        self.message_user(request, f"{n} job(s) requeued.")
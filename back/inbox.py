@@ -0,0 +1,198 @@
+"""Conversation inbox projection for the live chat dashboard.
+
+One InboxEntry row per conversation holds what the chat list shows and sorts
+on — sort time, preview, sender of the last message, unread count and a
+lowercased search key — so a poll reads one index range of the tenant's
+inbox instead of sorting every Conversation it owns.
+
+  * ``record_message`` runs on every Message insert (Message.save): one
+    UPDATE of the conversation (preview + counters) and one upsert here;
+  * ``refresh`` re-derives the search key after a name/id change;
+  * ``page`` serves the dashboard with keyset (cursor) pagination on
+    (sort_at, conversation_id), newest first; ``changed_since`` feeds the
+    live updates (back/live.py).
+
+Search is a substring match on ``search_key``; on PostgreSQL migration 0035
+backs it with a pg_trgm GIN index.
+"""
+import base64
+import logging
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import live
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+PREVIEW_LENGTH = 255
+
+# What the chat list renders (InboxEntry + the conversation's display fields).
+_LISTED_FIELDS = (
+    "conversation_id", "platform", "sort_at", "preview", "last_sender", "unread_count",
+    "conversation__customer_name", "conversation__customer_id", "conversation__profile_image",
+)
+
+_COUNTERS = {
+    "customer": {"customer_sent_count": 1, "bot_received_count": 1},
+    "bot": {"bot_sent_count": 1},
+    "agent": {"agent_sent_count": 1, "bot_received_count": 1},
+}
+
+
+def search_key(customer_name, customer_id):
+    return f"{customer_name or ''} {customer_id or ''}".strip().lower()[:512]
+
+
+def _preview(message):
+    return (message.text or "📷 Image")[:PREVIEW_LENGTH]
+
+
+# ---------------------------------------------------------------------------
+# Writes
+# ---------------------------------------------------------------------------
+
+def record_message(message):
+    """Fold a newly inserted Message into its conversation and inbox row."""
+    from back.models import Conversation, InboxEntry
+
+    now = timezone.now()
+    preview = _preview(message)
+    kind = "image" if message.attachments else "text"
+    updates = {name: F(name) + n for name, n in _COUNTERS.get(message.sender, {}).items()}
+    Conversation.objects.filter(id=message.conversation_id).update(
+        updated_at=now, message_text=preview, last_message_type=kind, **updates,
+    )
+
+    if message.sender == "customer":
+        unread = F("unread_count") + 1
+    elif message.sender == "agent":
+        unread = 0           # a human answered — the thread has been read
+    else:
+        unread = F("unread_count")
+    fields = {"sort_at": now, "preview": preview, "last_message_type": kind, "last_sender": message.sender}
+    if InboxEntry.objects.filter(conversation_id=message.conversation_id).update(unread_count=unread, **fields):
+        live.publish(message.conversation.user_id)
+        return
+    conversation = Conversation.objects.filter(id=message.conversation_id).first()
+    if conversation is None:
+        return
+    live.publish(conversation.user_id)
+    try:
+        with transaction.atomic():
+            InboxEntry.objects.create(
+                conversation=conversation, user_id=conversation.user_id, platform=conversation.platform,
+                search_key=search_key(conversation.customer_name, conversation.customer_id),
+                unread_count=1 if message.sender == "customer" else 0, **fields,
+            )
+    except IntegrityError:
+        # Created concurrently by another message of the same conversation.
+        InboxEntry.objects.filter(conversation_id=message.conversation_id).update(unread_count=unread, **fields)
+
+
+def ensure_entry(conversation):
+    """Inbox row for a conversation that has no messages yet."""
+    from back.models import InboxEntry
+
+    InboxEntry.objects.get_or_create(
+        conversation=conversation,
+        defaults={
+            "user_id": conversation.user_id, "platform": conversation.platform,
+            "sort_at": conversation.updated_at or conversation.timestamp or timezone.now(),
+            "search_key": search_key(conversation.customer_name, conversation.customer_id),
+        },
+    )
+
+
+def refresh(conversation):
+    """Re-derive the search key after customer_name / customer_id changed.
+
+    Takes a Conversation, or its id after a queryset ``update()``.
+    """
+    from back.models import Conversation, InboxEntry
+
+    if isinstance(conversation, Conversation):
+        pk, name, customer_id = conversation.pk, conversation.customer_name, conversation.customer_id
+    else:
+        row = Conversation.objects.filter(id=conversation).values_list("customer_name", "customer_id").first()
+        if row is None:
+            return
+        pk, (name, customer_id) = conversation, row
+    InboxEntry.objects.filter(conversation_id=pk).update(search_key=search_key(name, customer_id))
+
+
+def mark_read(conversation_id):
+    from back.models import InboxEntry
+
+    InboxEntry.objects.filter(conversation_id=conversation_id, unread_count__gt=0).update(unread_count=0)
+
+
+# ---------------------------------------------------------------------------
+# Reads
+# ---------------------------------------------------------------------------
+
+def encode_cursor(entry):
+    raw = f"{entry.sort_at.isoformat()}|{entry.conversation_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """(sort_at, conversation_id), or None for a missing/garbled cursor."""
+    if not cursor:
+        return None
+    try:
+        sort_at, conversation_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8").split("|")
+        parsed = parse_datetime(sort_at)
+        return (parsed, int(conversation_id)) if parsed else None
+    except (ValueError, UnicodeError):
+        return None
+
+
+def page(user, platform="all", q="", cursor=None, limit=PAGE_SIZE):
+    """One page of ``user``'s inbox, newest first. Returns (entries, next_cursor)."""
+    from back.models import InboxEntry
+
+    limit = max(1, min(int(limit or PAGE_SIZE), MAX_PAGE_SIZE))
+    qs = InboxEntry.objects.filter(user=user)
+    if platform and platform != "all":
+        qs = qs.filter(platform=platform)
+    if q:
+        qs = qs.filter(search_key__contains=q.strip().lower())
+    after = decode_cursor(cursor)
+    if after:
+        sort_at, conversation_id = after
+        qs = qs.filter(Q(sort_at__lt=sort_at) | Q(sort_at=sort_at, conversation_id__lt=conversation_id))
+
+    entries = list(
+        qs.select_related("conversation")
+        .only(*_LISTED_FIELDS)
+        .order_by("-sort_at", "-conversation_id")[: limit + 1]
+    )
+    next_cursor = encode_cursor(entries[limit - 1]) if len(entries) > limit else None
+    return entries[:limit], next_cursor
+
+
+def changed_since(user, since, platform="all", q="", limit=PAGE_SIZE):
+    """Entries of ``user`` whose sort_at moved past ``since``, newest first."""
+    from back.models import InboxEntry
+
+    qs = InboxEntry.objects.filter(user=user, sort_at__gt=since)
+    if platform and platform != "all":
+        qs = qs.filter(platform=platform)
+    if q:
+        qs = qs.filter(search_key__contains=q.strip().lower())
+    return list(
+        qs.select_related("conversation")
+        .only(*_LISTED_FIELDS)
+        .order_by("-sort_at", "-conversation_id")[:limit]
+    )
+
+
+def latest_sort_at(user):
+    from back.models import InboxEntry
+
+    return InboxEntry.objects.filter(user=user).order_by("-sort_at").values_list("sort_at", flat=True).first()
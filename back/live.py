@@ -0,0 +1,139 @@
+"""Live chat updates for the message dashboard (long-poll).
+
+An open dashboard keeps one request to ``chats/live`` waiting instead of
+re-querying Message and Conversation on timers. The request checks for
+changes once, then sleeps on this hub until the tenant's data changes (or
+WAIT_SECONDS pass) and only then reads the database again.
+
+  * ``publish(user_id)`` runs for every inserted message (back/inbox.py),
+    after the transaction commits;
+  * on PostgreSQL it also sends ``NOTIFY live_chat, '<user_id>'``, and each
+    web process runs one listener thread that wakes its local waiters, so a
+    message written by the AI worker process reaches every open dashboard;
+  * on other databases (SQLite in development) there is no cross-process
+    signal: waiters re-check every FALLBACK_CHECK_SECONDS instead.
+
+Each waiting request holds a gthread worker thread for up to WAIT_SECONDS;
+the Procfile runs WEB_CONCURRENCY (default 3) workers of 32 threads so open
+dashboards do not starve ordinary requests. A waiting request closes its
+database connection first (Django reopens it for the next query), so idle
+long-polls do not pin up to workers × threads connections for CONN_MAX_AGE.
+
+An inbox row can commit after a poll has already moved the cursor past its
+``sort_at``, so each poll re-reads OVERLAP_SECONDS behind the cursor. Only
+rows past the cursor end the wait; the client merges rows by id.
+"""
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "live_chat"
+WAIT_SECONDS = 25.0             # longest a request is held open
+FALLBACK_CHECK_SECONDS = 3.0    # re-check interval without LISTEN/NOTIFY
+OVERLAP_SECONDS = 2.0           # inbox rows re-read behind the client's cursor
+LISTENER_RETRY_SECONDS = 5.0
+
+_cond = threading.Condition()
+_versions: dict[int, int] = defaultdict(int)
+_listener_lock = threading.Lock()
+_listener: threading.Thread | None = None
+_listening = threading.Event()
+
+
+def _postgres():
+    return connection.vendor == "postgresql"
+
+
+# ---------------------------------------------------------------------------
+# Publishing
+# ---------------------------------------------------------------------------
+
+def _wake(user_id):
+    with _cond:
+        _versions[user_id] += 1
+        _cond.notify_all()
+
+
+def _send(user_id):
+    _wake(user_id)
+    if _postgres():
+        try:
+            with connection.cursor() as cur:
+                cur.execute("SELECT pg_notify(%s, %s)", [CHANNEL, str(user_id)])
+        except Exception:
+            logger.warning("Live update NOTIFY failed user=%s", user_id, exc_info=True)
+
+
+def publish(user_id):
+    """Wake dashboards of ``user_id`` once the current transaction commits."""
+    if user_id:
+        transaction.on_commit(lambda: _send(user_id))
+
+
+# ---------------------------------------------------------------------------
+# Waiting
+# ---------------------------------------------------------------------------
+
+def version(user_id):
+    with _cond:
+        return _versions[user_id]
+
+
+def wait(user_id, seen, timeout):
+    """Block until the tenant's version moves past ``seen`` or ``timeout``
+    passes (capped at FALLBACK_CHECK_SECONDS without a listener). Returns
+    the current version."""
+    if _postgres():
+        _ensure_listener()
+    if not _listening.is_set():
+        timeout = min(timeout, FALLBACK_CHECK_SECONDS)
+    if not connection.in_atomic_block:
+        connection.close()
+    with _cond:
+        _cond.wait_for(lambda: _versions[user_id] != seen, timeout=max(0.0, timeout))
+        return _versions[user_id]
+
+
+def _ensure_listener():
+    global _listener
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = threading.Thread(target=_listen, name="live-chat-listener", daemon=True)
+            _listener.start()
+
+
+def _listen():
+    """LISTEN on a dedicated connection and wake local waiters (psycopg2)."""
+    from django.db import connections
+
+    while True:
+        wrapper = connections.create_connection("default")
+        try:
+            wrapper.ensure_connection()
+            wrapper.set_autocommit(True)
+            raw = wrapper.connection
+            with raw.cursor() as cur:
+                cur.execute(f"LISTEN {CHANNEL}")
+            _listening.set()
+            while True:
+                if select.select([raw], [], [], 60.0)[0]:
+                    raw.poll()
+                    while raw.notifies:
+                        payload = raw.notifies.pop(0).payload
+                        if payload.isdigit():
+                            _wake(int(payload))
+        except Exception:
+            logger.warning("Live update listener lost its connection; retrying", exc_info=True)
+        finally:
+            _listening.clear()
+            try:
+                wrapper.close()
+            except Exception:
+                pass
+        time.sleep(LISTENER_RETRY_SECONDS)
@@ -0,0 +1,37 @@
+"""Management command: move old messages into the ArchivedMessage table.
+
+    python manage.py archive_messages                 # MESSAGE_ARCHIVE_DAYS (180)
+    python manage.py archive_messages --days 90
+    python manage.py archive_messages --dry-run       # count only
+
+Meant for a nightly cron. The newest MESSAGE_ARCHIVE_KEEP_RECENT messages
+of each conversation are never moved (see back/message_archive.py).
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Archive messages older than N days out of the hot Message table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=getattr(settings, "MESSAGE_ARCHIVE_DAYS", 180))
+        parser.add_argument(
+            "--keep-recent", type=int, default=getattr(settings, "MESSAGE_ARCHIVE_KEEP_RECENT", 50),
+            help="Messages per conversation that always stay in place.",
+        )
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument("--dry-run", action="store_true", help="Count archivable rows without moving them.")
+
+    def handle(self, *args, **options):
+        from back.message_archive import archive_messages
+
+        result = archive_messages(
+            older_than_days=options["days"], keep_recent=options["keep_recent"],
+            batch_size=options["batch_size"], dry_run=options["dry_run"],
+        )
+        verb = "Would archive" if options["dry_run"] else "Archived"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {result['archived']} message(s) from {result['conversations']} conversation(s)."
+        ))
@@ -0,0 +1,132 @@
+"""Management command: load-test the chat hot-path queries on a large Message table.
+
+    python manage.py bench_message_history --messages 10000000 --conversations 200000
+    python manage.py bench_message_history --reuse            # time only, rows already loaded
+    python manage.py bench_message_history --cleanup          # drop the bench tenant
+
+Fills a throwaway tenant ("bench_messages") with synthetic conversations and
+messages spread over a year (bot rows get a pipeline-trace payload), then
+times the queries every turn and chat screen runs: the AI history window,
+the chat screen's last 50, the "last bot message" check and the poll for new
+messages. Prints p50/p95 per query and the database's plan for the history
+window. Run it against a scratch database — it writes millions of rows.
+"""
+
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+BENCH_USERNAME = "bench_messages"
+INSERT_CHUNK = 10000
+
+
+class Command(BaseCommand):
+    help = "Benchmark message history queries (AI context, chat screen) at scale."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=1_000_000)
+        parser.add_argument("--conversations", type=int, default=20_000)
+        parser.add_argument("--samples", type=int, default=500, help="Random conversations timed per query.")
+        parser.add_argument("--reuse", action="store_true", help="Skip loading; time the existing bench rows.")
+        parser.add_argument("--cleanup", action="store_true", help="Delete the bench tenant and exit.")
+
+    def handle(self, *args, **options):
+        from back.models import Conversation
+
+        User = get_user_model()
+        if options["cleanup"]:
+            deleted = User.objects.filter(username=BENCH_USERNAME).delete()[0]
+            self.stdout.write(f"Deleted {deleted} row(s).")
+            return
+
+        user, _ = User.objects.get_or_create(username=BENCH_USERNAME)
+        if not options["reuse"]:
+            self._fill(user, options["messages"], options["conversations"])
+
+        conv_ids = list(Conversation.objects.filter(user=user).values_list("id", flat=True))
+        if not conv_ids:
+            self.stderr.write(self.style.ERROR("No bench conversations — run without --reuse first."))
+            return
+        rng = random.Random(7)
+        sample = [rng.choice(conv_ids) for _ in range(options["samples"])]
+        self._time_queries(sample)
+
+    # ------------------------------------------------------------------ fill
+    def _fill(self, user, n_messages, n_conversations):
+        from back.models import Conversation, Message, MessagePayload
+
+        t0 = time.perf_counter()
+        convs = Conversation.objects.bulk_create([
+            Conversation(user=user, platform="messenger", customer_id=f"bench-{i}")
+            for i in range(n_conversations)
+        ], batch_size=INSERT_CHUNK)
+        conv_ids = [c.id for c in convs]
+
+        rng = random.Random(11)
+        start = timezone.now() - timedelta(days=365)
+        span = 365 * 24 * 3600
+        trace = {"intent": "SEARCH_PRODUCT", "tool_calls": [{"tool": "search_products", "state": "success",
+                                                             "time_ms": 120}] * 4,
+                 "delivery": {"ok": True, "sent": {"texts": 2}, "errors": []}}
+        # Rows get spread-out timestamps instead of "now".
+        ts_field = Message._meta.get_field("timestamp")
+        ts_field.auto_now_add = False
+        try:
+            done = 0
+            while done < n_messages:
+                size = min(INSERT_CHUNK, n_messages - done)
+                rows = []
+                for i in range(size):
+                    bot = (done + i) % 2 == 1
+                    rows.append(Message(
+                        conversation_id=rng.choice(conv_ids),
+                        sender="bot" if bot else "customer",
+                        text="Ei product ta ache? dam koto?" if not bot else "Ji ache, dam 450 taka. Order korben?",
+                        timestamp=start + timedelta(seconds=rng.randrange(span)),
+                    ))
+                with transaction.atomic():
+                    Message.objects.bulk_create(rows)
+                    MessagePayload.objects.bulk_create(
+                        [MessagePayload(message_id=m.id, data=trace) for m in rows if m.sender == "bot"]
+                    )
+                done += size
+                if done % (INSERT_CHUNK * 20) == 0 or done == n_messages:
+                    self.stdout.write(f"  {done:,} messages ({time.perf_counter() - t0:.0f}s)")
+        finally:
+            ts_field.auto_now_add = True
+        self.stdout.write(f"Loaded {n_messages:,} messages in {n_conversations:,} conversations "
+                          f"({time.perf_counter() - t0:.0f}s)")
+
+    # ------------------------------------------------------------------ time
+    def _time_queries(self, sample):
+        from back.models import Message
+
+        queries = {
+            "ai history window (15)": lambda c: list(
+                Message.objects.filter(conversation_id=c).order_by("-timestamp")[:15]),
+            "chat screen (last 50)": lambda c: list(
+                Message.objects.filter(conversation_id=c).order_by("-id")[:50]),
+            "last bot message": lambda c: Message.objects.filter(
+                conversation_id=c, sender="bot").order_by("-timestamp").first(),
+            "poll new messages": lambda c: list(
+                Message.objects.filter(conversation_id=c, id__gt=0).order_by("id")[:50]),
+        }
+        self.stdout.write(f"{'query':<26} {'p50 ms':>8} {'p95 ms':>8}")
+        for name, run in queries.items():
+            times = []
+            for c in sample:
+                t0 = time.perf_counter()
+                run(c)
+                times.append((time.perf_counter() - t0) * 1000)
+            times.sort()
+            p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+            self.stdout.write(f"{name:<26} {statistics.median(times):>8.2f} {p95:>8.2f}")
+
+        plan = Message.objects.filter(conversation_id=sample[0]).order_by("-timestamp")[:15].explain()
+        self.stdout.write("\nHistory window plan:\n" + plan)
@@ -0,0 +1,94 @@
+"""Move old chat messages out of the hot Message table.
+
+Everything on the chat hot path reads a conversation's newest messages: the
+AI context window (15), the chat screen (50), "last bot message" checks.
+``archive_messages`` moves messages older than MESSAGE_ARCHIVE_DAYS into
+ArchivedMessage (payload inlined), conversation by conversation and in
+batches, so the Message table and its indexes stay proportional to recent
+traffic instead of to a tenant's whole history.
+
+The newest MESSAGE_ARCHIVE_KEEP_RECENT messages of every conversation stay in
+place whatever their age, so a customer returning after months still gets a
+bot (and an agent screen) that sees the last exchange.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_BATCH_SIZE = 2000
+
+
+def _archivable(conversation_id, cutoff, keep_recent):
+    from back.models import Message
+
+    qs = Message.objects.filter(conversation_id=conversation_id, timestamp__lt=cutoff)
+    if keep_recent:
+        # id of the newest message that is NOT among the kept ones
+        boundary = list(
+            Message.objects.filter(conversation_id=conversation_id)
+            .order_by("-id").values_list("id", flat=True)[keep_recent:keep_recent + 1]
+        )
+        if not boundary:
+            return qs.none()
+        qs = qs.filter(id__lte=boundary[0])
+    return qs
+
+
+def _move(messages):
+    from back.models import ArchivedMessage, Message, MessagePayload
+
+    ids = [m.id for m in messages]
+    payloads = dict(MessagePayload.objects.filter(message_id__in=ids).values_list("message_id", "data"))
+    with transaction.atomic():
+        ArchivedMessage.objects.bulk_create([
+            ArchivedMessage(
+                id=m.id, conversation_id=m.conversation_id, mid=m.mid, sender=m.sender,
+                text=m.text, attachments=m.attachments, raw_payload=payloads.get(m.id),
+                replied_to_mid=m.replied_to_id, timestamp=m.timestamp,
+            )
+            for m in messages
+        ], ignore_conflicts=True)
+        Message.objects.filter(id__in=ids).delete()
+
+
+def archive_messages(older_than_days=None, keep_recent=None, batch_size=ARCHIVE_BATCH_SIZE, dry_run=False):
+    """Archive messages older than ``older_than_days``.
+
+    Returns {"conversations": int, "archived": int}; with ``dry_run`` nothing
+    is moved and "archived" is the number of rows that would be.
+    """
+    from back.models import Message
+
+    if older_than_days is None:
+        older_than_days = getattr(settings, "MESSAGE_ARCHIVE_DAYS", 180)
+    if keep_recent is None:
+        keep_recent = getattr(settings, "MESSAGE_ARCHIVE_KEEP_RECENT", 50)
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    result = {"conversations": 0, "archived": 0}
+
+    conversation_ids = list(
+        Message.objects.filter(timestamp__lt=cutoff)
+        .order_by().values_list("conversation_id", flat=True).distinct()
+    )
+    for conversation_id in conversation_ids:
+        qs = _archivable(conversation_id, cutoff, keep_recent)
+        if dry_run:
+            n = qs.count()
+        else:
+            n = 0
+            while True:
+                batch = list(qs.order_by("id")[:batch_size])
+                if not batch:
+                    break
+                _move(batch)
+                n += len(batch)
+        if n:
+            result["conversations"] += 1
+            result["archived"] += n
+            logger.info("Archived %d message(s) of conv=%s%s", n, conversation_id, " (dry run)" if dry_run else "")
+    return result
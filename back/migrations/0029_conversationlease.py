@@ -0,0 +1,22 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('back', '0028_backgroundjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ConversationLease',
+            fields=[
+                ('conversation', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='pipeline_lease', serialize=False, to='back.conversation')),
+                ('owner', models.CharField(blank=True, default='', max_length=64)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
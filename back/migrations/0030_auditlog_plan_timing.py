@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('back', '0029_conversationlease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auditlog',
+            name='plan_run',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='auditlog',
+            name='start_offset_ms',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
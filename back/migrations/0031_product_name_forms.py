@@ -0,0 +1,23 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('back', '0030_auditlog_plan_timing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='name_latin',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='name_tokens',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:48
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def detach_duplicate_remote_rows(apps, schema_editor):
+    """Keep the newest row per (source, external_id); detach and disable the
+    rest so the unique constraint can be created."""
+    Product = apps.get_model("back", "Product")
+    dupes = (
+        Product.objects.exclude(source=None).exclude(external_id=None)
+        .values("source_id", "external_id")
+        .annotate(n=Count("id"), keep=Max("id"))
+        .filter(n__gt=1)
+    )
+    for d in dupes:
+        Product.objects.filter(source_id=d["source_id"], external_id=d["external_id"]) \
+            .exclude(id=d["keep"]).update(external_id=None, status=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('back', '0031_product_name_forms'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=40),
+        ),
+        migrations.RunPython(detach_duplicate_remote_rows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.UniqueConstraint(fields=('source', 'external_id'), name='uniq_product_source_external_id'),
+        ),
+    ]
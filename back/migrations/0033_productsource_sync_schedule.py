@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('back', '0032_product_sync_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productsource',
+            name='last_full_sync',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='productsource',
+            name='next_sync_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='productsource',
+            name='sync_interval_minutes',
+            field=models.PositiveIntegerField(default=60),
+        ),
+        migrations.AlterField(
+            model_name='productsource',
+            name='mode',
+            field=models.CharField(choices=[('sync', 'Synced cache'), ('live', 'Live fetch'), ('cached_live', 'Live, served from local mirror')], default='sync', max_length=20),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.1.6 on 2026-10-18 20:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# One set-based statement each way — no per-row Python on large tables.
+COPY_PAYLOADS = """
+    INSERT INTO back_messagepayload (message_id, data)
+    SELECT id, raw_payload FROM back_message WHERE raw_payload IS NOT NULL
+"""
+RESTORE_PAYLOADS = """
+    UPDATE back_message SET raw_payload = (
+        SELECT data FROM back_messagepayload WHERE back_messagepayload.message_id = back_message.id
+    )
+"""
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('back', '0033_productsource_sync_schedule'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedMessage',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('mid', models.CharField(blank=True, max_length=255, null=True)),
+                ('sender', models.CharField(choices=[('customer', 'Customer'), ('bot', 'Bot'), ('agent', 'Agent')], max_length=20)),
+                ('text', models.TextField(blank=True, null=True)),
+                ('attachments', models.JSONField(blank=True, null=True)),
+                ('raw_payload', models.JSONField(blank=True, null=True)),
+                ('replied_to_mid', models.CharField(blank=True, max_length=255, null=True)),
+                ('timestamp', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='MessagePayload',
+            fields=[
+                ('message', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='payload', serialize=False, to='back.message')),
+                ('data', models.JSONField()),
+            ],
+        ),
+        migrations.RunSQL(COPY_PAYLOADS, RESTORE_PAYLOADS),
+        migrations.RemoveField(
+            model_name='message',
+            name='raw_payload',
+        ),
+        migrations.AlterField(
+            model_name='message',
+            name='conversation',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='messages', to='back.conversation'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'timestamp'], name='msg_conv_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'id'], name='msg_conv_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['conversation', 'sender', 'timestamp'], name='msg_conv_sender_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['timestamp'], name='msg_ts_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedmessage',
+            name='conversation',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_messages', to='back.conversation'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedmessage',
+            index=models.Index(fields=['conversation', 'timestamp'], name='archmsg_conv_ts_idx'),
+        ),
+    ]
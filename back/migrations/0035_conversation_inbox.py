@@ -0,0 +1,60 @@
+# Generated by Django 5.1.6 on 2026-10-18 20:16
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BACKFILL = """
+    INSERT INTO back_inboxentry
+        (conversation_id, user_id, platform, sort_at, preview, last_message_type,
+         last_sender, unread_count, search_key)
+    SELECT id, user_id, platform, COALESCE(updated_at, timestamp),
+           SUBSTR(COALESCE(message_text, ''), 1, 255), COALESCE(last_message_type, ''),
+           '', 0, LOWER(SUBSTR(TRIM(COALESCE(customer_name, '') || ' ' || customer_id), 1, 512))
+    FROM back_conversation
+"""
+
+
+def add_trigram_index(apps, schema_editor):
+    """Substring search on search_key; pg_trgm is PostgreSQL-only."""
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    schema_editor.execute(
+        "CREATE INDEX IF NOT EXISTS inbox_search_trgm_idx ON back_inboxentry USING gin (search_key gin_trgm_ops)"
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("DROP INDEX IF EXISTS inbox_search_trgm_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('back', '0034_message_storage'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InboxEntry',
+            fields=[
+                ('conversation', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='inbox', serialize=False, to='back.conversation')),
+                ('platform', models.CharField(choices=[('messenger', 'Messenger'), ('instagram', 'Instagram'), ('whatsapp', 'WhatsApp'), ('telegram', 'Telegram')], max_length=20)),
+                ('sort_at', models.DateTimeField()),
+                ('preview', models.CharField(blank=True, default='', max_length=255)),
+                ('last_message_type', models.CharField(blank=True, default='', max_length=50)),
+                ('last_sender', models.CharField(blank=True, default='', max_length=20)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+                ('search_key', models.CharField(blank=True, default='', max_length=512)),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='inbox_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-sort_at', '-conversation'], name='inbox_user_sort_idx'), models.Index(fields=['user', 'platform', '-sort_at', '-conversation'], name='inbox_user_platform_sort_idx')],
+            },
+        ),
+        migrations.RunSQL(BACKFILL, migrations.RunSQL.noop),
+        migrations.RunPython(add_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-18 20:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('back', '0035_conversation_inbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlatformMedia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_hash', models.CharField(max_length=64)),
+                ('url', models.TextField()),
+                ('media_id', models.CharField(max_length=255)),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('integration', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='media', to='back.integration')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('integration', 'url_hash'), name='platform_media_unique')],
+            },
+        ),
+    ]
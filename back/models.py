@@ -120,8 +120,33 @@ class Integration(models.Model):
     @classmethod
     def get_active(cls, user, platform):
         """The integration to use for a platform: a connected one wins, else the most recent."""
-        qs = cls.objects.filter(user=user, platform=platform)
-        return qs.filter(is_connected=True).order_by("-id").first() or qs.order_by("-id").first()
+        return (
+            cls.objects.filter(user=user, platform=platform)
+            .order_by("-is_connected", "-id").first()
+        )
+
+class PlatformMedia(models.Model):
+    """An image already uploaded to a platform, by source URL (api/ai/media_cache.py).
+
+    ``media_id`` is the WhatsApp media id, Telegram ``file_id`` or Messenger
+    ``attachment_id``; sends reference it instead of uploading the image again.
+    """
+    # Indexed through platform_media_unique (integration is its prefix).
+    integration = models.ForeignKey(Integration, on_delete=models.CASCADE, related_name="media", db_index=False)
+    url_hash = models.CharField(max_length=64)
+    url = models.TextField()
+    media_id = models.CharField(max_length=255)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["integration", "url_hash"], name="platform_media_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.integration_id}: {self.url[:60]}"
+
 
 # -----------------------
 # Products
@@ -136,6 +161,7 @@ class ProductSource(models.Model):
     MODE_CHOICES = [
         ("sync", "Synced cache"),   # products mirrored into local Product rows
         ("live", "Live fetch"),     # query the external store in real time
+        ("cached_live", "Live, served from local mirror"),  # mirror kept fresh by run_product_sync
     ]
     STATUS_CHOICES = [
         ("connected", "Connected"),
@@ -157,11 +183,15 @@ class ProductSource(models.Model):
     order_endpoint_url = models.URLField(blank=True, null=True)
     order_endpoint_auth = models.JSONField(blank=True, null=True, help_text="Optional extra headers/auth for custom order endpoint")
 
-    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default="sync")
+    mode = models.CharField(max_length=20, choices=MODE_CHOICES, default="sync")
     is_active = models.BooleanField(default=False, help_text="The single active source the AI reads from")
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="disconnected")
     last_error = models.TextField(blank=True, null=True)
     last_synced = models.DateTimeField(blank=True, null=True)
+    # Scheduled sync (api/products/scheduler.py).
+    sync_interval_minutes = models.PositiveIntegerField(default=60)
+    next_sync_at = models.DateTimeField(blank=True, null=True, db_index=True)
+    last_full_sync = models.DateTimeField(blank=True, null=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -206,6 +236,12 @@ class ProductSource(models.Model):
     def access_token(self, value):
         self._access_token = encrypt_value(value or "")
 
+    @property
+    def reads_live(self):
+        """Chat queries the remote store directly. A cached-live source does
+        so only until its local mirror has been synced once."""
+        return self.mode == "live" or (self.mode == "cached_live" and not self.last_synced)
+
     @classmethod
     def get_active_for(cls, user):
         return cls.objects.filter(user=user, is_active=True).first()
@@ -236,6 +272,13 @@ class Product(models.Model):
 
     source = models.ForeignKey("ProductSource", on_delete=models.SET_NULL, null=True, blank=True, related_name="products", help_text="Null = internal/default product")
     external_id = models.CharField(max_length=255, blank=True, null=True, db_index=True, help_text="Product ID in the external store")
+    # Search forms of ``name`` (api/ai/product_index.name_forms), written on
+    # every save so product search never latinizes names at query time.
+    name_latin = models.TextField(blank=True, default="", editable=False)
+    name_tokens = models.TextField(blank=True, default="", editable=False)
+    # Hash of the synced fields as last written by api/products/sync.py;
+    # unchanged remote items are skipped. Cleared when a product is disabled.
+    content_hash = models.CharField(max_length=40, blank=True, default="", editable=False)
 
     pid = ShortUUIDField(
         length=6,
@@ -246,6 +289,10 @@ class Product(models.Model):
 
     class Meta:
         verbose_name_plural = "Products"
+        constraints = [
+            # One local row per remote product — the sync upserts on it.
+            models.UniqueConstraint(fields=["source", "external_id"], name="uniq_product_source_external_id"),
+        ]
 
     def product_image(self):
         return mark_safe(f'<img src="{self.image.url}" width="50" height="50" />')
@@ -256,7 +303,39 @@ class Product(models.Model):
     def get_percentage(self):
         new_price = (self.price / self.discounted_price) * 100
         return new_price
-    
+
+
+class CatalogVersion(models.Model):
+    """Per-tenant counter bumped by every write to the tenant's products.
+
+    Product post_save/post_delete bump it (back/signals.py); bulk writers
+    (the product sync, the CSV import) call ``bump`` themselves. Processes
+    compare it to tell whether their cached replies and search index are stale.
+    """
+    # No FK constraint: deleting a user cascades to its products, whose
+    # post_delete may bump (re-create) this row after the cascade removed it.
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, db_constraint=False,
+                                related_name="catalog_version")
+    version = models.PositiveBigIntegerField(default=0)
+
+    @classmethod
+    def current(cls, user_id):
+        return cls.objects.filter(user_id=user_id).values_list("version", flat=True).first() or 0
+
+    @classmethod
+    def bump(cls, user_id):
+        from django.db import IntegrityError, transaction
+        from django.db.models import F
+
+        if cls.objects.filter(user_id=user_id).update(version=F("version") + 1):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(user_id=user_id, version=1)
+        except IntegrityError:
+            # Another write created the row first.
+            cls.objects.filter(user_id=user_id).update(version=F("version") + 1)
+
 
 class ProductImages(models.Model):
     images = models.ImageField(upload_to="product-images", default="product.jpg")
@@ -455,12 +534,12 @@ class Conversation(models.Model):
     
 
 class Message(models.Model):
-    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name="messages")
+    # Indexed through msg_conv_ts_idx / msg_conv_id_idx (conversation is their prefix).
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name="messages", db_index=False)
 
     # 🔹 Platform message id (mid / wamid / etc.)
     mid = models.CharField(max_length=255, unique=True, blank=True, null=True, db_index=True)
     attachments = models.JSONField(blank=True, null=True)
-    raw_payload = models.JSONField(blank=True, null=True)
     # Replied To Message
     replied_to = models.ForeignKey("self", null=True, blank=True, to_field="mid", on_delete=models.SET_NULL, related_name="replies")
 
@@ -475,6 +554,16 @@ class Message(models.Model):
     text = models.TextField(null=True, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # History windows (AI context, chat screens) and "last bot message".
+            models.Index(fields=["conversation", "timestamp"], name="msg_conv_ts_idx"),
+            models.Index(fields=["conversation", "id"], name="msg_conv_id_idx"),
+            models.Index(fields=["conversation", "sender", "timestamp"], name="msg_conv_sender_ts_idx"),
+            # archive_messages scans by age.
+            models.Index(fields=["timestamp"], name="msg_ts_idx"),
+        ]
+
 
     def __str__(self):
         if self.text:
@@ -484,21 +573,108 @@ class Message(models.Model):
             return f"{self.sender}: [attachment]"
 
         return f"{self.sender}: [empty message]"
-    
+
+    # Webhook bodies and pipeline traces live in MessagePayload, so history
+    # reads never carry them. ``raw_payload`` reads the side row on first
+    # access (or from ``select_related("payload")``) and save() writes it.
+    @property
+    def raw_payload(self):
+        if "_raw_payload" not in self.__dict__:
+            data = None
+            if self.pk is not None:
+                try:
+                    data = self.payload.data
+                except MessagePayload.DoesNotExist:
+                    pass
+            self.__dict__["_raw_payload"] = data
+        return self.__dict__["_raw_payload"]
+
+    @raw_payload.setter
+    def raw_payload(self, value):
+        self.__dict__["_raw_payload"] = value
+        self._raw_payload_dirty = True
+
     def save(self, *args, **kwargs):
         is_new  = self.pk is None
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "raw_payload" in update_fields:
+            kwargs["update_fields"] = [f for f in update_fields if f != "raw_payload"]
+        if kwargs.get("update_fields") != []:
+            super().save(*args, **kwargs)
+        if getattr(self, "_raw_payload_dirty", False):
+            self._save_payload(is_new)
 
         if is_new :
-            preview = self.text or "📷 Image"
+            # Conversation preview/counters and the dashboard inbox row.
+            from .inbox import record_message
+            record_message(self)
+
+    def _save_payload(self, is_new):
+        data = self.__dict__.get("_raw_payload")
+        if data is None:
+            if not is_new:
+                MessagePayload.objects.filter(message_id=self.pk).delete()
+        elif is_new:
+            MessagePayload.objects.create(message_id=self.pk, data=data)
+        else:
+            MessagePayload.objects.update_or_create(message_id=self.pk, defaults={"data": data})
+        self._raw_payload_dirty = False
+
+
+class MessagePayload(models.Model):
+    """Raw webhook body / pipeline trace of one Message (see Message.raw_payload)."""
+    message = models.OneToOneField(Message, on_delete=models.CASCADE, primary_key=True, related_name="payload")
+    data = models.JSONField()
+
+
+class InboxEntry(models.Model):
+    """Chat-list projection of a Conversation (see back/inbox.py)."""
+    conversation = models.OneToOneField(Conversation, on_delete=models.CASCADE, primary_key=True, related_name="inbox")
+    # Indexed through the inbox_* indexes below (user is their prefix).
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="inbox_entries", db_index=False)
+    platform = models.CharField(max_length=20, choices=Conversation.PLATFORM_CHOICES)
+    sort_at = models.DateTimeField()
+    preview = models.CharField(max_length=255, blank=True, default="")
+    last_message_type = models.CharField(max_length=50, blank=True, default="")
+    last_sender = models.CharField(max_length=20, blank=True, default="")
+    unread_count = models.PositiveIntegerField(default=0)
+    search_key = models.CharField(max_length=512, blank=True, default="")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "-sort_at", "-conversation"], name="inbox_user_sort_idx"),
+            models.Index(fields=["user", "platform", "-sort_at", "-conversation"], name="inbox_user_platform_sort_idx"),
+        ]
 
-            Conversation.objects.filter(id=self.conversation_id).update(updated_at=timezone.now(),
-                                                                        message_text=preview,
-                                                                        last_message_type="image" if self.attachments else "text"
-                                                                        )
+    def __str__(self):
+        return f"{self.conversation_id}: {self.preview[:30]}"
 
 
-            
+class ArchivedMessage(models.Model):
+    """A Message moved out of the hot table by ``manage.py archive_messages``.
+
+    Keeps the original id; the payload is inlined since archived rows are
+    only read one conversation at a time (support, exports).
+    """
+    id = models.BigIntegerField(primary_key=True)
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name="archived_messages", db_index=False)
+    mid = models.CharField(max_length=255, blank=True, null=True)
+    sender = models.CharField(max_length=20, choices=Message.SENDER_CHOICES)
+    text = models.TextField(null=True, blank=True)
+    attachments = models.JSONField(blank=True, null=True)
+    raw_payload = models.JSONField(blank=True, null=True)
+    replied_to_mid = models.CharField(max_length=255, blank=True, null=True)
+    timestamp = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["conversation", "timestamp"], name="archmsg_conv_ts_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.sender}: {(self.text or '[attachment]')[:30]}"
+
 
 # -----------------------
 # Sales
@@ -672,6 +848,62 @@ class MessageBatch(models.Model):
         return f"Batch message for {self.conversation_id} at {self.timestamp}"
 
 
+class ConversationLease(models.Model):
+    """Cross-process mutex for one conversation's AI pipeline (api/webhooks.py).
+
+    Owned while ``expires_at`` is in the future; an expired lease (holder
+    crashed) can be taken over by any worker.
+    """
+    conversation = models.OneToOneField(
+        Conversation, on_delete=models.CASCADE, primary_key=True, related_name="pipeline_lease"
+    )
+    owner = models.CharField(max_length=64, blank=True, default="")
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Lease conv={self.conversation_id} owner={self.owner or '-'}"
+
+
+class BackgroundJob(models.Model):
+    """Durable work item consumed by ``manage.py run_ai_workers`` (see api/jobs.py).
+
+    A worker leases a job by moving it to ``running`` with ``leased_until`` in
+    the future. If the worker dies, the lease expires and another worker picks
+    the job up again (visibility timeout). Failures are retried with
+    exponential backoff until ``max_attempts`` is reached.
+    """
+    STATUS_CHOICES = [
+        ("queued", "Queued"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    kind = models.CharField(max_length=50, db_index=True)
+    payload = models.JSONField(default=dict, blank=True)
+    # Jobs sharing a non-empty key collapse into one queued row (debounce).
+    dedupe_key = models.CharField(max_length=255, blank=True, default="")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="queued")
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    leased_until = models.DateTimeField(null=True, blank=True)
+    leased_by = models.CharField(max_length=100, blank=True, default="")
+    last_error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["run_at"]
+        indexes = [
+            models.Index(fields=["status", "run_at"]),
+            models.Index(fields=["dedupe_key", "status"]),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} [{self.status}] #{self.pk}"
+
+
 class SupportTicket(models.Model):
     STATUS_CHOICES = [
         ("open", "Open"),
@@ -752,6 +984,10 @@ class AuditLog(models.Model):
     result_state = models.CharField(max_length=20, default="success")
     result_summary = models.TextField(blank=True, default="")
     execution_time_ms = models.IntegerField(default=0)
+    # One Executor.execute run; with start_offset_ms (step start relative to
+    # the run start) this shows which steps overlapped and the plan wall time.
+    plan_run = models.CharField(max_length=32, blank=True, default="", db_index=True)
+    start_offset_ms = models.IntegerField(null=True, blank=True)
     actor_role = models.CharField(max_length=50, blank=True, default="")
     ip_address = models.CharField(max_length=50, blank=True, default="")
     timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
@@ -0,0 +1,221 @@
+"""Catalog-scale product CSV export / import for the Products page.
+
+Export streams rows straight from a ``values_list`` iterator, so memory stays
+flat however large the catalog is and the download starts immediately.
+
+Import reads the upload line by line (Django spools large uploads to disk)
+and works in batches of IMPORT_BATCH_SIZE rows: one query finds which names
+already exist, existing products are updated with ``bulk_update`` and new
+ones inserted with ``bulk_create``. Image URLs are fetched afterwards by the
+job queue (``product_images`` jobs) instead of inside the request.
+
+Both sides accept the export's own headers ("Stock Quantity", "Image URL",
+"Active"/"Inactive") as well as the sample file's (``stock_quantity``,
+``image``, ``true``/``false``), so an export can be re-imported as is.
+"""
+import codecs
+import csv
+import logging
+from decimal import Decimal, InvalidOperation
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+EXPORT_CHUNK_SIZE = 2000
+IMPORT_BATCH_SIZE = 500
+IMAGE_JOB_SIZE = 50           # image downloads per background job
+MAX_REPORTED_ERRORS = 10
+
+EXPORT_HEADER = ["Name", "Description", "Price", "Discounted Price", "Stock Quantity", "Status", "Image URL"]
+_UPDATE_FIELDS = ["description", "price", "discounted_price", "stock_quantity", "status"]
+_HEADER_ALIASES = {"image_url": "image"}
+_TRUE = {"true", "active", "1", "yes"}
+
+
+# ---------------------------------------------------------------------------
+# Export
+# ---------------------------------------------------------------------------
+
+class _Echo:
+    """csv.writer target that hands each row back instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(user):
+    """CSV lines (header first) for every product of ``user``."""
+    from back.models import Product
+
+    storage = Product._meta.get_field("image").storage
+    urls = {}
+    writer = csv.writer(_Echo())
+    yield writer.writerow(EXPORT_HEADER)
+    rows = (
+        Product.objects.filter(user=user).order_by("pk")
+        .values_list("name", "description", "price", "discounted_price",
+                     "stock_quantity", "status", "image")
+    )
+    for name, description, price, discounted, stock, status, image in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        # Most rows share the default image — resolve each file's URL once.
+        url = urls.get(image)
+        if url is None:
+            url = urls[image] = storage.url(image) if image else ""
+        yield writer.writerow([
+            name, description, price, discounted or "", stock,
+            "Active" if status else "Inactive", url,
+        ])
+
+
+# ---------------------------------------------------------------------------
+# Import
+# ---------------------------------------------------------------------------
+
+def _key(header):
+    key = (header or "").strip().lower().replace(" ", "_")
+    return _HEADER_ALIASES.get(key, key)
+
+
+def _decimal(value, field, required=False):
+    value = (value or "").strip()
+    if not value:
+        if required:
+            return Decimal("0")
+        return None
+    try:
+        return Decimal(value)
+    except InvalidOperation:
+        raise ValueError(f"invalid {field} {value!r}")
+
+
+def _parse(row):
+    name = (row.get("name") or "").strip()
+    if not name:
+        raise ValueError("missing name")
+    stock = (row.get("stock_quantity") or "").strip()
+    try:
+        stock = int(Decimal(stock)) if stock else 0
+    except InvalidOperation:
+        raise ValueError(f"invalid stock_quantity {stock!r}")
+    return name, {
+        "description": row.get("description") or "",
+        "price": _decimal(row.get("price"), "price", required=True),
+        "discounted_price": _decimal(row.get("discounted_price"), "discounted_price"),
+        "stock_quantity": stock,
+        "status": (row.get("status") or "").strip().lower() in _TRUE,
+    }, (row.get("image") or "").strip()
+
+
+def import_products_csv(user, fileobj, batch_size=IMPORT_BATCH_SIZE):
+    """Upsert products of ``user`` from a CSV upload, keyed on product name.
+
+    Progress is logged after every batch. Returns
+    {"created", "updated", "skipped", "rows": int, "errors": [str]}.
+    """
+    result = {"created": 0, "updated": 0, "skipped": 0, "rows": 0, "errors": []}
+    seen = set()
+    batch = []
+
+    def skip(line, reason):
+        result["skipped"] += 1
+        if len(result["errors"]) < MAX_REPORTED_ERRORS:
+            result["errors"].append(f"Row {line}: {reason}")
+
+    def flush():
+        if batch:
+            _write_batch(user, batch, result)
+            batch.clear()
+
+    reader = csv.DictReader(codecs.iterdecode(fileobj, "utf-8-sig"))
+    try:
+        for row in reader:
+            result["rows"] += 1
+            row = {_key(k): v for k, v in row.items() if k}
+            try:
+                name, fields, image = _parse(row)
+            except ValueError as e:
+                skip(reader.line_num, e)
+                continue
+            if name in seen:
+                skip(reader.line_num, f"duplicate name {name!r}")
+                continue
+            seen.add(name)
+            batch.append((name, fields, image))
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Rows before the bad line are already saved.
+        result["errors"].append(f"Stopped at row {reader.line_num}: {e}")
+    finally:
+        # bulk writes skip the Product signals — drop this tenant's caches here
+        # and bump its CatalogVersion for other processes.
+        from api.ai import product_index, response_cache
+        from back.models import CatalogVersion
+
+        if result["created"] or result["updated"]:
+            CatalogVersion.bump(user.pk)
+        product_index.invalidate(user.pk)
+        response_cache.invalidate(user.pk)
+    return result
+
+
+def _write_batch(user, batch, result):
+    from api.ai.product_index import name_forms
+    from api.jobs import enqueue
+    from back.models import Product
+
+    existing = {}
+    for product in Product.objects.filter(user=user, name__in=[name for name, _, _ in batch]):
+        existing.setdefault(product.name, []).append(product)
+
+    to_update, to_create = [], []
+    for name, fields, image in batch:
+        matches = existing.get(name)
+        if matches:
+            for product in matches:
+                for field, value in fields.items():
+                    setattr(product, field, value)
+                to_update.append(product)
+            result["updated"] += 1
+            continue
+        latin, tokens = name_forms(name)
+        product = Product(user=user, name=name, name_latin=latin, name_tokens=tokens, **fields)
+        to_create.append((product, image))
+        result["created"] += 1
+
+    with transaction.atomic():
+        if to_update:
+            Product.objects.bulk_update(to_update, _UPDATE_FIELDS)
+        if to_create:
+            Product.objects.bulk_create([p for p, _ in to_create])
+
+    images = [[p.pk, url] for p, url in to_create if url and p.pk]
+    for i in range(0, len(images), IMAGE_JOB_SIZE):
+        enqueue("product_images", {"images": images[i:i + IMAGE_JOB_SIZE]})
+    logger.info("Product import user=%s: %d rows read, %d created, %d updated so far",
+                user.pk, result["rows"], result["created"], result["updated"])
+
+
+def fetch_product_images(images):
+    """Job handler: download ``[[product_id, url], ...]`` into Product.image."""
+    import requests
+
+    from back.models import Product
+
+    products = Product.objects.in_bulk([pk for pk, _ in images])
+    for pk, url in images:
+        product = products.get(pk)
+        if product is None:
+            continue
+        try:
+            r = requests.get(url, timeout=15)
+            if r.status_code != 200:
+                continue
+            product.image.save(url.split("/")[-1].split("?")[0] or "product.jpg",
+                               ContentFile(r.content), save=False)
+            product.save(update_fields=["image"])
+        except Exception as e:
+            logger.warning("Product image download failed product=%s url=%s: %s", pk, url, e)
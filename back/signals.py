@@ -1,10 +1,10 @@
 # signals.py
 from datetime import timezone
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from .models import UserProfile, Sale, OrderItem
-from .models import Message, Integration, Conversation
+from .models import Message, Integration, Conversation, Product, ProductSource, CatalogVersion
 import requests
 import json
 
@@ -105,25 +105,55 @@ def create_or_update_user_profile(sender, instance, created, **kwargs):
     instance.profile.save()
 
 
-@receiver(post_save, sender=Message)
-def update_message_counters(sender, instance, created, **kwargs):
-    if not created:
-        return
+@receiver(pre_save, sender=Product, dispatch_uid="product_name_forms")
+def set_product_name_forms(sender, instance, **kwargs):
+    """Materialize the latinized/tokenized name used by product search."""
+    from api.ai.product_index import name_forms
+    instance.name_latin, instance.name_tokens = name_forms(instance.name)
 
-    from django.db.models import F
 
-    updates = {}
-    if instance.sender == "customer":
-        updates["customer_sent_count"] = F("customer_sent_count") + 1
-        updates["bot_received_count"] = F("bot_received_count") + 1
-    elif instance.sender == "bot":
-        updates["bot_sent_count"] = F("bot_sent_count") + 1
-    elif instance.sender == "agent":
-        updates["agent_sent_count"] = F("agent_sent_count") + 1
-        updates["bot_received_count"] = F("bot_received_count") + 1
+@receiver(post_save, sender=Product, dispatch_uid="catalog_version_product_saved")
+@receiver(post_delete, sender=Product, dispatch_uid="catalog_version_product_deleted")
+def bump_catalog_version(sender, instance, **kwargs):
+    """Tell other processes' reply caches and search indexes to refresh."""
+    CatalogVersion.bump(instance.user_id)
 
-    if updates:
-        Conversation.objects.filter(pk=instance.conversation_id).update(**updates)
+
+@receiver(post_save, sender=Product, dispatch_uid="response_cache_product_saved")
+@receiver(post_delete, sender=Product, dispatch_uid="response_cache_product_deleted")
+def invalidate_response_cache(sender, instance, **kwargs):
+    """Catalog replies cached for this tenant may list stale products."""
+    from api.ai.response_cache import invalidate
+    invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=Product, dispatch_uid="product_index_product_saved")
+@receiver(post_delete, sender=Product, dispatch_uid="product_index_product_deleted")
+def invalidate_product_index(sender, instance, **kwargs):
+    """Rebuild the tenant's in-memory product search index on next use."""
+    from api.ai.product_index import invalidate
+    invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=ProductSource, dispatch_uid="provider_cache_source_saved")
+@receiver(post_delete, sender=ProductSource, dispatch_uid="provider_cache_source_deleted")
+def invalidate_provider_cache(sender, instance, **kwargs):
+    """Cached live-catalog answers may come from the old URL/credentials."""
+    from api.products.providers.cached import invalidate
+    invalidate(instance.pk)
+
+
+# Message counters are bumped by Message.save (back/inbox.py record_message),
+# in the same UPDATE as the conversation preview.
+
+
+@receiver(post_save, sender=Conversation, dispatch_uid="inbox_conversation_saved")
+def sync_inbox_entry(sender, instance, created, update_fields=None, **kwargs):
+    from .inbox import ensure_entry, refresh
+    if created:
+        ensure_entry(instance)
+    elif update_fields is None or {"customer_name", "customer_id"} & set(update_fields):
+        refresh(instance)
 
 
 # Pipeline is now triggered by the 5-second batch timer in api/webhooks.py,
@@ -3,7 +3,15 @@ from django.contrib.auth import get_user_model
 from django.urls import reverse
 from django.utils import timezone
 
-from back.models import Integration
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+from datetime import timedelta
+
+from back.message_archive import archive_messages
+from back.models import (
+    ArchivedMessage, BackgroundJob, CatalogVersion, Conversation, InboxEntry, Integration, Message, Product,
+)
+from back.product_csv import export_rows, import_products_csv
 from back.views import _needs_setup
 
 
@@ -160,4 +168,225 @@ class OAuthNextTests(TestCase):
         from api.meta_oauth import _redirect_after_oauth
         request = type("R", (), {"session": {}})()
         resp = _redirect_after_oauth(request)
-        self.assertEqual(resp.url, reverse("back:options"))
\ No newline at end of file
+        self.assertEqual(resp.url, reverse("back:options"))
+
+class ProductCsvTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="csv_user", password="x1234567")
+
+    def _upload(self, text):
+        return SimpleUploadedFile("products.csv", text.encode("utf-8"), content_type="text/csv")
+
+    def test_import_creates_validates_and_dedupes(self):
+        result = import_products_csv(self.user, self._upload(
+            "name,description,price,discounted_price,stock_quantity,status,image\n"
+            "Dolna,Baby cradle,1200,,5,true,https://cdn.example.com/dolna.jpg\n"
+            ",no name,10,,1,true,\n"
+            "Honey,Raw,abc,,1,true,\n"
+            "Dolna,again,1300,,5,true,\n"
+        ), batch_size=1)
+        self.assertEqual((result["created"], result["skipped"]), (1, 3))
+        product = Product.objects.get(user=self.user, name="Dolna")
+        self.assertEqual((str(product.price), product.name_tokens), ("1200.00", "dolna"))
+        self.assertEqual(BackgroundJob.objects.get(kind="product_images").payload["images"],
+                         [[product.pk, "https://cdn.example.com/dolna.jpg"]])
+
+    def test_export_reimports_as_update(self):
+        Product.objects.create(user=self.user, name="Dolna", price=1200, stock_quantity=5)
+        exported = "".join(export_rows(self.user))
+        self.assertTrue(exported.startswith("Name,Description,Price"))
+
+        version = CatalogVersion.current(self.user.pk)
+        result = import_products_csv(self.user, self._upload(exported.replace("1200.00", "1100.00")))
+        self.assertEqual((result["created"], result["updated"]), (0, 1))
+        product = Product.objects.get(user=self.user)
+        self.assertEqual((str(product.price), product.status), ("1100.00", True))
+        # bulk_update skips signals; other processes learn of it through the version.
+        self.assertGreater(CatalogVersion.current(self.user.pk), version)
+
+    def test_export_view_streams(self):
+        Product.objects.create(user=self.user, name="Dolna", price=1200)
+        self.client.force_login(self.user)
+        response = self.client.get(reverse("back:export_products"))
+        self.assertTrue(response.streaming)
+        self.assertIn("Dolna", b"".join(response.streaming_content).decode())
+
+
+# Admin pages need a static manifest that test runs do not build.
+_LOCAL_STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+class MessageStorageTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="msgstore", password="x1234567")
+        self.conv = Conversation.objects.create(user=self.user, platform="messenger", customer_id="m1")
+
+    def test_raw_payload_lives_in_side_table(self):
+        msg = Message.objects.create(conversation=self.conv, sender="bot", text="hi", raw_payload={"intent": "GREETING"})
+        msg.raw_payload = dict(msg.raw_payload, delivery={"ok": True})
+        msg.save(update_fields=["raw_payload"])
+        fresh = Message.objects.get(pk=msg.pk)
+        self.assertEqual(fresh.raw_payload, {"intent": "GREETING", "delivery": {"ok": True}})
+        self.assertIsNone(Message.objects.create(conversation=self.conv, sender="customer", text="x").raw_payload)
+
+    def test_archive_moves_old_messages_but_keeps_recent(self):
+        old = timezone.now() - timedelta(days=400)
+        for i in range(5):
+            Message.objects.create(conversation=self.conv, sender="customer", text=f"m{i}", raw_payload={"n": i})
+        Message.objects.filter(conversation=self.conv).update(timestamp=old)
+
+        self.assertEqual(archive_messages(older_than_days=180, keep_recent=2, dry_run=True)["archived"], 3)
+        result = archive_messages(older_than_days=180, keep_recent=2)
+        self.assertEqual(result, {"conversations": 1, "archived": 3})
+        self.assertEqual(list(Message.objects.filter(conversation=self.conv).values_list("text", flat=True).order_by("id")),
+                         ["m3", "m4"])
+        archived = ArchivedMessage.objects.order_by("id")
+        self.assertEqual([(a.text, a.raw_payload) for a in archived], [("m0", {"n": 0}), ("m1", {"n": 1}), ("m2", {"n": 2})])
+
+    def test_ai_debug_view_reads_payloads_with_messages(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        admin = get_user_model().objects.create_superuser(username="dbg_admin", password="x1234567")
+        self.client.force_login(admin)
+        url = reverse("admin:back_ai_debug")
+        params = {"user_id": self.user.pk, "conv_id": self.conv.pk, "tab": "conversation"}
+
+        def queries():
+            with CaptureQueriesContext(connection) as ctx, self.settings(STORAGES=_LOCAL_STORAGES):
+                self.assertEqual(self.client.get(url, params).status_code, 200)
+            return len(ctx)
+
+        Message.objects.create(conversation=self.conv, sender="customer", text="a", raw_payload={"n": 1})
+        queries()   # warm per-process caches
+        one = queries()
+        for i in range(3):
+            Message.objects.create(conversation=self.conv, sender="bot", text=f"b{i}", raw_payload={"n": i})
+        self.assertEqual(queries(), one)
+
+    def test_ai_debug_page_shows_llm_latency(self):
+        from unittest import mock
+
+        admin = get_user_model().objects.create_superuser(username="dbg_staff", password="x1234567")
+        self.client.force_login(admin)
+        snapshot = {"chat:openai/gpt-4o-mini": {
+            "calls": 3, "errors": 0, "new_connections": 1, "avg_latency_ms": 812.5,
+            "avg_ttfb_ms": 640.0, "avg_connect_ms": 35.2, "max_latency_ms": 1200.0,
+        }}
+        with mock.patch("api.ai.providers.llm_metrics_snapshot", return_value=snapshot), \
+                self.settings(STORAGES=_LOCAL_STORAGES):
+            response = self.client.get(reverse("back:ai_debug"))
+        self.assertContains(response, "chat:openai/gpt-4o-mini")
+        self.assertContains(response, "avg 812.5ms")
+
+
+
+class InboxTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="inboxer", password="x1234567")
+
+    def _conv(self, customer_id, name="", platform="messenger"):
+        return Conversation.objects.create(user=self.user, platform=platform, customer_id=customer_id, customer_name=name)
+
+    def test_messages_maintain_entry_and_counters(self):
+        conv = self._conv("c1", "Rahim")
+        Message.objects.create(conversation=conv, sender="customer", text="dam koto?")
+        Message.objects.create(conversation=conv, sender="bot", text="450 taka")
+        entry = InboxEntry.objects.get(conversation=conv)
+        self.assertEqual((entry.preview, entry.last_sender, entry.unread_count), ("450 taka", "bot", 1))
+        Message.objects.create(conversation=conv, sender="agent", text="ji")
+        entry.refresh_from_db()
+        self.assertEqual(entry.unread_count, 0)
+        conv.refresh_from_db()
+        self.assertEqual((conv.customer_sent_count, conv.bot_sent_count, conv.agent_sent_count), (1, 1, 1))
+
+    def test_cursor_pages_cover_inbox_once(self):
+        from back.inbox import page
+
+        convs = [self._conv(f"c{i}", f"Customer {i}") for i in range(5)]
+        for conv in convs:
+            Message.objects.create(conversation=conv, sender="customer", text="hi")
+        seen, cursor = [], None
+        while True:
+            entries, cursor = page(self.user, cursor=cursor, limit=2)
+            seen += [e.conversation_id for e in entries]
+            if not cursor:
+                break
+        self.assertEqual(seen, [c.id for c in reversed(convs)])
+        entries, _ = page(self.user, q="customer 3")
+        self.assertEqual([e.conversation_id for e in entries], [convs[3].id])
+
+    def test_view_filters_platform_and_renames_are_searchable(self):
+        self._conv("w1", platform="whatsapp")
+        conv = self._conv("m1")
+        conv.customer_name = "Karim"
+        conv.save()
+        client = Client()
+        client.force_login(self.user)
+        data = client.get(reverse("back:ajax_load_conversations"), {"platform": "messenger", "q": "kar"}).json()
+        self.assertEqual([c["id"] for c in data["conversations"]], [conv.id])
+        self.assertIsNone(data["next_cursor"])
+
+
+class LiveUpdateTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="watcher", password="x1234567")
+        self.conv = Conversation.objects.create(user=self.user, platform="messenger", customer_id="l1")
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_publish_wakes_waiter_after_commit(self):
+        from back import live
+
+        seen = live.version(self.user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            Message.objects.create(conversation=self.conv, sender="customer", text="hello")
+        self.assertNotEqual(live.wait(self.user.pk, seen, timeout=0.01), seen)
+
+    def test_wait_releases_the_db_connection(self):
+        from unittest.mock import patch
+
+        from back import live
+
+        with patch("back.live.connection") as conn:
+            conn.vendor, conn.in_atomic_block = "sqlite", False
+            live.wait(self.user.pk, live.version(self.user.pk), timeout=0.01)
+            conn.close.assert_called_once()
+            conn.reset_mock()
+            conn.in_atomic_block = True     # never close under an open transaction
+            live.wait(self.user.pk, live.version(self.user.pk), timeout=0.01)
+            conn.close.assert_not_called()
+
+    def test_returns_new_message_and_conversation_at_once(self):
+        first = Message.objects.create(conversation=self.conv, sender="customer", text="1")
+        since = InboxEntry.objects.get(conversation=self.conv).sort_at
+        second = Message.objects.create(conversation=self.conv, sender="customer", text="2")
+        data = self.client.get(reverse("back:live_updates"), {
+            "cid": self.conv.id, "last_id": first.id, "since": since.isoformat(),
+        }).json()
+        self.assertEqual([m["id"] for m in data["messages"]], [second.id])
+        self.assertEqual([c["id"] for c in data["conversations"]], [self.conv.id])
+        self.assertEqual(data["conversations"][0]["unread_count"], 2)
+
+    def test_times_out_empty_without_changes(self):
+        from unittest.mock import patch
+
+        msg = Message.objects.create(conversation=self.conv, sender="customer", text="1")
+        with patch("back.live.WAIT_SECONDS", 0.05):
+            data = self.client.get(reverse("back:live_updates"), {"cid": self.conv.id, "last_id": msg.id}).json()
+        self.assertEqual((data["messages"], data["conversations"]), ([], []))
+        self.assertTrue(data["since"])
+
+    def test_row_committed_behind_the_cursor_is_still_sent(self):
+        from unittest.mock import patch
+
+        Message.objects.create(conversation=self.conv, sender="customer", text="1")
+        entry = InboxEntry.objects.get(conversation=self.conv)
+        cursor = entry.sort_at + timedelta(seconds=1)   # a poll already moved past it
+        with patch("back.live.WAIT_SECONDS", 0.05):
+            data = self.client.get(reverse("back:live_updates"), {"since": cursor.isoformat()}).json()
+        self.assertEqual([c["id"] for c in data["conversations"]], [self.conv.id])
+        self.assertEqual(data["since"], cursor.isoformat())
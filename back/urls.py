@@ -46,6 +46,7 @@ urlpatterns = [
     
     path("chats/ajax_messages", views.ajax_load_messages, name="ajax_load_messages"),
     path("chats/ajax_conversations", views.ajax_load_conversations, name="ajax_load_conversations"),
+    path("chats/live", views.live_updates, name="live_updates"),
 
     path("stats", views.stats, name="stats"),
     path("options", views.settingss, name="options"),
@@ -4,14 +4,14 @@ from django.core.files.storage import default_storage
 from django.contrib.auth.decorators import login_required, user_passes_test
 
 from django.db.models import Sum, Count, Q, Avg
-from .models import Product, Conversation, Sale, Message, Integration, Package, PackageItem, ProductSource, SupportTicket
+from .models import Product, Conversation, Sale, Message, MessagePayload, Integration, Package, PackageItem, ProductSource, SupportTicket
 from django.views.decorators.http import require_GET
 # Create your views here.
 from django.db.models.functions import TruncDay
 
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-import json, csv, requests
+import json, requests
 from django.core.files.base import ContentFile
 from django.shortcuts import get_object_or_404
 from django.http import JsonResponse, HttpResponseBadRequest, HttpResponseForbidden
@@ -21,7 +21,6 @@ from datetime import timedelta
 from django.contrib import messages
 from django.core.paginator import Paginator
 from django.utils.dateparse import parse_datetime
-from django.db.models.functions import Coalesce
 
 @login_required
 def dashboard(request):
@@ -424,6 +423,62 @@ def bot_preview(request):
 
 
 
+def _message_rows(messages):
+    """JSON rows for the chat window (ajax_load_messages, live_updates)."""
+    # Pipeline traces live in the payload side table — one query, bot rows only.
+    payloads = dict(
+        MessagePayload.objects.filter(message_id__in=[m.id for m in messages if m.sender == "bot"])
+        .values_list("message_id", "data")
+    )
+
+    messages_data = []
+    for msg in messages:
+        local_msg_time = timezone.localtime(msg.timestamp) if msg.timestamp else None
+
+        attachment = None
+        if msg.attachments:
+            if isinstance(msg.attachments, dict):
+                att = msg.attachments
+                att_type = att.get("type")
+                if not att_type:
+                    if att.get("cards"):
+                        att_type = "product_cards" if len(att["cards"]) > 1 else "product_card"
+                    elif att.get("images"):
+                        att_type = "image"
+                attachment = {
+                    "type": att_type,
+                    "images": att.get("images"),
+                    "cards": att.get("cards"),
+                    "url": (
+                        att["payload"].get("url") if isinstance(att.get("payload"), dict) else None
+                        or (att.get("images") or [None])[0]
+                        or att.get("url")
+                    ),
+                    "payload": att.get("payload") if isinstance(att.get("payload"), dict) else None,
+                }
+            elif isinstance(msg.attachments, str):
+                attachment = {"type": "image", "url": msg.attachments}
+
+        # Extract pipeline trace from raw_payload (bot messages only)
+        trace = None
+        raw = payloads.get(msg.id)
+        if raw and isinstance(raw, dict):
+            trace = {
+                "intent": raw.get("intent"),
+                "tool_calls": raw.get("tool_calls", []),
+            }
+
+        messages_data.append({
+            "id": msg.id,
+            "sender": msg.sender,
+            "text": msg.text,
+            "timestamp": local_msg_time.strftime("%d %b, %Y %H:%M") if local_msg_time else "",
+            "attachment": attachment,
+            "trace": trace,
+        })
+    return messages_data
+
+
 @login_required
 @require_GET
 def ajax_load_messages(request):
@@ -465,60 +520,19 @@ def ajax_load_messages(request):
     # Messages query
     # ==========================
 
-    qs = Message.objects.filter(conversation=convo).defer("raw_payload")
+    qs = Message.objects.filter(conversation=convo)
 
     if last_msg_id:
-        qs = qs.filter(id__gt=last_msg_id).order_by("id")
+        qs = list(qs.filter(id__gt=last_msg_id).order_by("id"))
     else:
         qs = qs.order_by("-id")[:50]
         qs = list(qs)
         qs.reverse()
+        # Opening the thread reads it.
+        from .inbox import mark_read
+        mark_read(convo.id)
 
-    messages_data = []
-
-    for msg in qs:
-        local_msg_time = timezone.localtime(msg.timestamp) if msg.timestamp else None
-
-        attachment = None
-        if msg.attachments:
-            if isinstance(msg.attachments, dict):
-                att = msg.attachments
-                att_type = att.get("type")
-                if not att_type:
-                    if att.get("cards"):
-                        att_type = "product_cards" if len(att["cards"]) > 1 else "product_card"
-                    elif att.get("images"):
-                        att_type = "image"
-                attachment = {
-                    "type": att_type,
-                    "images": att.get("images"),
-                    "cards": att.get("cards"),
-                    "url": (
-                        att["payload"].get("url") if isinstance(att.get("payload"), dict) else None
-                        or (att.get("images") or [None])[0]
-                        or att.get("url")
-                    ),
-                    "payload": att.get("payload") if isinstance(att.get("payload"), dict) else None,
-                }
-            elif isinstance(msg.attachments, str):
-                attachment = {"type": "image", "url": msg.attachments}
-
-        # Extract pipeline trace from raw_payload (bot messages only)
-        trace = None
-        if msg.sender == "bot" and msg.raw_payload and isinstance(msg.raw_payload, dict):
-            trace = {
-                "intent": msg.raw_payload.get("intent"),
-                "tool_calls": msg.raw_payload.get("tool_calls", []),
-            }
-
-        messages_data.append({
-            "id": msg.id,
-            "sender": msg.sender,
-            "text": msg.text,
-            "timestamp": local_msg_time.strftime("%d %b, %Y %H:%M") if local_msg_time else "",
-            "attachment": attachment,
-            "trace": trace,
-        })
+    messages_data = _message_rows(qs)
 
     # ==========================
     # Final response
@@ -529,62 +543,101 @@ def ajax_load_messages(request):
         "messages": messages_data,
     })
 
-@login_required
-def ajax_load_conversations(request):
-    platform = request.GET.get("platform", "all")
-    q = request.GET.get("q", "").strip()
-
-    convos = Conversation.objects.filter(user=request.user).only(
-        "id", "customer_name", "customer_id", "platform", "message_text",
-        "updated_at", "timestamp", "profile_image",
-    )
-    
-    if platform != "all":
-        convos = convos.filter(platform=platform)
-
-    if q:
-        convos = convos.filter(
-            Q(customer_name__icontains=q) |
-            Q(customer_id__icontains=q)
-        )
-    
-    # convos = convos.order_by("-updated_at")[:50]
-    
-    convos = convos.annotate(
-        sort_time=Coalesce("updated_at", "timestamp")
-    ).order_by("-sort_time")[:50]
-
-
-
-
+def _inbox_rows(entries):
+    """JSON rows for the chat list (ajax_load_conversations, live_updates)."""
     data = []
-
-    for c in convos:
-
-         # ✅ convert to local timezone
-        local_time = timezone.localtime(c.updated_at) if c.updated_at else None
-        
-        # print(local_time)
+    for e in entries:
+        c = e.conversation
+        local_time = timezone.localtime(e.sort_at)
         data.append({
-
-            # "image": msg.attachments.get("payload", {}).get("url") if msg.attachments else None
             "profile_image": (c.profile_image.url if c.profile_image and hasattr(c.profile_image, "url")
                 else None
             ),
-            "id": c.id,
+            "id": e.conversation_id,
             "customer_name": c.customer_name,
             "customer_id": c.customer_id,
-            "platform": c.platform,
-            "last_message": c.message_text  or "New message",
+            "platform": e.platform,
+            "last_message": e.preview or "New message",
+            "last_sender": e.last_sender,
+            "unread_count": e.unread_count,
             # send formatted local time
-            "updated_at": local_time.strftime("%H:%M") if local_time else "",
-            # send Unformatted Global time
+            "updated_at": local_time.strftime("%H:%M"),
             # raw time for sorting
-            "updated_at_raw": timezone.localtime(c.sort_time).isoformat(),
+            "updated_at_raw": local_time.isoformat(),
         })
+    return data
 
 
-    return JsonResponse({"conversations": data})
+@login_required
+def ajax_load_conversations(request):
+    """Chat list for the dashboard, read from the inbox projection (back/inbox.py).
+
+    ``cursor`` (from the previous page's ``next_cursor``) pages further back;
+    polls without it re-read the newest page only.
+    """
+    from .inbox import page
+
+    entries, next_cursor = page(
+        request.user,
+        platform=request.GET.get("platform", "all"),
+        q=request.GET.get("q", "").strip(),
+        cursor=request.GET.get("cursor"),
+        limit=request.GET.get("limit") or None,
+    )
+
+    return JsonResponse({"conversations": _inbox_rows(entries), "next_cursor": next_cursor})
+
+
+@login_required
+@require_GET
+def live_updates(request):
+    """Long-poll behind the message dashboard (see back/live.py).
+
+    Answers as soon as the open conversation ``cid`` has messages after
+    ``last_id`` or inbox rows changed after ``since``, else after
+    live.WAIT_SECONDS. Rows up to live.OVERLAP_SECONDS behind ``since`` are
+    included either way. ``since`` in the answer is the cursor for the next
+    call.
+    """
+    import time
+
+    from . import live
+    from .inbox import changed_since, latest_sort_at
+
+    user = request.user
+    convo = None
+    if request.GET.get("cid"):
+        convo = get_object_or_404(Conversation, id=request.GET["cid"], user=user)
+    try:
+        last_id = int(request.GET.get("last_id") or 0)
+    except ValueError:
+        last_id = 0
+    platform = request.GET.get("platform", "all")
+    q = request.GET.get("q", "").strip()
+    since = parse_datetime(request.GET.get("since") or "")
+    if since:
+        # Rows committed late with a sort_at behind the cursor are re-sent too.
+        overlap = since - timedelta(seconds=live.OVERLAP_SECONDS)
+    else:
+        since = overlap = latest_sort_at(user) or timezone.now()
+
+    deadline = time.monotonic() + live.WAIT_SECONDS
+    seen = live.version(user.pk)
+    while True:
+        messages = list(Message.objects.filter(conversation=convo, id__gt=last_id).order_by("id")[:100]) if convo else []
+        entries = changed_since(user, overlap, platform=platform, q=q)
+        remaining = deadline - time.monotonic()
+        if messages or (entries and entries[0].sort_at > since) or remaining <= 0:
+            break
+        seen = live.wait(user.pk, seen, remaining)
+
+    if entries:
+        since = max(since, entries[0].sort_at)
+    return JsonResponse({
+        "messages": _message_rows(messages),
+        "conversations": _inbox_rows(entries),
+        "since": since.isoformat(),
+    })
 
 
 @login_required
@@ -1344,7 +1397,12 @@ def _apply_source_credentials(src, request):
 
 @login_required
 def product_sources(request):
-    sources = ProductSource.objects.filter(user=request.user).order_by("-is_active", "-created_at")
+    from api.products.providers.cached import stats as provider_cache_stats
+
+    sources = list(ProductSource.objects.filter(user=request.user).order_by("-is_active", "-created_at"))
+    for s in sources:
+        if s.reads_live:
+            s.cache_stats = provider_cache_stats(s.pk)
     context = {
         "user": request.user,
         "sources": sources,
@@ -1464,6 +1522,8 @@ def sync_product_source(request, sid):
         "success": True,
         "created": result.get("created", 0),
         "updated": result.get("updated", 0),
+        "unchanged": result.get("unchanged", 0),
+        "disabled": result.get("disabled", 0),
         "errors": result.get("errors", 0),
     })
 
@@ -1471,34 +1531,10 @@ def sync_product_source(request, sid):
 # Export Products as CSV
 @login_required
 def export_products(request):
-    # Fetch products for current user
-    products = Product.objects.filter(user=request.user)
+    from .product_csv import export_rows
 
-    # Prepare CSV file
-    response = HttpResponse(content_type="text/csv")
+    response = StreamingHttpResponse(export_rows(request.user), content_type="text/csv")
     response["Content-Disposition"] = 'attachment; filename="products_export.csv"'
-
-    writer = csv.writer(response)
-
-    # CSV Header
-    writer.writerow([
-        "Name", "Description", "Price",
-        "Discounted Price", "Stock Quantity",
-        "Status", "Image URL"
-    ])
-
-    # CSV Rows
-    for p in products:
-        writer.writerow([
-            p.name,
-            p.description,
-            p.price,
-            p.discounted_price or "",
-            p.stock_quantity,
-            "Active" if p.status else "Inactive",
-            p.image.url if p.image and hasattr(p.image, "url") else "",
-        ])
-
     return response
 
 
@@ -1507,58 +1543,21 @@ def export_products(request):
 @login_required
 def import_products(request):
     if request.method == "POST":
+        from .product_csv import import_products_csv
+
         file = request.FILES.get("file")
 
         if not file:
             messages.error(request, "Please upload a CSV file.")
-            return redirect("import_products")
-
-        try:
-            decoded_file = file.read().decode("utf-8").splitlines()
-            reader = csv.DictReader(decoded_file)
-        except:
-            messages.error(request, "Invalid CSV format.")
-            return redirect("import_products")
-
-        imported = 0
-        skipped = 0
-
-        for row in reader:
-            name = row.get("name")
-            if not name:
-                skipped += 1
-                continue
-
-            # Prevent duplicate product names for the same user
-            if Product.objects.filter(user=request.user, name=name).exists():
-                skipped += 1
-                continue
-
-            product = Product(
-                user=request.user,
-                name=name,
-                description=row.get("description") or "",
-                price=row.get("price") or 0,
-                discounted_price=row.get("discounted_price") or None,
-                stock_quantity=int(row.get("stock_quantity") or 0),
-                status=row.get("status", "").lower() == "true",
-            )
-
-            # Handle image downloading from URL
-            image_url = row.get("image")
-            if image_url:
-                try:
-                    r = requests.get(image_url)
-                    if r.status_code == 200:
-                        file_name = image_url.split("/")[-1]
-                        product.image.save(file_name, ContentFile(r.content), save=False)
-                except:
-                    pass
-
-            product.save()
-            imported += 1
-
-        messages.success(request, f"Imported: {imported}, Skipped: {skipped}")
+            return redirect("back:import_products")
+
+        result = import_products_csv(request.user, file)
+        for err in result["errors"]:
+            messages.warning(request, err)
+        messages.success(
+            request,
+            f"Imported: {result['created']}, Updated: {result['updated']}, Skipped: {result['skipped']}",
+        )
         return redirect("back:products")
 
     return render(request, "back/import_products.html")
@@ -1769,6 +1768,13 @@ def billing_dashboard(request):
         tokens_in=Sum('total_input_tokens'),
         tokens_out=Sum('total_output_tokens'),
         credits=Sum('total_credits_used'),
+        cache_lookups=Sum('cache_lookups'),
+        cache_hits=Sum('cache_hits'),
+        credits_saved=Sum('credits_saved'),
+    )
+    cache_hit_rate = (
+        month_totals['cache_hits'] * 100.0 / month_totals['cache_lookups']
+        if month_totals['cache_lookups'] else 0.0
     )
 
     recent_txns = list(CreditTransaction.objects.filter(user=user)[:15])
@@ -1781,6 +1787,7 @@ def billing_dashboard(request):
         'recent_txns': recent_txns,
         'plans': plans,
         'month_totals': month_totals,
+        'cache_hit_rate': cache_hit_rate,
     })
 
 
@@ -1792,7 +1799,7 @@ def ai_debug(request):
     from context.models import AgentIdentity, StoreConfig, BehaviorRules
     from api.ai.context import build_system_prompt, get_conversation_history
     from api.ai.tools import TOOL_DEFINITIONS, execute_tool
-    from api.ai.providers import call_llm
+    from api.ai.providers import call_llm, llm_metrics_snapshot
     from back.models import ToolCallLog, UsageLog
     from billing.models import CreditTransaction
     from collections import defaultdict
@@ -2064,6 +2071,7 @@ def ai_debug(request):
         'tool_filter': tool_filter,
         'reply_filter': reply_filter,
         'error_only': error_only,
+        'llm_metrics': sorted(llm_metrics_snapshot().items()),
     }
     
     return render(request, 'back/ai_debug.html', context)
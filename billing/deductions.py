@@ -121,6 +121,47 @@ def deduct_for_reply(user, reply_id, count_as_reply=True):
         logger.exception("deduct_for_reply failed user=%s reply_id=%s", user.pk, reply_id)
 
 
+def reply_cost(user, reply_id):
+    """Credit cost of a reply's UsageLog rows, at the ledger's precision."""
+    from back.models import UsageLog
+    from .models import ModelPricing
+
+    total_cost = Decimal("0")
+    pricing_cache = {}
+    for log in UsageLog.objects.filter(user=user, reply_id=reply_id):
+        if log.model not in pricing_cache:
+            pricing_cache[log.model] = (
+                ModelPricing.objects.filter(model_id=log.model, is_active=True).first()
+            )
+        pricing = pricing_cache[log.model]
+        if pricing:
+            total_cost += pricing.cost_for(log.input_tokens, log.output_tokens)
+    return total_cost.quantize(Decimal("0.0001"))
+
+
+def record_response_cache(user, hit, credits_saved=0):
+    """Count a response-cache lookup on today's UsageSummary.
+
+    A hit is a delivered reply that cost no LLM calls: it counts as a reply
+    and adds the original reply's cost to ``credits_saved``.
+    """
+    from .models import UsageSummary
+
+    try:
+        today = timezone.now().date()
+        summary, _ = UsageSummary.objects.get_or_create(user=user, date=today)
+        updates = {"cache_lookups": F("cache_lookups") + 1}
+        if hit:
+            updates.update(
+                cache_hits=F("cache_hits") + 1,
+                total_replies=F("total_replies") + 1,
+                credits_saved=F("credits_saved") + Decimal(str(credits_saved or 0)).quantize(Decimal("0.0001")),
+            )
+        UsageSummary.objects.filter(pk=summary.pk).update(**updates)
+    except Exception:
+        logger.exception("record_response_cache failed user=%s", user.pk)
+
+
 def top_up(user, amount, note=""):
     """Add credits to a user's balance (admin top-up or manual adjustment)."""
     from .models import CreditTransaction, UserBalance
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='usagesummary',
+            name='cache_hits',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='usagesummary',
+            name='cache_lookups',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='usagesummary',
+            name='credits_saved',
+            field=models.DecimalField(decimal_places=4, default=0, max_digits=12),
+        ),
+    ]
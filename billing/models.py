@@ -114,6 +114,10 @@ class UsageSummary(models.Model):
     total_input_tokens = models.IntegerField(default=0)
     total_output_tokens = models.IntegerField(default=0)
     total_credits_used = models.DecimalField(max_digits=12, decimal_places=4, default=0)
+    # Semantic response cache (api/ai/response_cache.py)
+    cache_lookups = models.IntegerField(default=0)
+    cache_hits = models.IntegerField(default=0)
+    credits_saved = models.DecimalField(max_digits=12, decimal_places=4, default=0)
 
     class Meta:
         unique_together = [("user", "date")]
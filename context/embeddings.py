@@ -1,20 +1,287 @@
+"""
+Embedding calls for RAG chunks and queries.
+
+Two things keep query embeddings cheap:
+
+  * a content-hash keyed cache — the same FAQ phrasing is embedded once, then
+    served from memory (bounded by EMBEDDING_CACHE_MAX_BYTES, LRU) and, when
+    EMBEDDING_CACHE_DIR is set, from an on-disk tier shared by every process
+    on the host (bounded by EMBEDDING_DISK_CACHE_MAX_BYTES: files read least
+    recently, by mtime, are pruned in the background);
+  * a micro-batcher — concurrent ``generate_embedding`` calls arriving within
+    EMBEDDING_BATCH_WINDOW_MS of each other (executor threads, job workers)
+    are merged into one ``embeddings.create(input=[...])`` request.
+"""
+import hashlib
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
 
-from openai import OpenAI
+import numpy as np
+from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
-OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
 EMBEDDING_MODEL = "text-embedding-3-small"
 
+CACHE_MAX_BYTES = 64 * 1024 * 1024
+DISK_MAX_BYTES = 1024 * 1024 * 1024
+DISK_PRUNE_EVERY = 0.05     # share of DISK_MAX_BYTES a process writes between prunes
+DISK_PRUNE_TO = 0.9         # a prune trims the directory to this share of the cap
+BATCH_WINDOW_MS = 10
+BATCH_MAX_INPUTS = 64
+BATCH_RESULT_TIMEOUT = 60
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
 
 def _client():
-    return OpenAI(
-        base_url=OPENROUTER_BASE_URL,
-        api_key=os.environ.get("OPENROUTER_API_KEY", ""),
-    )
+    # Shared, pooled OpenRouter client (keep-alive; one per process).
+    from api.ai.providers import get_client
+    return get_client()
+
+
+def _timer():
+    from api.ai.providers import CallTimer
+    return CallTimer(EMBEDDING_MODEL, kind="embedding")
+
+
+def _embed_many(texts):
+    """One embeddings API request for ``texts`` (already stripped)."""
+    with _timer():
+        response = _client().embeddings.create(
+            model=EMBEDDING_MODEL,
+            input=texts if len(texts) > 1 else texts[0],
+        )
+    return [d.embedding for d in response.data]
+
+
+# ---------------------------------------------------------------------------
+# Content-hash cache (memory LRU + optional disk tier)
+# ---------------------------------------------------------------------------
+
+class EmbeddingCache:
+    """float32 vectors keyed by sha1(model, text), LRU-bounded by bytes."""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, disk_dir="", disk_max_bytes=DISK_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self._items: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._bytes = 0
+        self._disk_written = 0      # bytes this process wrote since its last prune
+        self._pruning = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text):
+        return hashlib.sha1(f"{EMBEDDING_MODEL}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, text):
+        key = self.key(text)
+        with self._lock:
+            vec = self._items.get(key)
+            if vec is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return vec
+        vec = self._disk_get(key)
+        with self._lock:
+            if vec is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        self._remember(key, vec)
+        return vec
+
+    def put(self, text, embedding):
+        vec = np.asarray(embedding, dtype=np.float32)
+        key = self.key(text)
+        self._remember(key, vec)
+        self._disk_put(key, vec)
+        return vec
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def _remember(self, key, vec):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._items[key] = vec
+            self._bytes += vec.nbytes
+            while self._bytes > self.max_bytes and self._items:
+                _, evicted = self._items.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.f32")
+
+    def _disk_get(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            vec = np.fromfile(path, dtype=np.float32)
+        except (OSError, ValueError):
+            return None
+        try:
+            os.utime(path)      # mtime is the recency the pruner goes by
+        except OSError:
+            pass
+        return vec
+
+    def _disk_put(self, key, vec):
+        if not self.disk_dir:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            vec.tofile(tmp)
+            os.replace(tmp, path)  # atomic: readers never see a partial file
+        except OSError as exc:
+            logger.warning("Embedding disk cache write failed: %s", exc)
+            return
+        with self._lock:
+            self._disk_written += vec.nbytes
+            due = not self._pruning and self._disk_written >= self.disk_max_bytes * DISK_PRUNE_EVERY
+            if due:
+                self._disk_written = 0
+                self._pruning = True
+        if due:
+            threading.Thread(target=self._disk_prune, name="embedding-cache-prune", daemon=True).start()
+
+    def _disk_prune(self):
+        """Delete the least recently read files until the directory is back
+        under DISK_PRUNE_TO of ``disk_max_bytes``. Processes sharing the
+        directory may prune it at the same time; vanished files are skipped."""
+        try:
+            files, total = [], 0
+            for bucket in os.scandir(self.disk_dir):
+                if not bucket.is_dir():
+                    continue
+                for entry in os.scandir(bucket.path):
+                    if not entry.name.endswith(".f32"):
+                        continue        # a write in progress
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    files.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+            if total <= self.disk_max_bytes:
+                return
+            files.sort()
+            removed, target = 0, self.disk_max_bytes * DISK_PRUNE_TO
+            for _, size, path in files:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    continue
+                total -= size
+            logger.info("Embedding disk cache pruned %d file(s), %d bytes left", removed, total)
+        except OSError as exc:
+            logger.warning("Embedding disk cache prune failed: %s", exc)
+        finally:
+            with self._lock:
+                self._pruning = False
+
 
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache(
+                max_bytes=_setting("EMBEDDING_CACHE_MAX_BYTES", CACHE_MAX_BYTES),
+                disk_dir=_setting("EMBEDDING_CACHE_DIR", ""),
+                disk_max_bytes=_setting("EMBEDDING_DISK_CACHE_MAX_BYTES", DISK_MAX_BYTES),
+            )
+        return _cache
+
+
+# ---------------------------------------------------------------------------
+# Micro-batcher
+# ---------------------------------------------------------------------------
+
+class EmbeddingBatcher:
+    """Merges concurrent single-text requests into one API call.
+
+    The first caller to find the queue empty becomes the batch leader: it
+    waits ``window`` seconds for company, then sends everything queued in
+    one request (split at ``max_inputs``) and hands each caller its vector.
+    """
+
+    def __init__(self, window=BATCH_WINDOW_MS / 1000, max_inputs=BATCH_MAX_INPUTS):
+        self.window = window
+        self.max_inputs = max_inputs
+        self._pending: list[tuple[str, Future]] = []
+        self._lock = threading.Lock()
+
+    def submit(self, text):
+        fut = Future()
+        with self._lock:
+            self._pending.append((text, fut))
+            leader = len(self._pending) == 1
+        if leader:
+            if self.window > 0:
+                time.sleep(self.window)
+            with self._lock:
+                batch, self._pending = self._pending, []
+            for start in range(0, len(batch), self.max_inputs):
+                self._run(batch[start:start + self.max_inputs])
+        return fut.result(timeout=BATCH_RESULT_TIMEOUT)
+
+    @staticmethod
+    def _run(batch):
+        unique = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vectors = dict(zip(unique, _embed_many(unique)))
+        except Exception as exc:
+            for _, fut in batch:
+                fut.set_exception(exc)
+            return
+        if len(unique) > 1:
+            logger.debug("Embedding batch merged %d requests (%d unique)", len(batch), len(unique))
+        for text, fut in batch:
+            fut.set_result(vectors.get(text) or [])
+
+
+_batcher = None
+
+
+def get_batcher():
+    global _batcher
+    with _cache_lock:
+        if _batcher is None:
+            _batcher = EmbeddingBatcher(
+                window=_setting("EMBEDDING_BATCH_WINDOW_MS", BATCH_WINDOW_MS) / 1000,
+            )
+        return _batcher
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
 
 def generate_embedding(text):
     """Generate a vector embedding for a single text string.
@@ -23,21 +290,28 @@ def generate_embedding(text):
     """
     if not text or not text.strip():
         return []
+    text = text.strip()
+
+    cache = get_cache()
+    cached = cache.get(text)
+    if cached is not None:
+        return cached.tolist()
 
     try:
-        response = _client().embeddings.create(
-            model=EMBEDDING_MODEL,
-            input=text.strip(),
-        )
-        return response.data[0].embedding
+        embedding = get_batcher().submit(text)
     except Exception:
         logger.exception("Embedding generation failed")
         return []
+    if embedding:
+        cache.put(text, embedding)
+    return list(embedding)
 
 
 def generate_embeddings_batch(texts):
     """Generate embeddings for a list of texts in a single API call.
 
+    Texts already in the embedding cache are not sent again.
+
     Returns a list of (text, embedding) tuples. Failed embeddings return empty list.
     """
     if not texts:
@@ -47,16 +321,23 @@ def generate_embeddings_batch(texts):
     if not valid:
         return []
 
+    cache = get_cache()
+    known = {}
+    for _, t in valid:
+        if t not in known:
+            vec = cache.get(t)
+            if vec is not None:
+                known[t] = vec.tolist()
+
     try:
-        inputs = [t for _, t in valid]
-        response = _client().embeddings.create(
-            model=EMBEDDING_MODEL,
-            input=inputs,
-        )
-        embeddings = [d.embedding for d in response.data]
+        inputs = list(dict.fromkeys(t for _, t in valid if t not in known))
+        if inputs:
+            for text, emb in zip(inputs, _embed_many(inputs)):
+                cache.put(text, emb)
+                known[text] = emb
         results = [None] * len(texts)
-        for (idx, text), emb in zip(valid, embeddings):
-            results[idx] = (text, emb)
+        for idx, text in valid:
+            results[idx] = (text, known.get(text, []))
         return results
     except Exception:
         logger.exception("Batch embedding generation failed")
@@ -0,0 +1,212 @@
+"""
+In-memory vector index over each tenant's active RAG chunks.
+
+``search_chunks`` used to load every active RAGChunk row, decode its JSON
+embedding and score it with a pure-Python cosine loop on every query. The
+index instead keeps, per tenant and per process, one float32 matrix of
+L2-normalized embeddings, so a query is a single matrix-vector product plus
+``argpartition`` for the top-k.
+
+Freshness: each index remembers a cheap DB fingerprint (row count + latest
+``updated_at`` of the active chunks). A query re-checks it, and on change the
+index is updated incrementally — rows that went inactive are dropped, only
+new rows are loaded. ``_build_rag_chunks`` refreshes the tenant right after
+writing so the first query after a knowledge-base edit doesn't pay for it.
+
+Memory: the registry is an LRU over tenants bounded by RAG_INDEX_MAX_BYTES
+(embedding matrices + chunk text); an evicted tenant is rebuilt on its next
+query.
+"""
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .models import RAG_SOURCE_CHOICES, RAGChunk, decode_vector
+
+logger = logging.getLogger(__name__)
+
+_SOURCE_LABELS = dict(RAG_SOURCE_CHOICES)
+
+MAX_BYTES = 256 * 1024 * 1024
+
+
+class TenantIndex:
+    """Normalized embedding matrix + row metadata for one tenant."""
+
+    def __init__(self):
+        self.ids = np.empty(0, dtype=np.int64)
+        self.matrix = np.empty((0, 0), dtype=np.float32)
+        self.meta = []          # [(content, source_label, chunk_index)] aligned with ids
+        self.fingerprint = None
+        self.nbytes = 0         # approximate footprint, counted against MAX_BYTES
+
+    def __len__(self):
+        return len(self.ids)
+
+    def apply(self, keep_ids, rows):
+        """Keep the rows whose id is in ``keep_ids`` and append ``rows``
+        ((id, content, source, chunk_index, vector) tuples; the vector as
+        stored float32 bytes or a list of floats)."""
+        keep = np.isin(self.ids, np.fromiter(keep_ids, dtype=np.int64, count=len(keep_ids)))
+        ids = self.ids[keep]
+        matrix = self.matrix[keep] if len(self.matrix) else self.matrix
+        meta = [m for m, k in zip(self.meta, keep) if k]
+
+        new_ids, new_vecs = [], []
+        for pk, content, source, chunk_index, embedding in rows:
+            vec = to_vector(embedding)
+            if vec is None:
+                continue
+            new_ids.append(pk)
+            new_vecs.append(vec)
+            meta.append((content, _SOURCE_LABELS.get(source, source), chunk_index))
+
+        if new_vecs:
+            block = normalize_rows(np.vstack(new_vecs))
+            if len(matrix) and matrix.shape[1] != block.shape[1]:
+                # Embedding model changed dimension — the old rows are unusable.
+                logger.warning("RAG index dimension change %d -> %d; dropping %d old rows",
+                               matrix.shape[1], block.shape[1], len(matrix))
+                ids, matrix, meta = ids[:0], matrix[:0], meta[len(meta) - len(new_vecs):]
+            matrix = np.vstack([matrix, block]) if len(matrix) else block
+            ids = np.concatenate([ids, np.asarray(new_ids, dtype=np.int64)])
+        self.ids, self.matrix, self.meta = ids, matrix, meta
+        self.nbytes = ids.nbytes + matrix.nbytes + sum(len(m[0] or "") for m in meta)
+
+    def top_k(self, query_vec, k, min_score=0.0):
+        """[(score, (content, source_label, chunk_index))], best first."""
+        if not len(self.ids) or k <= 0:
+            return []
+        q = to_vector(query_vec)
+        if q is None or q.shape[0] != self.matrix.shape[1]:
+            return []
+        norm = np.linalg.norm(q)
+        if not norm:
+            return []
+        scores = self.matrix @ (q / norm)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k] if k < len(scores) else np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [
+            (float(scores[i]), self.meta[i])
+            for i in top
+            if scores[i] >= min_score
+        ]
+
+
+def to_vector(embedding):
+    """float32 vector from a stored embedding, or None when unusable.
+    Stored bytes are viewed in place (RAGChunk.vector), not copied."""
+    if embedding is None or len(embedding) == 0:
+        return None
+    if isinstance(embedding, (bytes, bytearray, memoryview)):
+        return decode_vector(embedding)
+    return np.asarray(embedding, dtype=np.float32)
+
+
+def normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+# ---------------------------------------------------------------------------
+# Per-process registry
+# ---------------------------------------------------------------------------
+
+_indexes: OrderedDict[int, TenantIndex] = OrderedDict()     # least recently used first
+_locks: dict[int, threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+
+def _tenant_lock(user_id):
+    with _registry_lock:
+        return _locks.setdefault(user_id, threading.Lock())
+
+
+def _touch(user_id):
+    with _registry_lock:
+        if user_id in _indexes:
+            _indexes.move_to_end(user_id)
+
+
+def _store(user_id, index):
+    """Register ``index`` as the newest and evict least recently used
+    tenants while the total is over budget (the newest always stays)."""
+    budget = getattr(settings, "RAG_INDEX_MAX_BYTES", MAX_BYTES)
+    with _registry_lock:
+        _indexes[user_id] = index
+        _indexes.move_to_end(user_id)
+        total = sum(i.nbytes for i in _indexes.values())
+        while total > budget and len(_indexes) > 1:
+            evicted_id, evicted = _indexes.popitem(last=False)
+            total -= evicted.nbytes
+            logger.debug("RAG index user=%s evicted (%d bytes)", evicted_id, evicted.nbytes)
+
+
+def _fingerprint(user_id):
+    agg = RAGChunk.objects.filter(user_id=user_id, is_active=True).aggregate(
+        n=Count("id"), last=Max("updated_at"),
+    )
+    return (agg["n"], agg["last"])
+
+
+def get_index(user_id):
+    """Up-to-date TenantIndex for ``user_id`` (built or patched as needed)."""
+    fingerprint = _fingerprint(user_id)
+    index = _indexes.get(user_id)
+    if index is not None and index.fingerprint == fingerprint:
+        _touch(user_id)
+        return index
+    with _tenant_lock(user_id):
+        index = _indexes.get(user_id)
+        if index is not None and index.fingerprint == fingerprint:
+            return index
+        index = refresh(user_id, index, fingerprint)
+    return index
+
+
+def refresh(user_id, index=None, fingerprint=None):
+    """Bring the tenant's index in line with the active chunks in the DB."""
+    if index is None:
+        index = _indexes.get(user_id) or TenantIndex()
+    if fingerprint is None:
+        fingerprint = _fingerprint(user_id)
+    active = RAGChunk.objects.filter(user_id=user_id, is_active=True)
+    active_ids = set(active.values_list("id", flat=True))
+    known = set(index.ids.tolist())
+    # Rows edited in place since the last refresh are reloaded too.
+    edited = set()
+    if known and index.fingerprint and index.fingerprint[1] is not None:
+        edited = set(active.filter(
+            updated_at__gt=index.fingerprint[1], id__in=known,
+        ).values_list("id", flat=True))
+    load = (active_ids - known) | edited
+    fields = ("id", "content", "source", "chunk_index", "vector")
+    if not known:
+        rows = list(active.order_by("id").values_list(*fields))
+    elif load:
+        rows = list(active.filter(id__in=load).order_by("id").values_list(*fields))
+    else:
+        rows = []
+
+    patched = TenantIndex()
+    patched.ids, patched.matrix, patched.meta = index.ids, index.matrix, index.meta
+    patched.apply(active_ids - edited, rows)
+    patched.fingerprint = fingerprint
+    _store(user_id, patched)
+    logger.debug("RAG index user=%s rows=%d (+%d, -%d)",
+                 user_id, len(patched), len(rows), len(known - active_ids))
+    return patched
+
+
+def invalidate(user_id=None):
+    with _registry_lock:
+        if user_id is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(user_id, None)
@@ -0,0 +1,76 @@
+"""Management command: benchmark RAG chunk search.
+
+    python manage.py bench_rag_index
+    python manage.py bench_rag_index --sizes 100 1000 50000 --legacy-max 5000
+
+Compares the old per-row pure-Python cosine loop with the vectorized
+TenantIndex (context/index.py) on synthetic embeddings. No database or API
+calls — this isolates scoring cost from the embedding request.
+"""
+
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Benchmark RAG chunk scoring: pure-Python cosine loop vs vectorized index."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 50000])
+        parser.add_argument("--dim", type=int, default=1536)
+        parser.add_argument("--queries", type=int, default=20)
+        parser.add_argument("--top-k", type=int, default=3)
+        parser.add_argument(
+            "--legacy-max", type=int, default=10000,
+            help="Skip the pure-Python loop above this many chunks (it takes minutes).",
+        )
+
+    def handle(self, *args, **options):
+        import numpy as np
+
+        from context.index import TenantIndex
+        from context.search import cosine_similarity
+
+        dim, n_queries, k = options["dim"], options["queries"], options["top_k"]
+        rng = np.random.default_rng(7)
+        queries = rng.standard_normal((n_queries, dim), dtype=np.float32)
+
+        self.stdout.write(f"{'chunks':>8} {'build ms':>10} {'index ms/q':>11} {'legacy ms/q':>12} {'speedup':>8}")
+        for n in options["sizes"]:
+            vectors = rng.standard_normal((n, dim), dtype=np.float32)
+            rows = [(i, f"chunk {i}", "knowledge_base", i, vectors[i].tolist()) for i in range(n)]
+
+            t0 = time.perf_counter()
+            index = TenantIndex()
+            index.apply(set(), rows)
+            build_ms = (time.perf_counter() - t0) * 1000
+
+            query_lists = [q.tolist() for q in queries]
+            t0 = time.perf_counter()
+            for q in query_lists:
+                index.top_k(q, k)
+            index_ms = (time.perf_counter() - t0) * 1000 / n_queries
+
+            legacy = "-"
+            speedup = "-"
+            if n <= options["legacy_max"]:
+                embeddings = [r[4] for r in rows]
+                sample = query_lists[: max(1, min(n_queries, 3))]
+                t0 = time.perf_counter()
+                for q in sample:
+                    scored = sorted(
+                        ((cosine_similarity(q, e), i) for i, e in enumerate(embeddings)),
+                        key=lambda x: -x[0],
+                    )[:k]
+                legacy_ms = (time.perf_counter() - t0) * 1000 / len(sample)
+                legacy = f"{legacy_ms:.1f}"
+                speedup = f"{legacy_ms / index_ms:.0f}x" if index_ms else "-"
+                # Same winners as the loop (guards the vectorized path).
+                expected = [i for _, i in scored]
+                got = [meta[2] for _, meta in index.top_k(sample[-1], k)]
+                if expected != got:
+                    self.stderr.write(f"top-k mismatch at n={n}: {expected} vs {got}")
+
+            self.stdout.write(f"{n:>8} {build_ms:>10.1f} {index_ms:>11.3f} {legacy:>12} {speedup:>8}")
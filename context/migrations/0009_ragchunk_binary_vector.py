@@ -0,0 +1,57 @@
+# Generated by Django 5.1.6 on 2026-10-18 19:32
+
+import struct
+
+from django.db import migrations, models
+
+BATCH = 500
+
+
+def json_to_vector(apps, schema_editor):
+    RAGChunk = apps.get_model("context", "RAGChunk")
+    batch = []
+    for chunk in RAGChunk.objects.exclude(embedding=None).only("id", "embedding").iterator(chunk_size=BATCH):
+        values = chunk.embedding or []
+        if not values:
+            continue
+        chunk.vector = struct.pack(f"<{len(values)}f", *values)
+        batch.append(chunk)
+        if len(batch) >= BATCH:
+            RAGChunk.objects.bulk_update(batch, ["vector"])
+            batch = []
+    if batch:
+        RAGChunk.objects.bulk_update(batch, ["vector"])
+
+
+def vector_to_json(apps, schema_editor):
+    RAGChunk = apps.get_model("context", "RAGChunk")
+    batch = []
+    for chunk in RAGChunk.objects.exclude(vector=None).only("id", "vector").iterator(chunk_size=BATCH):
+        buf = bytes(chunk.vector or b"")
+        chunk.embedding = list(struct.unpack(f"<{len(buf) // 4}f", buf)) if buf else None
+        batch.append(chunk)
+        if len(batch) >= BATCH:
+            RAGChunk.objects.bulk_update(batch, ["embedding"])
+            batch = []
+    if batch:
+        RAGChunk.objects.bulk_update(batch, ["embedding"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('context', '0008_sessioncontext_pre_collected'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ragchunk',
+            name='vector',
+            field=models.BinaryField(blank=True, help_text='Vector embedding as little-endian float32 bytes', null=True),
+        ),
+        migrations.RunPython(json_to_vector, vector_to_json),
+        migrations.RemoveField(
+            model_name='ragchunk',
+            name='embedding',
+        ),
+    ]
@@ -1,3 +1,4 @@
+import numpy as np
 from django.db import models
 from django.contrib.auth.models import User
 
@@ -126,7 +127,10 @@ class BehaviorRules(models.Model):
 class RAGChunk(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="rag_chunks")
     content = models.TextField(help_text="The chunk text (e.g. a single Q&A pair)")
-    embedding = models.JSONField(null=True, blank=True, help_text="Vector embedding as a list of floats")
+    vector = models.BinaryField(
+        null=True, blank=True, editable=False,
+        help_text="Vector embedding as little-endian float32 bytes",
+    )
     source = models.CharField(max_length=50, choices=RAG_SOURCE_CHOICES, default="sample_qa")
     chunk_index = models.IntegerField(default=0)
     is_active = models.BooleanField(default=True)
@@ -144,6 +148,30 @@ class RAGChunk(models.Model):
     def __str__(self):
         return f"{self.get_source_display()} #{self.chunk_index} — {self.user.username}"
 
+    @property
+    def embedding(self):
+        """The embedding as a read-only float32 NumPy view over ``vector``
+        (no copy, no per-float boxing), or None."""
+        return decode_vector(self.vector)
+
+    @embedding.setter
+    def embedding(self, values):
+        self.vector = encode_vector(values)
+
+
+def encode_vector(values):
+    """float32 little-endian bytes for a list/array of floats (None if empty)."""
+    if values is None or len(values) == 0:
+        return None
+    return np.asarray(values, dtype="<f4").tobytes()
+
+
+def decode_vector(buf):
+    """Zero-copy float32 view over stored vector bytes, or None."""
+    if not buf:
+        return None
+    return np.frombuffer(buf, dtype="<f4")
+
 
 # -----------------------
 # MemoryEntry (P0-10) — Long-term user memory
@@ -1,13 +1,14 @@
 import logging
 
 from .embeddings import generate_embedding
-from .models import RAGChunk
+from .index import get_index
 
 logger = logging.getLogger(__name__)
 
 
 def cosine_similarity(a, b):
-    """Pure-Python cosine similarity between two vectors."""
+    """Pure-Python cosine similarity between two vectors (single pairs;
+    chunk search goes through the vectorized index in context/index.py)."""
     if not a or not b:
         return 0.0
     dot = sum(x * y for x, y in zip(a, b))
@@ -20,7 +21,8 @@ MAX_CHUNK_CHARS = 800
 
 
 def search_chunks(user, query, top_k=3, min_score=0.3):
-    """Search active RAG chunks for the user by cosine similarity.
+    """Search active RAG chunks for the user by cosine similarity
+    (one matrix-vector product over the tenant's in-memory index).
 
     Args:
         user: User instance.
@@ -39,31 +41,18 @@ def search_chunks(user, query, top_k=3, min_score=0.3):
     if not query_vec:
         return []
 
-    chunks = list(RAGChunk.objects.filter(user=user, is_active=True))
-
-    if not chunks:
-        return []
-
-    scored = []
-    for c in chunks:
-        if not c.embedding:
-            continue
-        score = cosine_similarity(query_vec, c.embedding)
-        if score >= min_score:
-            scored.append((score, c))
-
-    scored.sort(key=lambda x: -x[0])
+    index = get_index(user.pk)
+    scored = index.top_k(query_vec, top_k, min_score=min_score)
 
     results = []
-    for score, c in scored[:top_k]:
-        content = c.content
+    for score, (content, source_label, chunk_index) in scored:
         truncated = len(content) > MAX_CHUNK_CHARS
         if truncated:
             content = content[:MAX_CHUNK_CHARS] + "..."
         results.append({
             "content": content,
-            "source": c.get_source_display(),
-            "chunk_index": c.chunk_index,
+            "source": source_label,
+            "chunk_index": chunk_index,
             "score": round(score, 4),
             "truncated": truncated,
         })
@@ -2,7 +2,7 @@ import hashlib
 import logging
 import threading
 
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
 from .models import AgentIdentity, StoreConfig, BehaviorRules, RAGChunk
@@ -23,6 +23,24 @@ def create_context_defaults(sender, instance, created, **kwargs):
     BehaviorRules.objects.get_or_create(user=instance)
 
 
+@receiver(post_save, sender=AgentIdentity, dispatch_uid="response_cache_identity_saved")
+@receiver(post_save, sender=StoreConfig, dispatch_uid="response_cache_store_saved")
+@receiver(post_save, sender=BehaviorRules, dispatch_uid="response_cache_rules_saved")
+@receiver(post_delete, sender=RAGChunk, dispatch_uid="response_cache_chunk_deleted")
+def invalidate_response_cache(sender, instance, **kwargs):
+    """Cached replies were built from this tenant's old store context."""
+    from api.ai.response_cache import invalidate
+    invalidate(instance.user_id)
+
+
+@receiver(post_save, sender=AgentIdentity, dispatch_uid="tenant_settings_identity_saved")
+@receiver(post_save, sender=StoreConfig, dispatch_uid="tenant_settings_store_saved")
+@receiver(post_save, sender=BehaviorRules, dispatch_uid="tenant_settings_rules_saved")
+def invalidate_tenant_settings(sender, instance, **kwargs):
+    from api.ai.context import invalidate_settings
+    invalidate_settings(instance.user_id)
+
+
 @receiver(post_save, sender=BehaviorRules, dispatch_uid="rag_process_both")
 def process_rag_sources(sender, instance, **kwargs):
     """When BehaviorRules is saved, process both sample_qa and knowledge_base in background."""
@@ -86,6 +104,10 @@ def _build_rag_chunks(user, text, source):
         if new_chunks:
             RAGChunk.objects.filter(user=user, source=source).update(is_active=False)
             RAGChunk.objects.bulk_create(new_chunks)
+            from .index import refresh
+            refresh(user.pk)
+            from api.ai.response_cache import invalidate
+            invalidate(user.pk)
             logger.info(
                 "RAG: created %d chunks for user=%s source=%s",
                 len(new_chunks), user.pk, source,
@@ -1,3 +1,146 @@
+import os
+import tempfile
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
 
-# Create your tests here.
+from context import embeddings
+from context import index as rag_index
+from context.models import RAGChunk
+from context.search import search_chunks
+
+
+class RAGIndexTests(TestCase):
+    def setUp(self):
+        rag_index.invalidate()
+        self.user = get_user_model().objects.create_user(username="rag_user", password="x1234567")
+
+    def _chunk(self, content, embedding, **kwargs):
+        return RAGChunk.objects.create(user=self.user, content=content, embedding=embedding, **kwargs)
+
+    def test_top_k_orders_by_cosine(self):
+        self._chunk("delivery", [1.0, 0.0])
+        self._chunk("returns", [0.0, 1.0])
+        self._chunk("payment", [0.7, 0.7])
+        hits = rag_index.get_index(self.user.pk).top_k([1.0, 0.1], 2)
+        self.assertEqual([meta[0] for _, meta in hits], ["delivery", "payment"])
+
+    def test_min_score_filters(self):
+        self._chunk("delivery", [1.0, 0.0])
+        self._chunk("returns", [0.0, 1.0])
+        hits = rag_index.get_index(self.user.pk).top_k([1.0, 0.0], 5, min_score=0.5)
+        self.assertEqual(len(hits), 1)
+
+    def test_incremental_refresh(self):
+        old = self._chunk("old", [1.0, 0.0])
+        first = rag_index.get_index(self.user.pk)
+        self.assertEqual(len(first), 1)
+
+        RAGChunk.objects.filter(pk=old.pk).update(is_active=False)
+        self._chunk("new", [0.0, 1.0])
+        with mock.patch.object(rag_index, "to_vector", wraps=rag_index.to_vector) as decode:
+            refreshed = rag_index.get_index(self.user.pk)
+        self.assertEqual(refreshed.ids.tolist(), [RAGChunk.objects.get(content="new").pk])
+        self.assertEqual(decode.call_count, 1)  # only the new row was loaded
+
+    def test_embedding_is_stored_as_float32_bytes(self):
+        chunk = self._chunk("delivery", [0.5, -1.25])
+        chunk.refresh_from_db()
+        self.assertEqual(len(bytes(chunk.vector)), 8)
+        self.assertEqual(chunk.embedding.tolist(), [0.5, -1.25])
+
+    def test_unchanged_index_is_reused(self):
+        self._chunk("delivery", [1.0, 0.0])
+        self.assertIs(rag_index.get_index(self.user.pk), rag_index.get_index(self.user.pk))
+
+    def test_registry_evicts_least_recently_used_tenant(self):
+        other = get_user_model().objects.create_user(username="rag_other", password="x1234567")
+        RAGChunk.objects.create(user=other, content="other", embedding=[1.0, 0.0])
+        self._chunk("delivery", [1.0, 0.0])
+        rag_index.get_index(self.user.pk)
+        budget = rag_index._indexes[self.user.pk].nbytes
+        with self.settings(RAG_INDEX_MAX_BYTES=budget):
+            rag_index.get_index(other.pk)
+        self.assertEqual(list(rag_index._indexes), [other.pk])
+        self.assertEqual(len(rag_index.get_index(self.user.pk)), 1)     # rebuilt on demand
+
+    @mock.patch("context.search.generate_embedding", return_value=[0.0, 1.0])
+    def test_search_chunks_result_shape(self, _emb):
+        self._chunk("Return policy: 7 days", [0.0, 1.0], source="knowledge_base", chunk_index=4)
+        result = search_chunks(self.user, "return?")
+        self.assertEqual(result, [{
+            "content": "Return policy: 7 days",
+            "source": "Knowledge Base",
+            "chunk_index": 4,
+            "score": 1.0,
+            "truncated": False,
+        }])
+
+
+class EmbeddingCacheTests(TestCase):
+    def setUp(self):
+        embeddings._cache = None
+        embeddings._batcher = None
+
+    def tearDown(self):
+        embeddings._cache = None
+        embeddings._batcher = None
+
+    @mock.patch("context.embeddings._embed_many", side_effect=lambda texts: [[1.0, 2.0]] * len(texts))
+    def test_repeat_query_is_served_from_cache(self, embed):
+        self.assertEqual(embeddings.generate_embedding(" delivery charge? "), [1.0, 2.0])
+        self.assertEqual(embeddings.generate_embedding("delivery charge?"), [1.0, 2.0])
+        self.assertEqual(embed.call_count, 1)
+
+    @mock.patch("context.embeddings._embed_many", side_effect=lambda texts: [[1.0]] * len(texts))
+    def test_batch_skips_cached_texts(self, embed):
+        embeddings.generate_embedding("a")
+        embeddings.generate_embeddings_batch(["a", "b", "b"])
+        self.assertEqual(embed.call_args_list[-1], mock.call(["b"]))
+
+    def test_memory_bound_evicts_oldest(self):
+        cache = embeddings.EmbeddingCache(max_bytes=8)
+        cache.put("a", [1.0])
+        cache.put("b", [1.0])
+        cache.put("c", [1.0])
+        self.assertIsNone(cache.get("a"))
+        self.assertIsNotNone(cache.get("c"))
+
+    def test_disk_tier_survives_new_process_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            embeddings.EmbeddingCache(disk_dir=tmp).put("hello", [0.5, 0.25])
+            vec = embeddings.EmbeddingCache(disk_dir=tmp).get("hello")
+        self.assertEqual(vec.tolist(), [0.5, 0.25])
+
+    def test_disk_tier_prunes_least_recently_read(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = embeddings.EmbeddingCache(disk_dir=tmp)
+            for i, text in enumerate(("a", "b", "c")):
+                cache.put(text, [0.5, 0.25])        # 8 bytes each
+                os.utime(cache._path(cache.key(text)), (1000 + i, 1000 + i))
+            embeddings.EmbeddingCache(disk_dir=tmp).get("a")    # read: now the most recent
+            cache.disk_max_bytes = 16
+            cache._disk_prune()
+            fresh = embeddings.EmbeddingCache(disk_dir=tmp)
+            self.assertEqual([fresh.get(t) is not None for t in ("a", "b", "c")], [True, False, False])
+
+    @mock.patch("context.embeddings._embed_many", side_effect=lambda texts: [[float(len(t))] for t in texts])
+    def test_concurrent_requests_share_one_call(self, embed):
+        batcher = embeddings.EmbeddingBatcher(window=0.2)
+        results = {}
+        start = threading.Barrier(4)
+
+        def ask(text):
+            start.wait()
+            results[text] = batcher.submit(text)
+
+        threads = [threading.Thread(target=ask, args=(t,)) for t in ("a", "bb", "ccc", "a")]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(embed.call_count, 1)
+        self.assertEqual(sorted(embed.call_args[0][0]), ["a", "bb", "ccc"])
+        self.assertEqual(results["ccc"], [3.0])
@@ -0,0 +1,11 @@
+"""gunicorn settings, read automatically from the working directory."""
+
+
+def post_worker_init(worker):
+    # Runs in every worker after the app is loaded, with or without
+    # --preload. Starting the queue consumer here, not at import time in
+    # wsgi.py, means a preloading master never owns it and every forked
+    # worker gets its own.
+    from api.jobs import start_embedded_worker
+
+    start_embedded_worker()
@@ -2,4 +2,10 @@ import os
 import sys
 
 
-from theMatrixAi.wsgi import application
\ No newline at end of file
+from theMatrixAi.wsgi import application
+
+# Passenger spawns each Python process directly (no preloading parent), so
+# the queue consumer starts here; under gunicorn see gunicorn.conf.py.
+from api.jobs import start_embedded_worker  # noqa: E402
+
+start_embedded_worker()
@@ -37,6 +37,53 @@ OPENROUTER_API_KEY = os.environ.get("OPENROUTER_API_KEY", "")
 # The Orchestrator is the ONLY AI path (webhooks always route through it).
 # The flag is kept for compatibility; it defaults to True.
 AI_ORCHESTRATOR_ENABLED = os.environ.get("AI_ORCHESTRATOR_ENABLED", "True") == "True"
+# Background job queue (api/jobs.py). Web processes run an embedded consumer
+# unless disabled — set False when dedicated `run_ai_workers` processes run
+# (the Procfile, which declares a `worker` process, defaults it to False).
+AI_WORKER_EMBEDDED = env.bool("AI_WORKER_EMBEDDED", default=True)
+AI_WORKER_CONCURRENCY = env.int("AI_WORKER_CONCURRENCY", default=8)
+# Pooled OpenRouter/OpenAI HTTP client (api/ai/providers.py).
+LLM_POOL_MAX_CONNECTIONS = env.int("LLM_POOL_MAX_CONNECTIONS", default=50)
+LLM_POOL_MAX_KEEPALIVE = env.int("LLM_POOL_MAX_KEEPALIVE", default=20)
+LLM_KEEPALIVE_EXPIRY = env.float("LLM_KEEPALIVE_EXPIRY", default=90.0)
+LLM_HTTP2 = env.bool("LLM_HTTP2", default=False)  # needs the `h2` package (httpx[http2]), not in requirements.txt
+LLM_MODEL_TIMEOUTS = env.json("LLM_MODEL_TIMEOUTS", default={})  # {"model": seconds}
+# Stream text-only replies and send finished parts while the model is still
+# generating (api/ai/streaming.py).
+AI_STREAMING_REPLIES = env.bool("AI_STREAMING_REPLIES", default=True)
+# Per-tenant semantic cache for repeated store questions (api/ai/response_cache.py).
+AI_RESPONSE_CACHE_ENABLED = env.bool("AI_RESPONSE_CACHE_ENABLED", default=True)
+AI_RESPONSE_CACHE_TTL = env.int("AI_RESPONSE_CACHE_TTL", default=6 * 3600)
+AI_RESPONSE_CACHE_MAX_ENTRIES = env.int("AI_RESPONSE_CACHE_MAX_ENTRIES", default=200)
+AI_RESPONSE_CACHE_MIN_SCORE = env.float("AI_RESPONSE_CACHE_MIN_SCORE", default=0.95)
+# Shared pool for running independent plan steps concurrently
+# (api/ai/executor.py). 0 runs every plan sequentially on the calling thread.
+AI_EXECUTOR_MAX_WORKERS = env.int("AI_EXECUTOR_MAX_WORKERS", default=8)
+# Live external catalog search fan-out (api/products/providers/base.py).
+PRODUCT_SEARCH_WORKERS = env.int("PRODUCT_SEARCH_WORKERS", default=16)
+PRODUCT_SEARCH_CONCURRENCY = env.int("PRODUCT_SEARCH_CONCURRENCY", default=4)
+PRODUCT_SEARCH_DEADLINE = env.float("PRODUCT_SEARCH_DEADLINE", default=8.0)
+# Read-through cache for live external catalogs (api/products/providers/cached.py).
+PRODUCT_CACHE_ENABLED = env.bool("PRODUCT_CACHE_ENABLED", default=True)
+PRODUCT_CACHE_TTLS = env.json("PRODUCT_CACHE_TTLS", default={})  # {"search": seconds, ...}
+# Scheduled catalog sync (api/products/scheduler.py, `run_product_sync`).
+PRODUCT_SYNC_CONCURRENCY = env.int("PRODUCT_SYNC_CONCURRENCY", default=2)
+# Outbound delivery (api/ai/sender.py): pool that downloads/uploads reply
+# images ahead of the in-order sends. 0 prefetches inline.
+SENDER_DELIVERY_WORKERS = env.int("SENDER_DELIVERY_WORKERS", default=8)
+# Message archive (back/message_archive.py, `archive_messages`).
+MESSAGE_ARCHIVE_DAYS = env.int("MESSAGE_ARCHIVE_DAYS", default=180)
+MESSAGE_ARCHIVE_KEEP_RECENT = env.int("MESSAGE_ARCHIVE_KEEP_RECENT", default=50)
+# Per-process RAG vector indexes (context/index.py), LRU over tenants.
+RAG_INDEX_MAX_BYTES = env.int("RAG_INDEX_MAX_BYTES", default=256 * 1024 * 1024)
+# Per-process product search indexes (api/ai/product_index.py), LRU over tenants.
+PRODUCT_INDEX_MAX_BYTES = env.int("PRODUCT_INDEX_MAX_BYTES", default=128 * 1024 * 1024)
+# Query-embedding cache and micro-batcher (context/embeddings.py). Setting a
+# directory adds an on-disk tier shared by the processes on one host.
+EMBEDDING_CACHE_MAX_BYTES = env.int("EMBEDDING_CACHE_MAX_BYTES", default=64 * 1024 * 1024)
+EMBEDDING_CACHE_DIR = env("EMBEDDING_CACHE_DIR", default="")
+EMBEDDING_DISK_CACHE_MAX_BYTES = env.int("EMBEDDING_DISK_CACHE_MAX_BYTES", default=1024 * 1024 * 1024)
+EMBEDDING_BATCH_WINDOW_MS = env.int("EMBEDDING_BATCH_WINDOW_MS", default=10)
 
 # --- Meta (Facebook/Instagram) OAuth + app-level webhook ---
 META_APP_ID = env("META_APP_ID", default="")